@@ -104,7 +104,10 @@ class ActorsProblem(REHO):
         """
         Run the single_optimization with DWD for each sampled actor epsilon.
         """
+        outer = self.start_checkpoint_run('actor_decomposition_optimization')
         for ids in self.samples.index:
+            if self.completed_before_resume(self.scenario['name'], ids) and 'df_Dual' in self.results[self.scenario['name']][ids]:
+                continue
             self.iter = 0
             sample_param = self.samples.iloc[ids]
             for param in sample_param.index:
@@ -112,6 +115,7 @@ class ActorsProblem(REHO):
             self.single_optimization(Pareto_ID=ids)
             self.results[self.scenario['name']][ids]['Samples']['Sampling_result'] = sample_param
             self.add_dual_Results(Scn_ID=self.scenario['name'], Pareto_ID=ids)
+        self.end_optimization(outer)
 
     def add_dual_Results(self, Scn_ID, Pareto_ID):
         self.results[Scn_ID][Pareto_ID]['df_Dual'] = {}
@@ -25,7 +25,7 @@ subject to size_cstr6{l in ResourceBalances, f in FeasibleSolutions, h in House:
    Cost_self_consumption[f,h] <= Cost_supply_cst[l] *lambda[f,h];
 
 # Self-consumption
-param PV_prod{f in FeasibleSolutions, h in House, p in Period, t in Time[p]};
+param PV_prod{f in FeasibleSolutions, h in House, p in Period, t in Time[p]} default 0;
 param PV_self_consummed{f in FeasibleSolutions, h in House, p in Period, t in Time[p]} :=  PV_prod[f,h,p,t] - Grid_demand["Electricity",f,h,p,t];
 
 #--------------------------------------------------------------------------------------------------------------------#
@@ -68,8 +68,9 @@ lambda[f,h] = lambda_binary[f,h];
 param Network_demand_connection{l in ResourceBalances} default 0;
 param Network_supply_connection{l in ResourceBalances} default 0;
 
-param Grid_supply{l in ResourceBalances, f in FeasibleSolutions, h in House, p in Period, t in Time[p]};
-param Grid_demand{l in ResourceBalances, f in FeasibleSolutions, h in House, p in Period, t in  Time[p]};
+# the SP solutions identical to a previous one (rediscovered columns) are not sent, their lambda is fixed to 0
+param Grid_supply{l in ResourceBalances, f in FeasibleSolutions, h in House, p in Period, t in Time[p]} default 0;
+param Grid_demand{l in ResourceBalances, f in FeasibleSolutions, h in House, p in Period, t in  Time[p]} default 0;
 param Grid_usage_max_demand default 0;
 param Grid_usage_max_supply default 0;
 
@@ -173,9 +174,9 @@ subject to renovation2{h in House}:
 #--------------------------------------------------------------------------------------------------------------------#
 ######################################################################################################################
 
-param Costs_inv_rep_SPs{f in FeasibleSolutions, h in House} >= 0;
-param Costs_ft_SPs{f in FeasibleSolutions, h in House} >= 0;
-param GWP_house_constr_SPs{f in FeasibleSolutions, h in House} >= 0;
+param Costs_inv_rep_SPs{f in FeasibleSolutions, h in House} >= 0, default 0;
+param Costs_ft_SPs{f in FeasibleSolutions, h in House} >= 0, default 0;
+param GWP_house_constr_SPs{f in FeasibleSolutions, h in House} >= 0, default 0;
 
 #--------------------------------------------------------------------------------------------------------------------#
 #-OPERATIONAL EXPENSES
@@ -9,6 +9,8 @@ __doc__ = """
 File for handling infrastructure parameters.
 """
 
+_performance_tables = dict()  # HP and AC files and their modification times -> performance table, see get_performance_table
+
 
 class Infrastructure:
     """
@@ -99,10 +101,20 @@ class Infrastructure:
         self.Streams_H = pd.DataFrame()
 
         self.HP_parameters = {}
+        self.streams_T = {}  # timesteps -> temperatures of the streams, see SubProblem.set_streams_temperature
 
         self.generate_structure()
         self.generate_parameter()
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['streams_T'] = {}  # cache rebuilt by each process, not an input of the SPs
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault('streams_T', {})
+        self.__dict__.update(state)
+
     def generate_structure(self):
 
         # The indexes h_ht, h_mt, h_lt, c_ht state for the discretization of the streams. They are connected to the heat cascade.
@@ -246,27 +258,20 @@ class Infrastructure:
             self.Grids_Parameters = pd.concat([self.Grids_Parameters, df])
 
         # HP and AC temperatures
+        performance_files = {'AirConditioner': 'AC_parameters.txt', 'HeatPump': 'HP_parameters.txt'}
+        units_of_type = {}  # unit type -> complete names of its units, in the order of the houses
         for h in self.House:
-
             for u in self.houses[h]['units']:
-                if u['UnitOfType'] == 'AirConditioner' or u['UnitOfType'] == 'HeatPump':
-                    complete_name = u['Unit'] + '_' + h
-                    if u['UnitOfType'] == 'AirConditioner':
-                        file = os.path.join(path_to_infrastructure, 'AC_parameters.txt')
-                    elif u['UnitOfType'] == 'HeatPump':
-                        file = os.path.join(path_to_infrastructure, 'HP_parameters.txt')
-
-                    df = pd.read_csv(file, delimiter=';', index_col=[0, 1])
-                    df = pd.concat([df], keys=[complete_name])
-                    # get index sets of source and sink of HP
-                    name, rest = df.columns[0].split('_', 1)
-                    self.TemperatureSets[name + '_Tsink'] = np.array(df.index.get_level_values(1).unique())
-                    self.TemperatureSets[name + '_Tsource'] = np.array(df.index.get_level_values(2).unique())
-
-                    if u['UnitOfType'] in self.HP_parameters:
-                        self.HP_parameters[u['UnitOfType']] = pd.concat([self.HP_parameters[u['UnitOfType']], df])
-                    else:
-                        self.HP_parameters[u['UnitOfType']] = df
+                if u['UnitOfType'] in performance_files:
+                    units_of_type.setdefault(u['UnitOfType'], []).append(u['Unit'] + '_' + h)
+
+        for unit_type, complete_names in units_of_type.items():
+            df = get_performance_table(os.path.join(path_to_infrastructure, performance_files[unit_type]))
+            # get index sets of source and sink of HP
+            name, rest = df.columns[0].split('_', 1)
+            self.TemperatureSets[name + '_Tsink'] = np.array(df.index.get_level_values(0).unique())
+            self.TemperatureSets[name + '_Tsource'] = np.array(df.index.get_level_values(1).unique())
+            self.HP_parameters[unit_type] = repeat_performance_table(df, complete_names)
 
         for key in self.TemperatureSets:  # add additional sets from units to total set
             self.Set[key] = self.TemperatureSets[key]
@@ -304,6 +309,33 @@ class Infrastructure:
 
 
 
+def get_performance_table(file):
+    """
+    Returns the performance table of a heat pump or an air conditioner, indexed by the sink and source temperatures.
+
+    The table is read once per process and shared by all the units and infrastructures, it must not be modified.
+    A file modified since is read again.
+    """
+    key = (file, os.path.getmtime(file))
+    if key not in _performance_tables:
+        _performance_tables[key] = pd.read_csv(file, delimiter=';', index_col=[0, 1])
+    return _performance_tables[key]
+
+
+def repeat_performance_table(df, complete_names):
+    """
+    Returns the performance table of each unit, indexed by the unit and the sink and source temperatures.
+
+    The table is the same for all the units of a type: the index reuses the levels of the cached table and only its
+    codes are repeated, and the values are written once into the table of the unit type.
+    """
+    n_units, n_rows = len(complete_names), len(df)
+    levels = [pd.Index(complete_names)] + list(df.index.levels)
+    codes = [np.repeat(np.arange(n_units), n_rows)] + [np.tile(level_codes, n_units) for level_codes in df.index.codes]
+    index = pd.MultiIndex(levels=levels, codes=codes, names=[None] + list(df.index.names))
+    return pd.DataFrame(np.tile(df.values, (n_units, 1)), index=index, columns=df.columns)
+
+
 def prepare_units_df(file, exclude_units=[], grids=None):
     """
     Prepares the df that will be used by initialize_units.
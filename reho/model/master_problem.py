@@ -1,6 +1,12 @@
 import copy
 import gc
+import hashlib
+import pickle
+import queue
+import tempfile
 import time
+import uuid
+import weakref
 import multiprocessing as mp
 from itertools import groupby
 
@@ -8,8 +14,11 @@ import coloredlogs
 import pandas as pd
 
 import reho.model.infrastructure as infrastructure
+import reho.model.workers as workers
+from reho.model.results_store import ResultsStore, RecordBuffer
 from reho.model.preprocessing.local_data import *
 import reho.model.preprocessing.mobility_generator as mobility
+import reho.model.preprocessing.archetypes as archetypes
 import reho.model.postprocessing.write_results as write_results
 
 from reho.model.sub_problem import *
@@ -89,6 +98,8 @@ class MasterProblem:
 
         # retrieve location data
         self.local_data = return_local_data(cluster, qbuildings_data)
+        if self.method['use_pv_orientation']:
+            get_skydome_data(self.local_data)  # given with local_data to the SPs
 
         if parameters is None:
             self.parameters = {}
@@ -117,7 +128,18 @@ class MasterProblem:
         else:
             self.DW_params = copy.deepcopy(DW_params)
         self.DW_params = self.initialise_DW_params(self.DW_params, self.cluster, self.buildings_data)
+        if self.DW_params['archetypes']:
+            # only the first building of each archetype is solved, see add_archetype_results
+            self.archetypes = archetypes.group_buildings(self.buildings_data, self.DW_params['archetype_tolerances'])
+        else:
+            self.archetypes = {h: [h] for h in self.buildings_data}
         self.cpu_use = mp.cpu_count()
+        self.pool = None  # backend executing the SPs, kept between the decompositions (see get_SP_pool)
+        self.pool_fingerprint = None  # fingerprint of the SP inputs held by the workers of the pool
+        self.pool_finalizer = None  # stops the workers if the object is deleted without closing the pool
+        self.checkpoint_run = None  # (method, arguments) of the optimization written in the checkpoints, see save_checkpoint
+        self.DW_resume = None  # decomposition in progress at the last checkpoint, continued by execute_dantzig_wolfe_decomposition
+        self.resuming = False  # the optimizations already completed before the checkpoint are not solved again
 
         # TODO change the nomenclature of these parameters to semi-automate the separation between MP and SP: (ex: all MP parameters end with _MP)
         self.lists_MP = {"list_parameters_MP": ['Uh', 'Uh_ins', 'ins_target', 'ins_target_max', 'renter_subsidies_bound',
@@ -144,7 +166,9 @@ class MasterProblem:
 
     def initialize_optimization_tracking_attributes(self):
         # internal IT parameter
-        self.pool = None
+        self.SP_models_token = None  # identifies the decomposition run of the SP models kept alive by the workers
+        self.ampl_MP = None  # master problem kept between iterations with DW_params['persistent_MP']
+        self.MP_columns_sent = np.array([])  # FeasibleSolutions already given to ampl_MP
         self.iter = 0  # keeps track of iterations, takes value of last iteration circle
         self.feasible_solutions = 0  # keeps track how many sets of SP solutions are proposed to the MP eg '2' means two per building
         list_obj = ["TOTEX", "CAPEX", "OPEX", "GWP"]
@@ -153,25 +177,117 @@ class MasterProblem:
         # output attributes
         self.stopping_criteria = pd.DataFrame()
 
-        # result attributes
-        self.number_SP_solutions = pd.DataFrame()  # records number of solutions per iteration circle
+        # result attributes, the tables filled at each SP or MP are buffered (see the properties below)
+        self.tables = {'number_SP_solutions': RecordBuffer(),  # records number of solutions per iteration circle
+                       'solver_attributes_SP': RecordBuffer(index_names=['House', 'Iter', 'FeasibleSolution', 'Scn_ID', 'Pareto_ID']),
+                       'solver_attributes_MP': RecordBuffer(index_names=['Iter', 'Scn_ID', 'Pareto_ID']),
+                       'rediscovered_columns': RecordBuffer(),  # SP solutions identical to a previous column of the house
+                       'dual_stabilization': RecordBuffer(),  # distance between the MP duals and the duals given to the SPs
+                       'column_pool': RecordBuffer(),  # lambda and reduced cost of the columns at each MP
+                       'SP_dual_changes': RecordBuffer()}  # change of the duals of each SP since its last solve
+        self.column_hashes = dict()  # hash of the SP solutions sent to the MP -> their key in results_SP, see get_column_hash
+        self.column_ages = dict()  # (FeasibleSolution, house) -> number of consecutive MPs where the column was non-basic
+        self.archived_columns = dict()  # (FeasibleSolution, house) -> iteration at which the column left the MP, see update_column_pool
+        self.MP_columns_archived = set()  # archived columns fixed to 0 in ampl_MP
+        self.last_SP_solves = dict()  # (house, renovation option) -> (duals, df_Results, attr) of its last SP solve, see skip_SP and get_SP_start
+        self.SP_duals = dict()  # duals given to the SPs of each iteration, see get_SP_duals
+        self.period_frequency = None  # frequency of the typical periods in the reduced costs, see get_period_frequency
+        self.mispricing = False  # the next SPs receive the MP duals without stabilization
         self.number_MP_solutions = pd.DataFrame()  # records number of solutions per iteration circle
 
-        self.results_SP = dict()
+        self.results_SP = ResultsStore()
         self.results_MP = dict()
 
-        self.solver_attributes_SP = pd.DataFrame()
-        self.solver_attributes_MP = pd.DataFrame()
         self.reduced_costs = pd.DataFrame()
 
     def __getstate__(self):
         self_dict = self.__dict__.copy()
         if hasattr(self, 'pool'):
             del self_dict['pool']
+        if hasattr(self, 'ampl_MP'):
+            del self_dict['ampl_MP']
+        self_dict.pop('pool_finalizer', None)
+        self_dict.pop('pool_fingerprint', None)
         return self_dict
 
     def __setstate__(self, state):
+        tables = {name: state.pop(name) for name in ['number_SP_solutions', 'solver_attributes_SP', 'solver_attributes_MP'] if name in state}
         self.__dict__.update(state)
+        self.__dict__.setdefault('tables', dict())
+        self.tables.setdefault('rediscovered_columns', RecordBuffer())
+        self.tables.setdefault('dual_stabilization', RecordBuffer())
+        self.tables.setdefault('column_pool', RecordBuffer())
+        self.tables.setdefault('SP_dual_changes', RecordBuffer())
+        self.__dict__.setdefault('column_hashes', dict())
+        self.__dict__.setdefault('column_ages', dict())
+        self.__dict__.setdefault('archived_columns', dict())
+        self.__dict__.setdefault('last_SP_solves', dict())
+        self.__dict__.setdefault('period_frequency', None)
+        self.__dict__.setdefault('archetypes', {h: [h] for h in self.buildings_data})
+        self.__dict__.setdefault('checkpoint_run', None)
+        self.__dict__.setdefault('DW_resume', None)
+        self.__dict__.setdefault('resuming', False)
+        self.MP_columns_archived = set()
+        self.pool = None
+        self.pool_fingerprint = None
+        self.pool_finalizer = None
+        self.ampl_MP = None
+        for name, df in tables.items():  # objects saved before the tables were buffered
+            setattr(self, name, df)
+        if 'results_SP' in state and not isinstance(self.results_SP, ResultsStore):  # objects saved before the ResultsStore
+            self.results_SP = ResultsStore.from_nested(self.results_SP)
+
+    @property
+    def rediscovered_columns(self):
+        return self.tables['rediscovered_columns'].to_frame()
+
+    @property
+    def dual_stabilization(self):
+        return self.tables['dual_stabilization'].to_frame()
+
+    @property
+    def column_pool(self):
+        return self.tables['column_pool'].to_frame()
+
+    @property
+    def SP_dual_changes(self):
+        return self.tables['SP_dual_changes'].to_frame()
+
+    @property
+    def number_SP_solutions(self):
+        return self.tables['number_SP_solutions'].to_frame()
+
+    @number_SP_solutions.setter
+    def number_SP_solutions(self, df):
+        self.tables['number_SP_solutions'] = RecordBuffer(df)
+
+    @property
+    def solver_attributes_SP(self):
+        return self.tables['solver_attributes_SP'].to_frame()
+
+    @solver_attributes_SP.setter
+    def solver_attributes_SP(self, df):
+        self.tables['solver_attributes_SP'] = RecordBuffer(df, index_names=['House', 'Iter', 'FeasibleSolution', 'Scn_ID', 'Pareto_ID'])
+
+    @property
+    def solver_attributes_MP(self):
+        return self.tables['solver_attributes_MP'].to_frame()
+
+    @solver_attributes_MP.setter
+    def solver_attributes_MP(self, df):
+        self.tables['solver_attributes_MP'] = RecordBuffer(df, index_names=['Iter', 'Scn_ID', 'Pareto_ID'])
+
+    @property
+    def number_MP_solutions(self):
+        # computed from number_SP_solutions when read after a new MP
+        if self._number_MP_solutions is None:
+            col = self.number_SP_solutions.columns.difference(["House"])
+            self._number_MP_solutions = self.number_SP_solutions[col].groupby('MP_solution').mean(numeric_only=True)
+        return self._number_MP_solutions
+
+    @number_MP_solutions.setter
+    def number_MP_solutions(self, df):
+        self._number_MP_solutions = df
 
     def select_SP_obj_decomposition(self, scenario):
         """
@@ -244,6 +360,8 @@ class MasterProblem:
         epsilon_init : array
             Epsilon constraints to apply for the initialization
         """
+        self.period_frequency = None  # read again from the first SP results, see get_period_frequency
+
         # check if TOTEX, OPEX or multi-objective optimization -> init with beta
         if self.method["skip_initiation"]:
             init_beta = []
@@ -257,43 +375,264 @@ class MasterProblem:
         if self.method['include_all_solutions']:
             self.flags[scenario['Objective']] = 1  # never been optimized with this objective previously
 
-        for beta in init_beta:  # execute SP for MP initialization
-            self.launch_SP_multiprocessing(scenario, Scn_ID, Pareto_ID, epsilon_init, beta, initiation=True)
+        rounds = []  # (epsilon_init, beta, renovation_options) of each round of SPs for MP initialization
+        for beta in init_beta:
+            rounds.append((epsilon_init, beta, None))
             if self.method['renovation'] is not None:
-                for option in self.method['renovation']:
-                    self.launch_SP_multiprocessing(scenario, Scn_ID, Pareto_ID, None, None, initiation=True, renovation_options=option)
+                rounds += [(None, None, option) for option in self.method['renovation']]
+
+        if self.method['parallel_computation'] and len(rounds) > 1:
+            self.launch_SP_initiation_batch(scenario, Scn_ID, Pareto_ID, rounds)
+        else:
+            for epsilon, beta, option in rounds:
+                self.launch_SP_multiprocessing(scenario, Scn_ID, Pareto_ID, epsilon, beta, initiation=True, renovation_options=option)
+
+        return
 
+    def launch_SP_initiation_batch(self, scenario, Scn_ID, Pareto_ID, rounds):
+        """
+        Submits the SPs of all the initiation rounds to the pool at once.
+
+        The rounds do not depend on each other, so the workers do not wait for the slowest SP of a round before starting
+        the next one. The results are stored once the batch is completed, round by round, so that they get the same
+        FeasibleSolution as with one ``launch_SP_multiprocessing`` per round.
+
+        Parameters
+        ----------
+        scenario : dictionary
+            Which objective function to optimize and the value of epsilon constraints to apply
+        Scn_ID : int
+            ID of the optimization scenario
+        Pareto_ID : int
+            ID of the pareto point
+        rounds : list
+            (epsilon_init, beta, renovation_options) of each round, see ``SP_initiation_execution``
+        """
+        houses = list(self.archetypes)  # the other buildings of an archetype receive the solution of its first building
+        tasks = [(r, h) for r in range(len(rounds)) for h in houses]
+
+        def submit(task, callback, error_callback):
+            r, h = task
+            epsilon_init, beta, renovation_options = rounds[r]
+            return self.pool.apply_async(workers.execute, args=('SP_initiation_execution', scenario, Scn_ID, Pareto_ID, h, epsilon_init, beta, renovation_options),
+                                         callback=callback, error_callback=error_callback)
+
+        results = dict(self.collect_SP_results(submit, tasks))
+
+        for r, (epsilon_init, beta, renovation_options) in enumerate(rounds):
+            for h in houses:
+                df_Results, attr = results[(r, h)]
+                self.add_archetype_results(Scn_ID, Pareto_ID, self.iter, h, df_Results, attr)
+                self.last_SP_solves[(h, renovation_options)] = (None, df_Results, attr)
+
+            results_round = self.results_SP[Scn_ID][Pareto_ID][self.iter][self.feasible_solutions]
+            self.results_SP[Scn_ID][Pareto_ID][self.iter][self.feasible_solutions] = {h: results_round[h] for h in self.infrastructure.houses}
+            self.feasible_solutions += 1
         return
 
     def launch_SP_multiprocessing(self, scenario, Scn_ID, Pareto_ID, epsilon_init, beta, initiation=True, renovation_options=None):
 
-        if self.method['parallel_computation']:
-            # to run multiprocesses, a copy of the model is performed with pickles -> make sure there are no ampl libraries
-            if initiation:
-                results = {h: self.pool.apply_async(self.SP_initiation_execution, args=(scenario, Scn_ID, Pareto_ID, h, epsilon_init, beta, renovation_options)) for h in self.infrastructure.houses}
-            else:
-                results = {h: self.pool.apply_async(self.SP_execution, args=(scenario, Scn_ID, Pareto_ID, h, renovation_options)) for h in self.infrastructure.houses}
+        houses = list(self.archetypes)  # the other buildings of an archetype receive the solution of its first building
+        if not initiation:
+            SP_inputs = {h: self.get_SP_dual_parameters(scenario, Scn_ID, Pareto_ID, h) for h in houses}
+            if self.DW_params['SP_skip_tolerance'] is not None:
+                n_SP = len(houses)
+                houses = [h for h in houses if not self.skip_SP(Scn_ID, Pareto_ID, h, SP_inputs[h][1], renovation_options)]
+                self.logger.info(str(n_SP - len(houses)) + ' SP solve(s) skipped, iteration: ' + str(self.iter))
 
-            # sometimes, python goes to fast and extract the results before calculating them. This step makes python wait finishing the calculations
-            while len(results[list(self.buildings_data.keys())[-1]].get()) != 2:
-                time.sleep(1)
+        if self.method['parallel_computation']:
+            # the workers already hold the inputs of the SPs (see get_SP_context) -> only the house and its duals are sent
+            def submit(h, callback, error_callback):
+                if initiation:
+                    return self.pool.apply_async(workers.execute, args=('SP_initiation_execution', scenario, Scn_ID, Pareto_ID, h, epsilon_init, beta, renovation_options),
+                                                 callback=callback, error_callback=error_callback)
+
+                SP_scenario, parameters_SP = SP_inputs[h]
+                task = ('SP_solve', SP_scenario, Scn_ID, Pareto_ID, h, parameters_SP, renovation_options, self.get_SP_start(h, renovation_options))
+                if self.DW_params['persistent_SP']:
+                    # each house is always solved by the worker holding its model
+                    return self.pool.lane(h).apply_async(workers.execute, args=task, callback=callback, error_callback=error_callback)
+                else:
+                    return self.pool.apply_async(workers.execute, args=task, callback=callback, error_callback=error_callback)
 
-            # the memory to write and share results is not parallel -> results have to be stored outside calculation
-            for h in self.infrastructure.houses:
-                (df_Results, attr) = results[h].get()
-                self.add_df_Results_SP(Scn_ID, Pareto_ID, self.iter, h, df_Results, attr)
+            # the memory to write and share results is not parallel -> results are stored outside calculation, as soon as they arrive
+            for h, (df_Results, attr) in self.collect_SP_results(submit, houses):
+                self.add_archetype_results(Scn_ID, Pareto_ID, self.iter, h, df_Results, attr)
+                self.last_SP_solves[(h, renovation_options)] = (None if initiation else SP_inputs[h][1], df_Results, attr)
         else:
-            for h in self.infrastructure.houses:
+            for h in houses:
                 if initiation:
+                    parameters_SP = None
                     df_Results, attr = self.SP_initiation_execution(scenario, Scn_ID, Pareto_ID, h, epsilon_init, beta, renovation_options)
                 else:
-                    df_Results, attr = self.SP_execution(scenario, Scn_ID, Pareto_ID, h, renovation_options)
+                    SP_scenario, parameters_SP = SP_inputs[h]
+                    df_Results, attr = self.SP_solve(SP_scenario, Scn_ID, Pareto_ID, h, parameters_SP, renovation_options, self.get_SP_start(h, renovation_options))
 
-                self.add_df_Results_SP(Scn_ID, Pareto_ID, self.iter, h, df_Results, attr)
+                self.add_archetype_results(Scn_ID, Pareto_ID, self.iter, h, df_Results, attr)
+                self.last_SP_solves[(h, renovation_options)] = (parameters_SP, df_Results, attr)
+
+        # keep the houses in the same order as in a sequential execution without archetypes
+        results_round = self.results_SP[Scn_ID][Pareto_ID][self.iter][self.feasible_solutions]
+        self.results_SP[Scn_ID][Pareto_ID][self.iter][self.feasible_solutions] = {h: results_round[h] for h in self.infrastructure.houses}
 
         self.feasible_solutions += 1  # after each 'round' of SP execution the number of feasible solutions increase
         return
 
+    def skip_SP(self, Scn_ID, Pareto_ID, h, parameters_SP, renovation_options=None):
+        """
+        Reuses the last solution of the SP of a house instead of solving it again, if its duals did not change materially.
+
+        The dual values given to the SP (restricted to the layers of the house) are compared with the ones of its last
+        solve, see ``get_SP_dual_change``. Below ``DW_params['SP_skip_tolerance']``, the last solution is added again
+        to the results of this iteration, with a solving time of 0. The comparison is recorded in ``SP_dual_changes``.
+
+        Parameters
+        ----------
+        Scn_ID : int
+            scenario ID
+        Pareto_ID : int
+            pareto ID
+        h : string
+            house ID
+        parameters_SP : dict
+            dual variables, as returned by get_SP_dual_parameters
+        renovation_options : str, optional
+            renovation option of the building
+
+        Returns
+        -------
+        skipped : bool
+            True if the SP does not have to be solved
+        """
+        last_solve = self.last_SP_solves.get((h, renovation_options))
+        if last_solve is None or last_solve[0] is None:
+            change = np.inf  # never solved with duals
+        else:
+            change = self.get_SP_dual_change(h, last_solve[0], parameters_SP)
+        skipped = bool(change <= self.DW_params['SP_skip_tolerance'])
+        self.tables['SP_dual_changes'].append({'Scn_ID': Scn_ID, 'Pareto_ID': Pareto_ID, 'Iter': self.iter, 'House': h,
+                                               'Renovation': renovation_options, 'Dual_change': change, 'Skipped': skipped})
+        if skipped:
+            df_Results, attr = last_solve[1:]
+            attr = attr.copy()
+            attr['solving_time'] = 0.0
+            attr['transfer_time'] = 0.0
+            self.add_archetype_results(Scn_ID, Pareto_ID, self.iter, h, df_Results, attr)
+        return skipped
+
+    def get_SP_dual_change(self, h, parameters_last, parameters_SP):
+        """
+        Returns the largest relative change between two sets of dual values given to the SP of a house.
+
+        Each parameter is compared on the layers of the house only, relative to its largest absolute value in ``parameters_last``.
+        """
+        layers = [layer for layer, houses in self.infrastructure.HousesOfLayer.items() if h in houses]
+
+        def values(value):
+            if isinstance(value, (pd.Series, pd.DataFrame)):
+                if 'Layer' in value.index.names:
+                    value = value[value.index.get_level_values('Layer').isin(layers)]
+                value = value.values
+            return np.asarray(value, dtype=float).ravel()
+
+        change = 0.0
+        for name in set(parameters_last) | set(parameters_SP):
+            if name not in parameters_last or name not in parameters_SP:
+                return np.inf
+            last, new = values(parameters_last[name]), values(parameters_SP[name])
+            if last.shape != new.shape:
+                return np.inf
+            difference = np.abs(new - last).max(initial=0.0)
+            scale = np.abs(last).max(initial=0.0)
+            if difference > 0:
+                change = max(change, difference / scale if scale > 0 else np.inf)
+        return change
+
+    def collect_SP_results(self, submit, houses):
+        """
+        Submits the SPs of the houses to the pool and yields their results in the order in which they are completed.
+
+        A SP that fails or exceeds ``DW_params['SP_timeout']`` is submitted again up to ``DW_params['SP_max_retries']`` times.
+        The first result received for a house is kept. As a SP that timed out keeps its worker busy, the workers are
+        restarted before submitting it again (except for remote workers, see ``workers.SocketExecutor``), and the other
+        pending SPs are submitted again as well. Once a SP that failed or timed out has no retry left, the workers are terminated.
+
+        Parameters
+        ----------
+        submit : function
+            Submits the SP of a house to the pool, with the signature ``submit(h, callback, error_callback)``.
+        houses : list
+            Houses to solve, or keys of the SPs ending with the house, e.g. (round, house) for several rounds at once.
+
+        Yields
+        ------
+        h : string or tuple
+            House ID, or key of the SP
+        result : tuple
+            (df_Results, attr) returned by the SP execution
+
+        Raises
+        ------
+        TimeoutError: If a SP is still running after the timeout and has no retry left
+        Exception: If a SP failed and has no retry left
+
+        Notes
+        -----
+        The workers execute the tasks in their order of submission. The timeout of a SP is therefore counted from the moment
+        a worker became available for it, estimated from the number of tasks already finished (see ``workers.TaskTracker``).
+        """
+        timeout = self.DW_params['SP_timeout']
+        events = queue.Queue()
+        tasks = workers.TaskTracker(houses, self.pool.n_workers, timeout, self.DW_params['SP_max_retries'])
+
+        def launch(h, attempt=True):
+            g = tasks.submitted(h, attempt)
+            submit(h, lambda result: events.put((g, h, result, None)), lambda error: events.put((g, h, None, error)))
+
+        def building(h):
+            return str(h[-1] if isinstance(h, tuple) else h)
+
+        for h in houses:
+            launch(h)
+
+        done = set()
+        while len(done) < len(houses):
+            pending = [h for h in houses if h not in done]
+            try:
+                g, h, result, error = events.get(timeout=tasks.wait_time(pending))
+            except queue.Empty:
+                expired = tasks.expired(pending)
+                for h in expired:
+                    if not tasks.can_retry(h):
+                        self.close_SP_pool(terminate=True)  # the SP is still running, closing the pool would wait for it
+                        raise TimeoutError('Sub problem of building ' + building(h) + ' did not finish within ' + str(timeout) + ' s')
+                    self.logger.warning('Sub problem of building ' + building(h) + ' timed out, attempt ' + str(tasks.attempts[h] + 1) + ' is submitted')
+                if expired and self.pool.recyclable:
+                    # the SPs timed out keep their workers busy -> new workers, to which all the pending SPs are submitted again
+                    self.pool.restart()
+                    tasks.restarted()
+                    for h in pending:
+                        launch(h, attempt=h in expired)
+                else:
+                    for h in expired:
+                        launch(h)
+                continue
+
+            if not tasks.finished(g) and error is not None:
+                continue  # task of workers stopped since
+            if h in done:
+                continue  # late result of a house already solved by another attempt
+            if error is not None:
+                if not tasks.can_retry(h):
+                    self.close_SP_pool(terminate=True)  # the other SPs still running are of no use
+                    raise Exception('Sub problem failed with building ' + building(h)) from error
+                self.logger.warning('Sub problem of building ' + building(h) + ' failed (' + str(error) + '), attempt ' + str(tasks.attempts[h] + 1) + ' is submitted')
+                launch(h)
+                continue
+
+            done.add(h)
+            yield h, result
+
     def SP_initiation_execution(self, scenario, Scn_ID=0, Pareto_ID=1, h=None, epsilon_init=None, beta=None, renovation_options=None):
         """
         Adapts the model depending on the method, execute the optimization and get the results
@@ -366,6 +705,8 @@ class MasterProblem:
 
         df_Results = write_results.get_df_Results_from_SP(ampl, scenario, self.method, buildings_data_SP)
         attr = self.get_solver_attributes(Scn_ID, Pareto_ID, ampl)
+        attr['warm_start'] = False
+        attr['transfer_time'] = REHO.transfer_time
 
         del ampl
         gc.collect()  # free memory
@@ -381,12 +722,12 @@ class MasterProblem:
 
         Runs the optimization of the Master Problem (MP):
 
-        - Creates the ampl_MP master problem
-        - Sets the sets and the parameters in ampl
+        - Creates the ampl_MP master problem, or reuses the one of the previous iteration if ``DW_params['persistent_MP']``
+        - Sets the sets and the parameters in ampl (only the new SP columns for a reused master problem)
         - Actualises the grid exchanges and the costs of each sub problem (house) without the grid costs
         - Runs the optimization
         - Extracts the results (lambda, dual variables pi and mu, objective value of the MP (TOTEX, grid exchanges, ...)
-        - Deletes the ampl_MP model
+        - Deletes the ampl_MP model, unless it is kept for the next iteration
 
         Parameters
         -----------
@@ -402,129 +743,33 @@ class MasterProblem:
         ValueError: If the sets are not arrays or if the parameters are not arrays or floats or dataframes. Or if the MP optimization did not converge
         """
 
-        if "AMPL_PATH" in os.environ:
-            try:
-                ampl_MP = AMPL(Environment(os.environ["AMPL_PATH"]))
-            except:
-                raise Exception(f"Failed to use the local AMPL license as specified by AMPL_PATH: {os.environ['AMPL_PATH']}.")
+        # the persistent MP is kept during one decomposition and only receives the columns not sent yet
+        warm = self.DW_params['persistent_MP'] and self.ampl_MP is not None and not read_DHN
+        if warm:
+            ampl_MP = self.ampl_MP
         else:
-            try:
-                from amplpy import modules
-                modules.load()
-                ampl_MP = AMPL()
-            except:
-                raise Exception(
-                    "No AMPL license was found. Please refer to the documentation to set the AMPL license: https://reho.readthedocs.io/en/main/sections/5_Getting_started.html#ampl-license")
-
-        # AMPL (GNU) OPTIONS
-        ampl_MP.setOption('solution_round', 11)
-        ampl_MP.setOption('rel_boundtol', 1e-12)
-        ampl_MP.setOption('presolve_eps', 1e-4)  # -ignore difference between upper and lower bound by this tolerance
-        ampl_MP.setOption('presolve_inteps', 1e-6)  # -tolerance added/substracted to each upper/lower bound
-        ampl_MP.setOption('presolve_fixeps', 1e-9)
-        if not self.method['print_logs']:
-            ampl_MP.setOption('show_stats', 0)
-            ampl_MP.setOption('solver_msg', 0)
-
-        # -SOLVER OPTIONS
-        ampl_MP.setOption('solver', self.solver)
-        if self.solver == "gurobi":
-            ampl_MP.eval("option gurobi_options 'NodeFileStart=0.5' 'IntFeasTol=1e-6';")
-
-        ampl_MP.eval('option show_boundtol 0;')
-        ampl_MP.eval('option abs_boundtol 1e-10;')
-
-        # Load Master Problem (MP) Formulation
-        ampl_MP.cd(path_to_ampl_model)
-        ampl_MP.read('master_problem.mod')
-
-        if self.method["actors_problem"]:
-            ampl_MP.read('actors_problem.mod')
-
-        # Load battery units (district-scale, but same model as building-scale)
-        ampl_MP.cd(path_to_units)
-        if "Battery_district" in self.infrastructure.UnitsOfDistrict:
-            ampl_MP.read('battery.mod')
-
-        # Load district units
-        ampl_MP.cd(path_to_district_units)
-        if len(self.infrastructure.UnitsOfDistrict) > 0:
-            ampl_MP.cd(path_to_district_units)
-            if "Mobility" in self.infrastructure.UnitsOfLayer:
-                ampl_MP.read('mobility.mod')
-            if "EV_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read('evehicle.mod')
-            if "Bike_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read('bike.mod')
-            if "ElectricBike_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read('ebike.mod')
-            if "ICE_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read('icevehicle.mod')
-            if "NG_Boiler_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read('ng_boiler_district.mod')
-            if "HeatPump_Geothermal_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read('heatpump_district.mod')
-            if "NG_Cogeneration_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read('ng_cogeneration_district.mod')
-            if "rSOC_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read('rsoc_district.mod')
-            if "MTR_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read('methanator_district.mod')
-            if "ElectricalHeater_other_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read('electrical_heater_district.mod')
-            if "Datacenter_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read('datacenter_district.mod')
-            if "ORC_DC_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read('ORC_DC_district.mod')
-        if read_DHN:
-            ampl_MP.read('dhn.mod')
-
-        # Load interperiod storage units
-        ampl_MP.cd(path_to_units_interperiod)
-        if self.method["interperiod_storage"]:
-            if "Battery_IP_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read("battery_IP.mod")
-            if "CH4_storage_IP_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read("CH4storage_IP.mod")
-            if "H2_storage_IP_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read("H2storage_IP.mod")
-            if "CO2_storage_IP_district" in self.infrastructure.UnitsOfDistrict:
-                ampl_MP.read("CO2storage_IP.mod")
-
-        clustering_directory = os.path.join(path_to_clustering, self.local_data['File_ID'])
-        ampl_MP.cd(clustering_directory)
-
-        ampl_MP.readData('frequency.csv')
-        ampl_MP.readData('index.csv')
-        ampl_MP.cd(path_to_ampl_model)
+            ampl_MP = self.init_ampl_MP(read_DHN)
 
         # -------------------------------------------------------------------------------------------------------------
         # Set Parameters, only bool to choose if including all solutions found also from other Pareto_IDs
         # ------------------------------------------------------------------------------------------------------------
-        # collect data
-        df_Performance = self.return_combined_SP_results(self.results_SP, 'df_Performance')
-        df_Performance = df_Performance.drop(index='Network', level='Hub').groupby(level=['Scn_ID', 'Pareto_ID', 'FeasibleSolution', 'Hub']).head(1).droplevel('Hub')  # select current Scn_ID and Pareto_ID
-        df_Grid_t = np.round(self.return_combined_SP_results(self.results_SP, 'df_Grid_t'), 6)
-        df_Buildings = self.return_combined_SP_results(self.results_SP, 'df_Buildings')
-        df_Buildings = df_Buildings[df_Buildings.index.get_level_values('house') == df_Buildings.index.get_level_values('Hub')].droplevel('Hub')
-
-        # apply slicing or level-dropping uniformly to all three DataFrames
-        dfs = [df_Performance, df_Grid_t, df_Buildings]
-        if not self.method['include_all_solutions']:
-            dfs = [df.xs((Scn_ID, Pareto_ID), level=('Scn_ID', 'Pareto_ID')) for df in dfs]
+        # collect data: all the solutions or only the ones of the current Scn_ID and Pareto_ID
+        if self.method['include_all_solutions']:
+            filters = {}
         else:
-            dfs = [df.droplevel(['Scn_ID', 'Pareto_ID']) for df in dfs]
-        df_Performance, df_Grid_t, df_Buildings = dfs
+            filters = {'Scn_ID': Scn_ID, 'Pareto_ID': Pareto_ID}
+        FeasibleSolutions = self.results_SP.get_level_values('FeasibleSolution', **filters)
+        if warm:
+            # the other sets and parameters do not change during a decomposition -> only the new columns are sent
+            filters['FeasibleSolution'] = np.setdiff1d(FeasibleSolutions, self.MP_columns_sent)
+        new_FeasibleSolutions = filters.get('FeasibleSolution', FeasibleSolutions)
 
-        df_Performance = df_Performance.droplevel(level='Iter')
-        df_Grid_t = df_Grid_t.droplevel(level=['Iter', 'Hub']).reorder_levels(['Layer', 'FeasibleSolution', 'house', 'Period', 'Time'])
-        df_Buildings = df_Buildings.droplevel(level='Iter')
+        # the columns aged out are left out of the iterations, the binary MP chooses among all the columns (see update_column_pool)
+        archived = set() if binary or read_DHN else set(self.archived_columns)
 
         # assign data
-        MP_parameters = {}
-        MP_parameters['Costs_inv_rep_SPs'] = df_Performance.Costs_inv + df_Performance.Costs_rep
-        MP_parameters['Costs_ft_SPs'] = pd.DataFrame(np.round(df_Performance.Costs_ft, 6)).set_axis(['Costs_ft_SPs'], axis=1)
-        MP_parameters['GWP_house_constr_SPs'] = pd.DataFrame(df_Performance.GWP_constr).set_axis(['GWP_house_constr_SPs'], axis=1)
+        columns = self.get_MP_columns(**filters, exclude=archived)
+        MP_parameters = dict(columns)
 
         MP_parameters['Grids_Parameters'] = self.infrastructure.Grids_Parameters
         MP_parameters['Units_flowrate'] = self.infrastructure.Units_flowrate.query('Unit.str.contains("district")')
@@ -534,7 +779,6 @@ class MasterProblem:
             MP_parameters['GWP_supply'] = self.local_data["df_Emissions_GWP100a"]['GWP_supply']
             MP_parameters['GWP_demand'] = MP_parameters["GWP_supply"] * (1 - 1e-9)
 
-        MP_parameters['df_grid'] = df_Grid_t[['Grid_demand', 'Grid_supply']]
         MP_parameters['ERA'] = np.asarray([self.buildings_data[house]['ERA'] for house in self.buildings_data.keys()])
         MP_parameters['Area_tot'] = self.ERA
 
@@ -581,21 +825,14 @@ class MasterProblem:
             lst = self.infrastructure.Set['UnitsOfLayer'][layer]
             MP_set_indexed['UnitsOfLayer'][layer] = np.array(list(filter(lambda k: 'district' in k, lst)))
 
-        MP_set_indexed['FeasibleSolutions'] = df_Performance.index.unique('FeasibleSolution').to_numpy()  # index to array as set
+        MP_set_indexed['FeasibleSolutions'] = FeasibleSolutions
 
         if self.method['actors_problem']:
             if "ActorObjective" in self.set_indexed:
                 MP_set_indexed['ActorObjective'] = self.set_indexed["ActorObjective"]
 
-            df_Unit_t = self.return_combined_SP_results(self.results_SP, 'df_Unit_t').xs("Electricity", level="Layer")
-            df_PV_t = pd.DataFrame()
-            for bui in self.infrastructure.houses:
-                df_PV_t = pd.concat([df_PV_t, df_Unit_t.xs("PV_" + bui, level="Unit")])
-            MP_parameters["PV_prod"] = df_PV_t["Units_supply"].droplevel(["Scn_ID", "Pareto_ID", "Iter"])
-
         if self.method['renovation'] is not None:
             MP_parameters["Uh"] = pd.DataFrame.from_dict({house: self.buildings_data[house]['U_h'] for house in self.buildings_data.keys()}, orient="Index").rename(columns={0: "Uh"})
-            MP_parameters["Uh_ins"] = df_Buildings[["U_h"]].rename(columns={"U_h": "Uh_ins"})
 
         if "Heat" in self.infrastructure.grids.keys():
             if 'T_DHN_supply_cst' and 'T_DHN_return_cst' in self.parameters:
@@ -633,6 +870,14 @@ class MasterProblem:
         # ---------------------------------------------------------------------------------------------------------------
         # give values to ampl
         # ---------------------------------------------------------------------------------------------------------------
+        if warm:
+            # the data collected are the new columns only
+            ampl_MP.getSet('FeasibleSolutions').setValues(MP_set_indexed['FeasibleSolutions'])
+            self.MP_columns_sent = MP_set_indexed['FeasibleSolutions']
+            MP_set_indexed = {}
+            MP_parameters = columns
+        else:
+            self.MP_columns_sent = MP_set_indexed['FeasibleSolutions']
 
         for s in MP_set_indexed:
             if isinstance(MP_set_indexed[s], np.ndarray):
@@ -648,13 +893,14 @@ class MasterProblem:
         # select district units in exclude and enforce units
         exclude_units = [s for s in scenario['exclude_units'] if any(xs in s for xs in ['district'])]
         enforce_units = [s for s in scenario['enforce_units'] if any(xs in s for xs in ['district'])]
-        for i, value in ampl_MP.getVariable('Units_Use').instances():
-            for u in exclude_units:
-                if u in i:
-                    ampl_MP.getVariable('Units_Use').get(str(i[0])).fix(0)
-            for u in enforce_units:
-                if u in i:
-                    ampl_MP.getVariable('Units_Use').get(str(i[0])).fix(1)
+        if not warm:
+            for i, value in ampl_MP.getVariable('Units_Use').instances():
+                for u in exclude_units:
+                    if u in i:
+                        ampl_MP.getVariable('Units_Use').get(str(i[0])).fix(0)
+                for u in enforce_units:
+                    if u in i:
+                        ampl_MP.getVariable('Units_Use').get(str(i[0])).fix(1)
 
         for i in MP_parameters:
             if isinstance(MP_parameters[i], np.ndarray):
@@ -684,6 +930,19 @@ class MasterProblem:
             else:
                 raise ValueError('Type Error setting AMPLPY Parameter', i)
 
+        # the rediscovered columns have no data and cannot be chosen (see DW_params['deduplicate_columns']), neither the archived ones
+        columns_sent = {(key[3], key[4]) for key in self.results_SP.keys_matching(**filters)} - archived
+        for f in new_FeasibleSolutions:
+            for h in self.infrastructure.houses:
+                if (f, h) not in columns_sent:
+                    ampl_MP.getVariable('lambda').get(int(f), h).fix(0)
+        if warm:
+            for f, h in archived - self.MP_columns_archived:
+                ampl_MP.getVariable('lambda').get(int(f), h).fix(0)
+            for f, h in self.MP_columns_archived - archived:
+                ampl_MP.getVariable('lambda').get(int(f), h).unfix()
+        self.MP_columns_archived = archived
+
         # -------------------------------------------------------------------------------------------------------------
         # Set scenario and Pareto_IDs
         # ------------------------------------------------------------------------------------------------------------
@@ -692,123 +951,661 @@ class MasterProblem:
 
         ampl_MP = self.select_MP_objective(ampl_MP, scenario)
 
-        if not binary:
+        if binary:
+            ampl_MP.getConstraint('convexity_binary').restore()  # dropped in the previous iterations of a persistent MP
+        else:
             ampl_MP.getConstraint('convexity_binary').drop()
 
         # Solve ampl_MP
         ampl_MP.solve()
 
         df_Results_MP = write_results.get_df_Results_from_MP(ampl_MP, binary, self.method, self.infrastructure, read_DHN=read_DHN, scenario=scenario)
+        if self.DW_params['column_age_limit'] is not None and not binary:
+            rc = write_results.get_ampl_data(ampl_MP, 'lambda.rc', multi_index=True).iloc[:, 0]
+            df_Results_MP['df_DW']['Reduced_cost'] = rc.reindex(df_Results_MP['df_DW'].index).values
         self.logger.info(str(ampl_MP.getCurrentObjective().getValues().toPandas()))
 
         df = self.get_solver_attributes(Scn_ID, Pareto_ID, ampl_MP)
         self.add_df_Results_MP(Scn_ID, Pareto_ID, self.iter, df_Results_MP, df)
         exitcode = exitcode_from_ampl(ampl_MP)
 
-        del ampl_MP
-        gc.collect()
+        if self.DW_params['persistent_MP'] and not read_DHN:
+            self.ampl_MP = ampl_MP
+        else:
+            del ampl_MP
+            gc.collect()
         if exitcode != 0:
             raise Exception('Master problem did not converge')
 
-    def SP_iteration(self, scenario, Scn_ID=0, Pareto_ID=1):
+    def get_MP_columns(self, Scn_ID=None, Pareto_ID=None, FeasibleSolution=None, exclude=None):
         """
-        Sets up the parallel optimization if needed.
+        Collects the parameters of the MP describing the SP solutions (columns) matching the filters.
 
         Parameters
         ----------
-        scenario : dictionary
+        Scn_ID, Pareto_ID, FeasibleSolution : optional
+            Filters on the SP results, either a value or a list of values, see ``ResultsStore.select``.
+        exclude : collection of tuples, optional
+            (FeasibleSolution, house) pairs left out, e.g. the columns archived by ``update_column_pool``.
 
-        Scn_ID : int
-            scenario ID
-        Pareto_ID: int
-            pareto ID
+        Returns
+        -------
+        columns : dict
+            Parameters of the MP indexed by FeasibleSolution and house. Empty if no column matches the filters.
         """
-        self.launch_SP_multiprocessing(scenario, Scn_ID, Pareto_ID, None, None, initiation=False)
+        filters = dict(Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, FeasibleSolution=FeasibleSolution)
+        columns = {}
+        keys = self.results_SP.keys_matching(**filters)
+        if exclude:
+            keys = [key for key in keys if (key[3], key[4]) not in exclude]
+            filters['solutions'] = [(key[3], key[4]) for key in keys]
+        if len(keys) == 0:
+            return columns  # e.g. all the solutions of the last iteration were rediscovered
+
+        df_Performance = self.results_SP.select('df_Performance', **filters)
+        df_Performance = df_Performance.drop(index='Network', level='Hub').groupby(level=['Scn_ID', 'Pareto_ID', 'FeasibleSolution', 'Hub']).head(1).droplevel('Hub')
+        df_Grid_t = np.round(self.results_SP.select('df_Grid_t', **filters), 6)
+        df_Buildings = self.results_SP.select('df_Buildings', **filters)
+        df_Buildings = df_Buildings[df_Buildings.index.get_level_values('house') == df_Buildings.index.get_level_values('Hub')].droplevel('Hub')
+
+        df_Performance, df_Grid_t, df_Buildings = [df.droplevel(['Scn_ID', 'Pareto_ID']) for df in [df_Performance, df_Grid_t, df_Buildings]]
+
+        df_Performance = df_Performance.droplevel(level='Iter')
+        df_Grid_t = df_Grid_t.droplevel(level=['Iter', 'Hub']).reorder_levels(['Layer', 'FeasibleSolution', 'house', 'Period', 'Time'])
+        df_Buildings = df_Buildings.droplevel(level='Iter')
+
+        columns['Costs_inv_rep_SPs'] = df_Performance.Costs_inv + df_Performance.Costs_rep
+        columns['Costs_ft_SPs'] = pd.DataFrame(np.round(df_Performance.Costs_ft, 6)).set_axis(['Costs_ft_SPs'], axis=1)
+        columns['GWP_house_constr_SPs'] = pd.DataFrame(df_Performance.GWP_constr).set_axis(['GWP_house_constr_SPs'], axis=1)
+        columns['df_grid'] = df_Grid_t[['Grid_demand', 'Grid_supply']]
+
+        if self.method['actors_problem']:
+            df_Unit_t = self.results_SP.select('df_Unit_t', **filters).xs("Electricity", level="Layer")
+            df_PV_t = pd.DataFrame()
+            for bui in self.infrastructure.houses:
+                if "PV_" + bui in df_Unit_t.index.unique("Unit"):
+                    df_PV_t = pd.concat([df_PV_t, df_Unit_t.xs("PV_" + bui, level="Unit")])
+            columns["PV_prod"] = df_PV_t["Units_supply"].droplevel(["Scn_ID", "Pareto_ID", "Iter"])
+
         if self.method['renovation'] is not None:
-            for option in self.method['renovation']:
-                self.launch_SP_multiprocessing(scenario, Scn_ID, Pareto_ID, None, None, initiation=False, renovation_options=option)
+            columns["Uh_ins"] = df_Buildings[["U_h"]].rename(columns={"U_h": "Uh_ins"})
 
+        return columns
 
-    def SP_execution(self, scenario, Scn_ID, Pareto_ID, h, renovation_options=None):
+    def get_SP_context(self):
         """
-        Inserts dual variables in ampl model, apply scenario, adapt model depending on the methods and get results.
+        Returns a copy of the object holding only the inputs of the SPs, without the results of the optimization.
 
-        Parameters
-        ----------
-        scenario: dictionary
+        It is given once to each worker of the pool at its creation, so that the SP tasks only carry the house and its dual variables.
+        """
+        context = copy.copy(self)
+        context.tables = dict()  # not shared with self by the shallow copy, filled below
+        for attribute in ['results_SP', 'results_MP', 'results', 'column_hashes', 'SP_duals', 'column_ages', 'archived_columns',
+                          'last_SP_solves']:
+            setattr(context, attribute, dict())
+        for attribute in ['number_SP_solutions', 'number_MP_solutions', 'solver_attributes_SP', 'solver_attributes_MP',
+                          'solver_attributes', 'reduced_costs', 'stopping_criteria']:
+            setattr(context, attribute, pd.DataFrame())
+        context.period_frequency = None
+        if not (self.method['use_facades'] or self.method['use_pv_orientation']):
+            context.qbuildings_data = {'buildings_data': self.buildings_data}  # roofs and facades are not used
+        return context
+
+    def get_SP_context_fingerprint(self):
+        """
+        Returns the fingerprint of the inputs of the SPs, without the results and the bookkeeping of the decomposition.
 
-        Scn_ID : int
-            scenario ID
-        Pareto_ID : int
-            pareto ID
-        h : string
-            house ID
+        The inputs usually edited in place between two runs, e.g. ``parameters`` or ``buildings_data``, are hashed.
+        The other ones, e.g. the weather data or the infrastructure, are replaced rather than edited and are only
+        compared by identity, so that they are not pickled at each decomposition.
 
         Returns
         -------
-        df_Results :
-            results of the optimization (unit installed, power exchanged, costs, GWP emissions, ...)
-        attr :
-            results of the optimization process (CPU time, objective value, nb variables or constraints, ...)
+        fingerprint : tuple
+            (hash of the inputs edited in place, ((attribute, value) of the other inputs)), see ``same_SP_context``.
+        """
+        state = self.__getstate__()
+        for attribute in ['iter', 'feasible_solutions', 'flags', 'SP_models_token', 'MP_columns_sent', 'MP_columns_archived', '_number_MP_solutions', 'mispricing',
+                          'scenario', 'nPareto', 'total_Pareto', 'epsilon_constraints', 'checkpoint_run', 'DW_resume', 'resuming', 'logger',
+                          'tables', 'period_frequency', 'results_SP', 'results_MP', 'results', 'column_hashes', 'SP_duals', 'column_ages',
+                          'archived_columns', 'last_SP_solves', 'number_SP_solutions', 'number_MP_solutions', 'solver_attributes_SP',
+                          'solver_attributes_MP', 'solver_attributes', 'reduced_costs', 'stopping_criteria']:
+            state.pop(attribute, None)
+        edited = {attribute: state.pop(attribute) for attribute in ['parameters', 'set_indexed', 'buildings_data', 'method', 'DW_params', 'cluster']
+                  if attribute in state}
+        return hashlib.md5(pickle.dumps(edited)).hexdigest(), tuple(sorted(state.items(), key=lambda item: item[0]))
 
-        Raises
-        ------
-        ValueError: If the SP optimization did not converge
+    @staticmethod
+    def same_SP_context(fingerprint, other):
         """
-        self.logger.info('iterate HOUSE: ' + h + 'iteration: ' + str(self.iter))
+        Returns True if two fingerprints given by ``get_SP_context_fingerprint`` describe the same inputs of the SPs.
+        """
+        if fingerprint is None or other is None or fingerprint[0] != other[0] or len(fingerprint[1]) != len(other[1]):
+            return False
+        return all(name == other_name and value is other_value for (name, value), (other_name, other_value) in zip(fingerprint[1], other[1]))
 
-        # Give dual variables to Subproblem
-        pi = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter - 1, h, 'pi').reorder_levels(['Layer', 'Period', 'Time'])
-        pi_GWP = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter - 1, h, 'pi_GWP').reorder_levels(['Layer', 'Period', 'Time'])
-        pi_h = pd.concat([pi], keys=[h], names=['Building']).reorder_levels(['Building', 'Layer', 'Period', 'Time'])
+    def get_SP_pool(self):
+        """
+        Returns the backend executing the SPs, started at the first decomposition and reused by the next ones.
 
-        parameters_SP = {'Cost_supply_network': pi,
-                         'Cost_demand_network': pi * (1 - 1e-9),
-                         'Cost_supply': pi_h,
-                         'Cost_demand': pi_h * (1 - 1e-9),
-                         'GWP_supply': pi_GWP,
-                         'GWP_demand': pi_GWP.mul(0),  # set emissions of feed in to 0 -> changed in  postcompute
-                         }
+        The workers hold a copy of the inputs of the SPs, see ``get_SP_context``. The backend is therefore restarted
+        when these inputs changed since its start, e.g. when the parameters are modified between two runs of a
+        sensitivity analysis. Only the parameters, set_indexed, buildings_data, method, DW_params and cluster can be
+        edited in place, the other inputs (e.g. the infrastructure) must be replaced, see ``get_SP_context_fingerprint``.
 
-        if self.method['actors_problem']:
-            parameters_SP.update(actors.get_actor_parameters(self.scenario, self.set_indexed, self.results_MP, Scn_ID, Pareto_ID, self.iter, h))
-        # find district structure, objective, beta and parameter for one single building
-        buildings_data_SP, parameters_SP, set_indexed_SP = self.split_parameter_sets_per_building(h, parameters_SP)
-        beta = - self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter - 1, h, 'beta')
-        scenario, beta_list = self.get_beta_values(scenario, beta)
-        parameters_SP['beta_duals'] = beta_list
+        Returns
+        -------
+        pool : workers.Executor or None
+            None if the SPs are not computed in parallel.
+        """
+        if not self.method['parallel_computation']:
+            return None
+        fingerprint = self.get_SP_context_fingerprint()
+        if self.pool is None or not self.same_SP_context(fingerprint, self.pool_fingerprint):
+            self.close_SP_pool()
+            self.pool = self.create_SP_pool()
+            self.pool_fingerprint = fingerprint
+            # the workers are stopped when the object is deleted or at exit, if the pool was not closed before
+            self.pool_finalizer = weakref.finalize(self, self.pool.terminate)
+        return self.pool
+
+    def create_SP_pool(self, context=None):
+        """
+        Starts the backend executing the SPs, with workers initialized with the inputs of the SPs.
 
-        if renovation_options is not None:
-            buildings_data_SP[h]['U_h'], parameters_SP['Costs_ins'], parameters_SP['GWP_ins'] = renovation.renovation_cost_co2(buildings_data_SP[h], self.local_data, renovation_options)
-            buildings_data_SP[h]["renovation"] = renovation_options
+        Parameters
+        ----------
+        context : MasterProblem, optional
+            Inputs of the SPs, by default ``get_SP_context()``.
 
-        # Execute optimization
-        if self.method['use_facades'] or self.method['use_pv_orientation']:
-            REHO = SubProblem(self.infrastructure_SP[h], buildings_data_SP, self.local_data, parameters_SP, set_indexed_SP, self.cluster,
-                              scenario, self.method, self.solver, self.qbuildings_data)
-        else:
-            REHO = SubProblem(self.infrastructure_SP[h], buildings_data_SP, self.local_data, parameters_SP, set_indexed_SP, self.cluster,
-                              scenario, self.method, self.solver)
+        Returns
+        -------
+        pool : workers.Executor
+            Backend given by ``DW_params['executor']``, its tasks pinned per house if ``DW_params['persistent_SP']``.
+        """
+        executor = self.DW_params['executor']
+        if executor == 'processes':
+            executor = workers.ProcessExecutor(self.cpu_use)
+        elif executor == 'threads':
+            executor = workers.FuturesExecutor(self.cpu_use)
+        elif not isinstance(executor, workers.Executor):
+            raise Exception("The executor should be 'processes', 'threads' or a workers.Executor, got " + str(executor))
+
+        if context is None:
+            context = self.get_SP_context()
+        return executor.start(workers.init_worker, (context,), pinned=self.DW_params['persistent_SP'])
+
+    def close_SP_pool(self, terminate=False):
+        """
+        Stops the workers of the backend executing the SPs, if any.
 
-        ampl = REHO.build_model_without_solving()
+        Parameters
+        ----------
+        terminate : bool, optional
+            If True, the workers are stopped without waiting for their tasks, e.g. after an error or a SP that timed out
+            and is still running. Otherwise, the tasks submitted are completed first.
+        """
+        if self.pool is not None:
+            if getattr(self, 'pool_finalizer', None) is not None:
+                self.pool_finalizer.detach()
+                self.pool_finalizer = None
+            if terminate:
+                self.pool.terminate()
+            else:
+                self.pool.close()
+            self.pool = None
+            self.pool_fingerprint = None
 
-        if self.method['fix_units']:
-            for unit in self.df_fix_Units.index[self.df_fix_Units.index.str.contains(h)]:
-                if unit == 'PV_' + h:
-                    ampl.getVariable('Units_Mult').get(unit).fix(self.df_fix_Units.Units_Mult.loc[unit] * (1 - 1e-9))
-                    ampl.getVariable('Units_Use').get(unit).fix(float(self.df_fix_Units.Units_Use.loc[unit]))
+    def save_checkpoint(self):
+        """
+        Writes the state of the optimization in the file ``DW_params['checkpoint']``, if any.
+
+        The whole object is pickled, with the results and the bookkeeping of the decomposition (iteration, flags, column
+        pool, duals, stopping criteria...), but without the workers and the AMPL models. The file is replaced
+        atomically, so that a run interrupted while writing a checkpoint keeps the previous one.
+        """
+        path = self.DW_params['checkpoint']
+        if path is None:
+            return
+        # written to a temporary file of its own, then moved: the file is never read or replaced partially written
+        with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp', delete=False) as tmp:
+            try:
+                pickle.dump(self, tmp)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            except BaseException:
+                tmp.close()
+                os.remove(tmp.name)
+                raise
+        try:
+            os.replace(tmp.name, path)
+        except OSError:
+            os.remove(tmp.name)
+            raise
+
+    def checkpoint_decomposition(self, Scn_ID, Pareto_ID):
+        """
+        Writes a checkpoint at the end of an iteration of the decomposition, every ``DW_params['checkpoint_every']`` iterations.
+        """
+        if self.DW_params['checkpoint'] is None or self.iter % self.DW_params['checkpoint_every'] != 0:
+            return
+        self.DW_resume = {'Scn_ID': Scn_ID, 'Pareto_ID': Pareto_ID, 'iter': self.iter}
+        self.save_checkpoint()
+
+    def start_checkpoint_run(self, method, **kwargs):
+        """
+        Records the optimization to continue when resuming from a checkpoint, unless it is called by another one.
+
+        Returns
+        -------
+        outer : bool
+            True if the method is the optimization recorded, to give to ``end_checkpoint_run``.
+        """
+        if self.checkpoint_run is not None:
+            return False
+        self.checkpoint_run = (method, kwargs)
+        return True
+
+    def end_checkpoint_run(self, outer):
+        """
+        Writes a checkpoint after an optimization, the run being completed if it is the optimization recorded.
+        """
+        self.DW_resume = None
+        if outer:
+            self.checkpoint_run = None
+            self.resuming = False
+        self.save_checkpoint()
+
+    def close_persistent_MP(self):
+        """
+        Closes the master problem kept between the iterations of a decomposition.
+        """
+        if self.ampl_MP is not None:
+            self.ampl_MP.close()
+            self.ampl_MP = None
+        self.MP_columns_sent = np.array([])
+        self.MP_columns_archived = set()
+
+    def init_ampl_MP(self, read_DHN=False):
+        """
+        Creates the AMPL master problem and loads its model files and the clustering data.
+
+        Parameters
+        ----------
+        read_DHN : bool
+            Whether the DHN model has to be loaded.
+
+        Returns
+        -------
+        ampl_MP : AMPL
+            Master problem without the data of the SP columns.
+        """
+        if "AMPL_PATH" in os.environ:
+            try:
+                ampl_MP = AMPL(Environment(os.environ["AMPL_PATH"]))
+            except:
+                raise Exception(f"Failed to use the local AMPL license as specified by AMPL_PATH: {os.environ['AMPL_PATH']}.")
+        else:
+            try:
+                from amplpy import modules
+                modules.load()
+                ampl_MP = AMPL()
+            except:
+                raise Exception(
+                    "No AMPL license was found. Please refer to the documentation to set the AMPL license: https://reho.readthedocs.io/en/main/sections/5_Getting_started.html#ampl-license")
+
+        # AMPL (GNU) OPTIONS
+        ampl_MP.setOption('solution_round', 11)
+        ampl_MP.setOption('rel_boundtol', 1e-12)
+        ampl_MP.setOption('presolve_eps', 1e-4)  # -ignore difference between upper and lower bound by this tolerance
+        ampl_MP.setOption('presolve_inteps', 1e-6)  # -tolerance added/substracted to each upper/lower bound
+        ampl_MP.setOption('presolve_fixeps', 1e-9)
+        if not self.method['print_logs']:
+            ampl_MP.setOption('show_stats', 0)
+            ampl_MP.setOption('solver_msg', 0)
+
+        # -SOLVER OPTIONS
+        ampl_MP.setOption('solver', self.solver)
+        if self.solver == "gurobi":
+            ampl_MP.eval("option gurobi_options 'NodeFileStart=0.5' 'IntFeasTol=1e-6';")
+
+        ampl_MP.eval('option show_boundtol 0;')
+        ampl_MP.eval('option abs_boundtol 1e-10;')
+
+        # Load Master Problem (MP) Formulation
+        ampl_MP.cd(path_to_ampl_model)
+        ampl_MP.read('master_problem.mod')
+
+        if self.method["actors_problem"]:
+            ampl_MP.read('actors_problem.mod')
+
+        # Load battery units (district-scale, but same model as building-scale)
+        ampl_MP.cd(path_to_units)
+        if "Battery_district" in self.infrastructure.UnitsOfDistrict:
+            ampl_MP.read('battery.mod')
+
+        # Load district units
+        ampl_MP.cd(path_to_district_units)
+        if len(self.infrastructure.UnitsOfDistrict) > 0:
+            ampl_MP.cd(path_to_district_units)
+            if "Mobility" in self.infrastructure.UnitsOfLayer:
+                ampl_MP.read('mobility.mod')
+            if "EV_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read('evehicle.mod')
+            if "Bike_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read('bike.mod')
+            if "ElectricBike_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read('ebike.mod')
+            if "ICE_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read('icevehicle.mod')
+            if "NG_Boiler_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read('ng_boiler_district.mod')
+            if "HeatPump_Geothermal_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read('heatpump_district.mod')
+            if "NG_Cogeneration_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read('ng_cogeneration_district.mod')
+            if "rSOC_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read('rsoc_district.mod')
+            if "MTR_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read('methanator_district.mod')
+            if "ElectricalHeater_other_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read('electrical_heater_district.mod')
+            if "Datacenter_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read('datacenter_district.mod')
+            if "ORC_DC_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read('ORC_DC_district.mod')
+        if read_DHN:
+            ampl_MP.read('dhn.mod')
+
+        # Load interperiod storage units
+        ampl_MP.cd(path_to_units_interperiod)
+        if self.method["interperiod_storage"]:
+            if "Battery_IP_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read("battery_IP.mod")
+            if "CH4_storage_IP_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read("CH4storage_IP.mod")
+            if "H2_storage_IP_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read("H2storage_IP.mod")
+            if "CO2_storage_IP_district" in self.infrastructure.UnitsOfDistrict:
+                ampl_MP.read("CO2storage_IP.mod")
+
+        clustering_directory = os.path.join(path_to_clustering, self.local_data['File_ID'])
+        ampl_MP.cd(clustering_directory)
+
+        ampl_MP.readData('frequency.csv')
+        ampl_MP.readData('index.csv')
+        ampl_MP.cd(path_to_ampl_model)
+
+        return ampl_MP
+
+    def SP_iteration(self, scenario, Scn_ID=0, Pareto_ID=1):
+        """
+        Sets up the parallel optimization if needed.
+
+        Parameters
+        ----------
+        scenario : dictionary
+
+        Scn_ID : int
+            scenario ID
+        Pareto_ID: int
+            pareto ID
+        """
+        self.launch_SP_multiprocessing(scenario, Scn_ID, Pareto_ID, None, None, initiation=False)
+        if self.method['renovation'] is not None:
+            for option in self.method['renovation']:
+                self.launch_SP_multiprocessing(scenario, Scn_ID, Pareto_ID, None, None, initiation=False, renovation_options=option)
+
+
+    def SP_execution(self, scenario, Scn_ID, Pareto_ID, h, renovation_options=None):
+        """
+        Inserts dual variables in ampl model, apply scenario, adapt model depending on the methods and get results.
+
+        Parameters
+        ----------
+        scenario: dictionary
+
+        Scn_ID : int
+            scenario ID
+        Pareto_ID : int
+            pareto ID
+        h : string
+            house ID
+
+        Returns
+        -------
+        df_Results :
+            results of the optimization (unit installed, power exchanged, costs, GWP emissions, ...)
+        attr :
+            results of the optimization process (CPU time, objective value, nb variables or constraints, ...)
+
+        Raises
+        ------
+        ValueError: If the SP optimization did not converge
+
+        See also
+        --------
+        get_SP_dual_parameters, SP_solve : the two steps of this method, executed separately in a parallel computation
+        """
+        scenario, parameters_SP = self.get_SP_dual_parameters(scenario, Scn_ID, Pareto_ID, h)
+        return self.SP_solve(scenario, Scn_ID, Pareto_ID, h, parameters_SP, renovation_options)
+
+    def get_SP_dual_parameters(self, scenario, Scn_ID, Pareto_ID, h):
+        """
+        Gets the dual variables of the last MP for one house, which are the only inputs of a SP changing between iterations.
+
+        Parameters
+        ----------
+        scenario: dictionary
+
+        Scn_ID : int
+            scenario ID
+        Pareto_ID : int
+            pareto ID
+        h : string
+            house ID
+
+        Returns
+        -------
+        scenario : dictionary
+            scenario of the SP, with the objective function using the beta values
+        parameters_SP : dict
+            dual variables to give to the SP (pi, pi_GWP, beta and the actors duals)
+        """
+        self.logger.info('iterate HOUSE: ' + h + 'iteration: ' + str(self.iter))
+
+        # Give dual variables to Subproblem
+        duals = self.get_SP_duals(Scn_ID, Pareto_ID)
+        pi = duals['pi'].reorder_levels(['Layer', 'Period', 'Time'])
+        pi_GWP = duals['pi_GWP'].reorder_levels(['Layer', 'Period', 'Time'])
+        pi_h = pd.concat([pi], keys=[h], names=['Building']).reorder_levels(['Building', 'Layer', 'Period', 'Time'])
+
+        parameters_SP = {'Cost_supply_network': pi,
+                         'Cost_demand_network': pi * (1 - 1e-9),
+                         'Cost_supply': pi_h,
+                         'Cost_demand': pi_h * (1 - 1e-9),
+                         'GWP_supply': pi_GWP,
+                         'GWP_demand': pi_GWP.mul(0),  # set emissions of feed in to 0 -> changed in  postcompute
+                         }
+
+        if self.method['actors_problem']:
+            parameters_SP.update(actors.get_actor_parameters(self.scenario, self.set_indexed, self.results_MP, Scn_ID, Pareto_ID, self.iter, h))
+        beta = - duals['beta']
+        scenario, beta_list = self.get_beta_values(scenario, beta)
+        parameters_SP['beta_duals'] = beta_list
+
+        return scenario, parameters_SP
+
+    def get_SP_duals(self, Scn_ID, Pareto_ID):
+        """
+        Returns the dual variables pi, pi_GWP and beta given to the SPs of the current iteration.
+
+        These are the duals of the last MP, stabilized according to ``DW_params['dual_stabilization']``:
+
+        - 'smoothing' (Wentges): ``alpha * center + (1 - alpha) * duals_MP``, with alpha ``DW_params['smoothing_alpha']``
+        - 'box': the duals of the MP are kept in a box around the center, of half-width ``DW_params['dual_box']`` times
+          the magnitude of the center
+
+        The stability center is the duals given to the SPs at the previous iteration. After a mispricing, i.e. when the
+        SPs solved with stabilized duals found no improving column (see ``check_Termination_criteria``), the SPs
+        receive the duals of the MP without stabilization.
+
+        Parameters
+        ----------
+        Scn_ID : int
+            scenario ID
+        Pareto_ID : int
+            pareto ID
+
+        Returns
+        -------
+        duals : dict
+            Series of the dual variables 'pi', 'pi_GWP' and 'beta'
+        """
+        key = (Scn_ID, Pareto_ID, self.iter)
+        if key in self.SP_duals:
+            return self.SP_duals[key]  # the same for all houses
+
+        duals_MP = {name: self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter - 1, None, name) for name in ['pi', 'pi_GWP', 'beta']}
+        center = self.SP_duals.get((Scn_ID, Pareto_ID, self.iter - 1))
+        mode = self.DW_params['dual_stabilization']
+
+        duals = dict(duals_MP)
+        if mode is not None and center is not None and not self.mispricing:
+            for name in duals:
+                if mode == 'smoothing':
+                    alpha = self.DW_params['smoothing_alpha']
+                    duals[name] = alpha * center[name] + (1 - alpha) * duals_MP[name]
+                elif mode == 'box':
+                    width = self.DW_params['dual_box'] * np.maximum(center[name].abs(), center[name].abs().mean())
+                    duals[name] = duals_MP[name].clip(center[name] - width, center[name] + width)
                 else:
-                    ampl.getVariable('Units_Mult').get(unit).fix(self.df_fix_Units.Units_Mult.loc[unit])
-                    ampl.getVariable('Units_Use').get(unit).fix(float(self.df_fix_Units.Units_Use.loc[unit]))
+                    raise Exception("The dual stabilization should be None, 'smoothing' or 'box', got " + str(mode))
+
+        distance = np.nanmax([(duals[name] - duals_MP[name]).abs().max() for name in duals])
+        self.tables['dual_stabilization'].append({'Scn_ID': Scn_ID, 'Pareto_ID': Pareto_ID, 'Iter': self.iter, 'Mode': mode,
+                                                  'Mispricing': self.mispricing, 'Distance_to_MP_duals': distance})
+        self.mispricing = False
+        self.SP_duals[key] = duals
+        return duals
+
+    def get_SP_start(self, h, renovation_options=None):
+        """
+        Returns the last solution of the SP of a house, given as initial values of its variables to the next solve
+        if ``DW_params['SP_warm_start']``. Solvers supporting MIP starts use it as a first incumbent.
+
+        Parameters
+        ----------
+        h : string
+            house ID
+        renovation_options : str, optional
+            renovation option of the building
+
+        Returns
+        -------
+        start : dict or None
+            Values of the variables Units_Use and Units_Mult, and of Units_supply and Units_demand when they are in the
+            results (see the method ``save_timeseries``). None if the house was not solved yet.
+        """
+        if not self.DW_params['SP_warm_start'] or (h, renovation_options) not in self.last_SP_solves:
+            return None
+        df_Results = self.last_SP_solves[(h, renovation_options)][1]
+        start = {variable: df_Results['df_Unit'][variable] for variable in ['Units_Use', 'Units_Mult']}
+        for variable in ['Units_supply', 'Units_demand']:
+            if 'df_Unit_t' in df_Results and variable in df_Results['df_Unit_t']:
+                start[variable] = df_Results['df_Unit_t'][variable].dropna()
+        return start
+
+    def SP_solve(self, scenario, Scn_ID, Pareto_ID, h, parameters_SP, renovation_options=None, start=None):
+        """
+        Builds the SP of a house with the given dual variables, solves it and gets the results.
+        Does not need the results of the previous iterations, so that it can be executed by a worker holding only the inputs of the SPs.
+
+        Parameters
+        ----------
+        scenario: dictionary
+            scenario of the SP, as returned by get_SP_dual_parameters
+        Scn_ID : int
+            scenario ID
+        Pareto_ID : int
+            pareto ID
+        h : string
+            house ID
+        parameters_SP : dict
+            dual variables, as returned by get_SP_dual_parameters
+        renovation_options : str, optional
+            renovation option of the building
+        start : dict, optional
+            initial values of the variables, as returned by get_SP_start. Not needed by a warm model, whose variables
+            keep the values of its last solve.
+
+        Returns
+        -------
+        df_Results :
+            results of the optimization (unit installed, power exchanged, costs, GWP emissions, ...)
+        attr :
+            results of the optimization process (CPU time, objective value, nb variables or constraints, ...), with
+            'warm_start' telling if the solver started from a previous solution and 'transfer_time' the time spent
+            sending the data to AMPL
+        """
+        # the warm model only needs the values changing between iterations: the dual variables
+        model = None
+        if self.DW_params['persistent_SP']:
+            model = workers.get_warm_model(self.SP_models_token, (h, renovation_options))
+
+        if model is not None:
+            ampl = model['ampl']
+            buildings_data_SP = model['buildings_data']
+            start_transfer = time.perf_counter()
+            send_parameters_to_ampl(ampl, parameters_SP)
+            transfer_time = time.perf_counter() - start_transfer
+        else:
+            # find district structure and parameter for one single building
+            buildings_data_SP, parameters_SP, set_indexed_SP = self.split_parameter_sets_per_building(h, parameters_SP)
+
+            if renovation_options is not None:
+                buildings_data_SP[h]['U_h'], parameters_SP['Costs_ins'], parameters_SP['GWP_ins'] = renovation.renovation_cost_co2(buildings_data_SP[h], self.local_data, renovation_options)
+                buildings_data_SP[h]["renovation"] = renovation_options
+
+            # Execute optimization
+            if self.method['use_facades'] or self.method['use_pv_orientation']:
+                REHO = SubProblem(self.infrastructure_SP[h], buildings_data_SP, self.local_data, parameters_SP, set_indexed_SP, self.cluster,
+                                  scenario, self.method, self.solver, self.qbuildings_data)
+            else:
+                REHO = SubProblem(self.infrastructure_SP[h], buildings_data_SP, self.local_data, parameters_SP, set_indexed_SP, self.cluster,
+                                  scenario, self.method, self.solver)
+
+            ampl = REHO.build_model_without_solving()
+            transfer_time = REHO.transfer_time
+
+            if start is not None:
+                # initial values only, set before fixing the units which must keep their fixed values
+                for variable, values in start.items():
+                    ampl.getVariable(variable).setValues(values.rename(variable).to_frame())
+
+            if self.method['fix_units']:
+                for unit in self.df_fix_Units.index[self.df_fix_Units.index.str.contains(h)]:
+                    if unit == 'PV_' + h:
+                        ampl.getVariable('Units_Mult').get(unit).fix(self.df_fix_Units.Units_Mult.loc[unit] * (1 - 1e-9))
+                        ampl.getVariable('Units_Use').get(unit).fix(float(self.df_fix_Units.Units_Use.loc[unit]))
+                    else:
+                        ampl.getVariable('Units_Mult').get(unit).fix(self.df_fix_Units.Units_Mult.loc[unit])
+                        ampl.getVariable('Units_Use').get(unit).fix(float(self.df_fix_Units.Units_Use.loc[unit]))
+
+            if self.DW_params['persistent_SP']:
+                workers.store_warm_model(self.SP_models_token, (h, renovation_options), {'ampl': ampl, 'buildings_data': buildings_data_SP})
 
         ampl.solve()
         exitcode = exitcode_from_ampl(ampl)
 
         df_Results = write_results.get_df_Results_from_SP(ampl, scenario, self.method, buildings_data_SP)
         attr = self.get_solver_attributes(Scn_ID, Pareto_ID, ampl)
+        attr['warm_start'] = model is not None or start is not None
+        attr['transfer_time'] = transfer_time
 
-        del ampl
-        gc.collect()  # free memory
+        if not self.DW_params['persistent_SP']:
+            del ampl
+            gc.collect()  # free memory
 
         if exitcode != 0:
             # It might be that the solution is optimal with unscaled infeasibilities. So we check if we really found a solution (via its cost value)
@@ -823,6 +1620,8 @@ class MasterProblem:
 
         - Optimal solution found based on reduced costs -> last solutions proposed by the SPs did not improve the MP
         - No improvements
+        - Relative gap between the MP objective and the best Lagrangian lower bound below ``DW_params['optimality_gap']``,
+          see ``get_lagrangian_bound``
 
 
         Returns
@@ -852,82 +1651,43 @@ class MasterProblem:
         # --------------------------------------------------------------
         # optimal solution found based on reduced costs
         # --------------------------------------------------------------
-        last_SP_results = self.results_SP[Scn_ID][Pareto_ID][self.iter][self.feasible_solutions - 1]
-        last_MP_results = self.results_MP[Scn_ID][Pareto_ID][self.iter]
-
-        Cop = pd.DataFrame(dtype='float')
-        Cinv = pd.DataFrame(dtype='float')
-        rc_actors = pd.Series(dtype='float')
-
-        for h in last_SP_results:
-            df_Grid_t = pd.concat([last_SP_results[h]["df_Grid_t"]], keys=[(self.iter, self.feasible_solutions - 1, h)],
-                                  names=['Iter', 'FeasibleSolution', 'house'])
-            df_Grid_t = df_Grid_t.xs(h, level='Hub')
-            pi = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter, h, 'pi')
-            pi_GWP = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter, h, 'pi_GWP')
-
-            # Operation impact
-            Cop_h = self.get_annual_grid_opex(df_Grid_t, cost_demand=pi, cost_supply=pi)
-            Cop_h_GWP = self.get_annual_grid_opex(df_Grid_t, cost_demand=pi_GWP, cost_supply=pi_GWP)
-            Cop_h = pd.concat([Cop_h, Cop_h_GWP], axis=1)
-            Cop_h.columns = ["TOTEX", "GWP"]
-            Cop = pd.concat([Cop, Cop_h])
-
-            # Investment impact
-            df = last_SP_results[h]["df_Performance"].iloc[0]
-            Cinv_h = pd.Series(df.Costs_rep + df.Costs_inv, index=["TOTEX"])
-            Cinv_h_GWP = pd.Series(df.GWP_constr, index=["GWP"])
-            Cinv_h = pd.DataFrame(pd.concat([Cinv_h, Cinv_h_GWP])).transpose()
-            Cinv_h.index = Cop_h.index
-            Cinv = pd.concat([Cinv, Cinv_h])
-            if self.method['actors_problem']:
-                nu = {}
-                nu["Renters"] = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter, h, 'nu_Renters').dropna()
-                nu["Utility"] = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter, h, 'nu_Utility').dropna().iat[0]
-                nu["Owners"] = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter, h, 'nu_Owners').dropna()
-                if scenario['Objective'] == "TOTEX_actor":
-                    nu[self.set_indexed["ActorObjective"][0]] = 1.0
-                rc_actors[h] = nu["Renters"][h] * actors.get_actor_expenses('Renters', h, last_MP_results=last_MP_results, last_SP_results=last_SP_results)\
-                               +nu["Utility"] * actors.get_actor_expenses('Utility', h, last_MP_results=last_MP_results, last_SP_results=last_SP_results)\
-                               +nu["Owners"][h] * actors.get_actor_expenses('Owner', h, last_MP_results=last_MP_results, last_SP_results=last_SP_results)
-
-        # calculate objective function for each Pareto_ID with latest dual values
-        reduced_cost = pd.DataFrame()
-        for h in last_SP_results:
-            mu = self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter, h, 'mu')
-            Cop_house = Cop.xs((self.iter, self.feasible_solutions - 1, h))
-            Cinv_house = Cinv.xs((self.iter, self.feasible_solutions - 1, h))
-            obj_fct = pd.Series([Cinv_house["TOTEX"], Cop_house["TOTEX"]], index=["CAPEX", "OPEX"])
-            impacts = Cop_house + Cinv_house
-            obj_fct = pd.concat([obj_fct, impacts.replace(np.nan, 0)])
-
-            beta = - self.get_dual_values_SPs(Scn_ID, Pareto_ID, self.iter, h, "beta")
-            if beta.sum() == 0 and len(scenario["EMOO"].keys()) > 1:
-                warnings.warn('beta value = 0')
-            beta_penalty = sum(beta * obj_fct)
-
-            Costs_ft = last_SP_results[h]["df_Performance"].iloc[0].Costs_ft
-            if self.method['actors_problem']:
-                if scenario['Objective'] == "TOTEX_actor":
-                    reduced_cost_h = Costs_ft + beta_penalty - mu - rc_actors[h]
-                else:
-                    reduced_cost_h = obj_fct[scenario['Objective']] + Costs_ft + beta_penalty - mu - rc_actors[h]
-            else:
-                reduced_cost_h = obj_fct[scenario['Objective']] + Costs_ft + beta_penalty - mu
-            reduced_cost.at[h, 'Reduced_cost'] = reduced_cost_h
+        houses = list(self.results_SP[Scn_ID][Pareto_ID][self.iter][self.feasible_solutions - 1])
+        reduced_cost = self.get_reduced_costs(scenario, Scn_ID, Pareto_ID, houses)
 
         if (reduced_cost.Reduced_cost >= self.DW_params['threshold_subP_value']).all():
             optimal_criteria = True
         else:
             optimal_criteria = False
 
+        if optimal_criteria and self.SP_duals_stabilized(Scn_ID, Pareto_ID):
+            # mispricing: the SPs did not see the duals of the MP -> solve them once more with these duals before stopping
+            optimal_criteria = False
+            self.mispricing = True
+
+        # --------------------------------------------------------------
+        # optimality gap between the MP objective and the Lagrangian lower bound
+        # --------------------------------------------------------------
+        upper_bound = solving_attributes.val_objective.values[-1]
+        lower_bound = self.get_lagrangian_bound(scenario, Scn_ID, Pareto_ID)
+        best_lower_bound = lower_bound
+        if not self.stopping_criteria.empty and 'best_lower_bound' in self.stopping_criteria:
+            previous = self.select_pareto_rows(self.stopping_criteria, Scn_ID, Pareto_ID)['best_lower_bound'].dropna()
+            if not previous.empty and not lower_bound >= previous.max():  # also when the bound of this iteration is nan
+                best_lower_bound = previous.max()
+        if upper_bound != 0 and not np.isnan(best_lower_bound):
+            gap = (upper_bound - best_lower_bound) / abs(upper_bound)
+        else:
+            gap = np.nan
+        gap_criteria = self.DW_params['optimality_gap'] is not None and gap <= self.DW_params['optimality_gap']
+
         # --------------------------------------------------------------
         # construct dataframe
         # --------------------------------------------------------------
         mux = pd.MultiIndex.from_tuples([(Scn_ID, Pareto_ID, self.iter)], names=['Scn_ID', 'Pareto_ID', 'Iter'])
-        df = pd.DataFrame([[iter_criteria, optimal_criteria]], columns=['max_iter_no_improv_reached', 'all_optimal'], index=mux)
+        df = pd.DataFrame([[iter_criteria, optimal_criteria, gap_criteria]], columns=['max_iter_no_improv_reached', 'all_optimal', 'gap_reached'], index=mux)
 
-        df_value = pd.DataFrame([[no_improvments, reduced_cost.sum()]], columns=['iterations_no_improvement', 'total_reduced_cost'], index=mux)
+        df_value = pd.DataFrame([[no_improvments, reduced_cost.sum(), upper_bound, lower_bound, best_lower_bound, gap]],
+                                columns=['iterations_no_improvement', 'total_reduced_cost', 'upper_bound', 'lower_bound', 'best_lower_bound', 'gap'], index=mux)
         df_criteria = pd.concat([df, df_value], axis=1)
         self.stopping_criteria = pd.concat([self.stopping_criteria, df_criteria])
 
@@ -937,6 +1697,232 @@ class MasterProblem:
 
         return df.any(axis=None)
 
+    def get_lagrangian_bound(self, scenario, Scn_ID=0, Pareto_ID=1):
+        """
+        Computes the Lagrangian lower bound given by the SPs of the current iteration.
+
+        The SPs of the iteration were solved with the duals of the previous MP. The objective of this MP plus the
+        smallest reduced cost of each house at these duals is then a lower bound of the linear relaxation of the MP
+        with all the possible columns. The reduced cost of a house is at most 0, as the columns chosen by the MP have a
+        reduced cost of 0.
+
+        Returns
+        -------
+        lower_bound : float
+            nan if the SPs did not see the duals of the MP, i.e. when their duals were stabilized, some SPs were
+            skipped (``SP_skip_tolerance``) or solutions were replicated to the buildings of an archetype.
+
+        Notes
+        -----
+        The bound assumes the SPs are solved to optimality. With a MIP gap in the SPs, it is only approximate.
+        """
+        if self.iter < 1 or self.SP_duals_stabilized(Scn_ID, Pareto_ID) or any(len(members) > 1 for members in self.archetypes.values()):
+            return np.nan
+        df = self.SP_dual_changes
+        if not df.empty and df[(df.Scn_ID == Scn_ID) & (df.Pareto_ID == Pareto_ID) & (df.Iter == self.iter)].Skipped.any():
+            return np.nan
+
+        solving_attributes = self.solver_attributes_MP.xs((Scn_ID, Pareto_ID), level=('Scn_ID', 'Pareto_ID'))
+        MP_objective = solving_attributes.val_objective.loc[self.iter - 1]
+
+        # all the SP solutions of the iteration, e.g. one per renovation option
+        reduced_costs = []
+        for SP_results in self.results_SP[Scn_ID][Pareto_ID][self.iter].values():
+            reduced_costs.append(self.get_reduced_costs(scenario, Scn_ID, Pareto_ID, list(SP_results), SP_results=SP_results, MP_iter=self.iter - 1))
+        reduced_cost = pd.concat(reduced_costs).Reduced_cost.groupby(level=0).min()
+        return MP_objective + reduced_cost.clip(upper=0).sum()
+
+    @staticmethod
+    def select_pareto_rows(df, Scn_ID, Pareto_ID):
+        """
+        Returns the rows of a table of the decomposition belonging to a Pareto point, given by its columns or its index.
+        """
+        if df.empty:
+            return df
+        if 'Pareto_ID' in df.columns:
+            return df[(df.Scn_ID == Scn_ID) & (df.Pareto_ID == Pareto_ID)]
+        return df[(df.index.get_level_values('Scn_ID') == Scn_ID) & (df.index.get_level_values('Pareto_ID') == Pareto_ID)]
+
+    def SP_duals_stabilized(self, Scn_ID, Pareto_ID):
+        """
+        Tells if the SPs of the current iteration were given stabilized duals, different from the duals of the MP.
+        """
+        df = self.dual_stabilization
+        if df.empty:
+            return False
+        df = df[(df.Scn_ID == Scn_ID) & (df.Pareto_ID == Pareto_ID) & (df.Iter == self.iter)]
+        return bool((df.Distance_to_MP_duals > 0).any())
+
+    def update_column_pool(self, scenario, Scn_ID=0, Pareto_ID=1):
+        """
+        Ages out the columns that stay non-basic in the MP, and brings them back when they could improve it again.
+
+        A column (FeasibleSolution, house) is non-basic when its lambda is 0 with a positive reduced cost. After
+        ``DW_params['column_age_limit']`` consecutive MPs where it is non-basic, the column is archived: it is not
+        given to the next MPs, but stays in ``results_SP``. The archived columns are priced at each iteration with the
+        duals of the last MP, see ``get_reduced_costs``, and are given again to the MP as soon as their reduced cost
+        is below ``DW_params['threshold_subP_value']``. The binary MP chooses among all the columns.
+
+        The lambda and the reduced cost of each column are recorded in ``column_pool``, with its status: 'active',
+        'archived' or 'restored'.
+
+        Parameters
+        ----------
+        scenario : dict
+            scenario of the SPs
+        Scn_ID : int
+            scenario ID
+        Pareto_ID : int
+            pareto ID
+        """
+        age_limit = self.DW_params['column_age_limit']
+        if age_limit is None:
+            return
+
+        if self.method['include_all_solutions']:
+            filters = {}
+        else:
+            filters = {'Scn_ID': Scn_ID, 'Pareto_ID': Pareto_ID}
+        keys = {(key[3], key[4]): key for key in self.results_SP.keys_matching(**filters)}
+        df_DW = self.results_MP[Scn_ID][Pareto_ID][self.iter]['df_DW']
+        table = self.tables['column_pool']
+
+        # price the columns archived at the previous iterations with the duals of the last MP
+        archived = {}
+        for (f, h) in self.archived_columns:
+            archived.setdefault(f, []).append(h)
+        for f, houses in archived.items():
+            SP_results = {h: self.results_SP.records[keys[(f, h)]] for h in houses}
+            reduced_cost = self.get_reduced_costs(scenario, Scn_ID, Pareto_ID, houses, SP_results=SP_results).Reduced_cost
+            for h in houses:
+                if reduced_cost[h] < self.DW_params['threshold_subP_value']:
+                    del self.archived_columns[(f, h)]
+                    self.column_ages[(f, h)] = 0
+                    status = 'restored'
+                else:
+                    status = 'archived'
+                table.append({'Scn_ID': Scn_ID, 'Pareto_ID': Pareto_ID, 'Iter': self.iter, 'FeasibleSolution': f, 'House': h,
+                              'lambda': 0.0, 'Reduced_cost': reduced_cost[h], 'Age': self.column_ages[(f, h)], 'Status': status})
+
+        # age the columns of the last MP
+        for (f, h), row in df_DW.reindex(list(keys)).iterrows():
+            if (f, h) in self.archived_columns or (f, h) in self.MP_columns_archived:
+                continue  # archived now or given to this MP fixed to 0
+            if row['lambda'] < 1e-6 and row['Reduced_cost'] > 1e-6:
+                self.column_ages[(f, h)] = self.column_ages.get((f, h), 0) + 1
+            else:
+                self.column_ages[(f, h)] = 0
+            if self.column_ages[(f, h)] >= age_limit:
+                self.archived_columns[(f, h)] = self.iter
+                status = 'archived'
+            else:
+                status = 'active'
+            table.append({'Scn_ID': Scn_ID, 'Pareto_ID': Pareto_ID, 'Iter': self.iter, 'FeasibleSolution': f, 'House': h,
+                          'lambda': row['lambda'], 'Reduced_cost': row['Reduced_cost'], 'Age': self.column_ages[(f, h)], 'Status': status})
+
+    def get_period_frequency(self):
+        """
+        Returns the frequency of the typical periods, the extreme periods being excluded (frequency 0).
+
+        It is read once per decomposition from the first SP results, see ``initiate_decomposition``.
+        """
+        if self.period_frequency is None:
+            ids = self.number_SP_solutions.iloc[0]
+            df_Time = self.results_SP[ids['Scn_ID']][ids['Pareto_ID']][ids['Iter']][ids['FeasibleSolution']][ids['House']]["df_Time"]
+            dp = df_Time.dp.copy()
+            dp.iloc[-2:] = 0
+            self.period_frequency = dp
+        return self.period_frequency
+
+    def get_reduced_costs(self, scenario, Scn_ID, Pareto_ID, houses, SP_results=None, MP_iter=None):
+        """
+        Computes the reduced costs of the last SP solutions with the dual values of the last MP, for all houses at once.
+
+        The grid exchanges of the houses are stacked in arrays (houses x timesteps), so that the operating costs valued
+        at the dual prices pi and pi_GWP are obtained with a single product, instead of one annual grid opex per house.
+
+        Parameters
+        ----------
+        scenario : dict
+        Scn_ID : int
+            scenario ID
+        Pareto_ID : int
+            pareto ID
+        houses : list
+            houses of the last SP solutions, in the order of the returned DataFrame
+        SP_results : dict, optional
+            {house: df_Results} of other SP solutions to price, e.g. the columns archived by ``update_column_pool``.
+            By default the last SP solutions.
+        MP_iter : int, optional
+            Iteration of the MP giving the dual values, by default the last one.
+
+        Returns
+        -------
+        reduced_cost : pd.DataFrame
+            Reduced cost of the last SP solution of each house, in the column 'Reduced_cost'.
+        """
+        if SP_results is None:
+            last_SP_results = self.results_SP[Scn_ID][Pareto_ID][self.iter][self.feasible_solutions - 1]
+        else:
+            last_SP_results = SP_results
+        if MP_iter is None:
+            MP_iter = self.iter
+        last_MP_results = self.results_MP[Scn_ID][Pareto_ID][MP_iter]
+
+        # grid exchanges of each house with the district, as arrays (houses x timesteps) on the timesteps of the duals,
+        # (Layer, Period, Time): the layers a house does not exchange count as 0
+        df_Dual_t = last_MP_results['df_Dual_t']
+        timesteps = df_Dual_t.index
+        supply, demand, performance = [], [], []
+        for h in houses:
+            df_Grid_t = last_SP_results[h]["df_Grid_t"].xs(h, level='Hub')
+            supply.append(df_Grid_t.Grid_supply.reindex(timesteps, fill_value=0).values)
+            demand.append(df_Grid_t.Grid_demand.reindex(timesteps, fill_value=0).values)
+            df_Performance = last_SP_results[h]["df_Performance"]
+            performance.append([df_Performance[c].values[0] for c in ['Costs_inv', 'Costs_rep', 'Costs_ft', 'GWP_constr']])
+        supply = np.vstack(supply)
+        demand = np.vstack(demand)
+        dp = self.get_period_frequency().reindex(timesteps.get_level_values('Period')).fillna(0).values
+
+        # operation impact, valued at the dual prices
+        Cop = pd.DataFrame(index=houses)
+        for impact, dual in [('TOTEX', 'pi'), ('GWP', 'pi_GWP')]:
+            prices = df_Dual_t[dual].values
+            Cop[impact] = ((prices * supply - prices * demand) * dp).sum(axis=1)
+
+        # investment impact
+        df_Performance = pd.DataFrame(performance, index=houses, columns=['Costs_inv', 'Costs_rep', 'Costs_ft', 'GWP_constr'])
+        Cinv = pd.DataFrame({'TOTEX': df_Performance.Costs_rep + df_Performance.Costs_inv, 'GWP': df_Performance.GWP_constr})
+
+        impacts = (Cop + Cinv).replace(np.nan, 0)
+        obj_fct = pd.concat([Cinv.TOTEX.rename('CAPEX'), Cop.TOTEX.rename('OPEX'), impacts], axis=1)
+
+        beta = - last_MP_results['df_beta']['beta']
+        if beta.sum() == 0 and len(scenario["EMOO"].keys()) > 1:
+            warnings.warn('beta value = 0')
+        beta_penalty = obj_fct.mul(beta, axis=1).sum(axis=1)
+
+        mu = last_MP_results['df_Dual']['mu'].reindex(houses)
+        reduced_cost = df_Performance.Costs_ft + beta_penalty - mu
+        if not (self.method['actors_problem'] and scenario['Objective'] == "TOTEX_actor"):
+            reduced_cost = reduced_cost + obj_fct[scenario['Objective']]
+
+        if self.method['actors_problem']:
+            nu = {}
+            nu["Renters"] = self.get_dual_values_SPs(Scn_ID, Pareto_ID, MP_iter, None, 'nu_Renters').dropna()
+            nu["Utility"] = self.get_dual_values_SPs(Scn_ID, Pareto_ID, MP_iter, None, 'nu_Utility').dropna().iat[0]
+            nu["Owners"] = self.get_dual_values_SPs(Scn_ID, Pareto_ID, MP_iter, None, 'nu_Owners').dropna()
+            if scenario['Objective'] == "TOTEX_actor":
+                nu[self.set_indexed["ActorObjective"][0]] = 1.0
+            rc_actors = pd.Series(dtype='float')
+            for h in houses:
+                rc_actors[h] = nu["Renters"][h] * actors.get_actor_expenses('Renters', h, last_MP_results=last_MP_results, last_SP_results=last_SP_results)\
+                               +nu["Utility"] * actors.get_actor_expenses('Utility', h, last_MP_results=last_MP_results, last_SP_results=last_SP_results)\
+                               +nu["Owners"][h] * actors.get_actor_expenses('Owner', h, last_MP_results=last_MP_results, last_SP_results=last_SP_results)
+            reduced_cost = reduced_cost - rc_actors
+
+        return pd.DataFrame({'Reduced_cost': reduced_cost.values}, index=houses)
+
     ####################################################################################################################
     #
     # THE FOLLOWING ATTRIBUTES ARE DOING DATA PROCESSING
@@ -944,6 +1930,68 @@ class MasterProblem:
     ####################################################################################################################
 
     def initialise_DW_params(self, DW_params, cluster, buildings_datas):
+        """
+        Sets the default hyperparameters of the decomposition.
+
+        Parameters
+        ----------
+        DW_params : dict
+            Hyperparameters given by the user.
+        cluster : dict
+            Clustering information, used to compute the number of timesteps.
+        buildings_datas : dict
+            Buildings of the district.
+
+        Returns
+        -------
+        DW_params : dict
+            Hyperparameters completed with the default values.
+
+        Notes
+        -----
+        - ``max_iter``: maximum number of iterations of the decomposition.
+        - ``iter_no_improv``: number of iterations without improvement of the MP objective after which the decomposition stops.
+        - ``threshold_subP_value``: reduced cost above which a SP solution is considered as not improving the MP.
+        - ``threshold_no_improv``: relative improvement of the MP objective below which an iteration counts as no improvement.
+        - ``persistent_SP``: keeps the SP models alive in the workers between iterations, only updating the dual values
+          before solving again. Saves the model building time, but each house keeps its own AMPL process open during the decomposition.
+        - ``persistent_MP``: keeps the MP model between iterations and only appends the new SP columns, instead of
+          rebuilding it with all the columns at each iteration.
+        - ``SP_timeout``: wall-clock time in seconds allowed to one SP in a parallel execution (None: no limit).
+        - ``SP_max_retries``: number of times a SP that failed or timed out is submitted again before raising an error.
+        - ``deduplicate_columns``: a SP solution with the same unit sizes and grid exchanges as a previous solution of
+          the house is not given to the MP, and is recorded in ``rediscovered_columns`` instead (default False: the MP has
+          one column per SP solution).
+        - ``dual_stabilization``: None (default), 'smoothing' or 'box'. Stabilizes the duals given to the SPs, which
+          otherwise oscillate between iterations, see ``get_SP_duals``. The distance between the duals of the MP and the
+          duals given to the SPs is recorded in ``dual_stabilization``.
+        - ``smoothing_alpha``: weight of the previous duals with the 'smoothing' stabilization.
+        - ``dual_box``: half-width of the box around the previous duals with the 'box' stabilization, relative to their magnitude.
+        - ``column_age_limit``: number of consecutive MPs where a column is non-basic before it is archived, i.e. left out
+          of the next MPs until its reduced cost becomes negative again (None: all the columns stay in the MP, default).
+          Bounds the size of the MP in long decompositions, see ``update_column_pool``.
+        - ``SP_skip_tolerance``: largest relative change of the duals of a house since its last solve for which its SP is
+          not solved again, its last solution being reused instead (None: all the SPs are solved, default). The skipped
+          solves are recorded in ``SP_dual_changes``, see ``skip_SP``.
+        - ``archetypes``: groups the buildings into archetypes of buildings with equal categories and close
+          attributes, see ``archetypes.group_buildings``. Only the first building of each archetype is solved, its
+          solution being scaled by ERA for the other buildings (default False).
+        - ``archetype_tolerances``: relative tolerance of each attribute of the buildings within an archetype
+          (None: ``archetypes.default_tolerances``).
+        - ``SP_warm_start``: gives the last solution of each SP as initial values of its variables at the next iteration,
+          see ``get_SP_start`` (default False). The column 'warm_start' of ``solver_attributes_SP`` tells which
+          solves started from a previous solution, to compare their solving time with the other ones.
+        - ``executor``: backend executing the SPs when ``parallel_computation`` is enabled. 'processes' (local processes,
+          default), 'threads' or a ``workers.Executor`` such as ``workers.SocketExecutor`` for workers on other machines.
+        - ``keep_SP_pool``: keeps the workers solving the SPs after an optimization (``single_optimization``,
+          ``generate_pareto_curve``, ...) for the next ones, until ``REHO.shutdown`` is called or the ``with`` block exits
+          (default False: the workers are stopped at the end of each optimization).
+        - ``checkpoint``: file in which the state of the optimization is written after each optimization and during the
+          decompositions (None: no checkpoint, default). An interrupted run is continued with ``REHO.resume_from``.
+        - ``checkpoint_every``: number of iterations of the decomposition between two checkpoints (default 1).
+        - ``optimality_gap``: relative gap between the MP objective and the best Lagrangian lower bound below which the
+          decomposition stops (None: the gap is only recorded in ``stopping_criteria``, default). See ``get_lagrangian_bound``.
+        """
         if 'timesteps' not in DW_params:
             DW_params['timesteps'] = cluster['Periods'] * cluster['PeriodDuration'] + 2
         if 'max_iter' not in DW_params:
@@ -960,6 +2008,42 @@ class MasterProblem:
             DW_params['grid_cost_exchange'] = 0.0
         if 'weight_lagrange_cst' not in DW_params:
             DW_params['weight_lagrange_cst'] = 2.0
+        if 'persistent_SP' not in DW_params:
+            DW_params['persistent_SP'] = False
+        if 'persistent_MP' not in DW_params:
+            DW_params['persistent_MP'] = False
+        if 'SP_timeout' not in DW_params:
+            DW_params['SP_timeout'] = None
+        if 'SP_max_retries' not in DW_params:
+            DW_params['SP_max_retries'] = 0
+        if 'deduplicate_columns' not in DW_params:
+            DW_params['deduplicate_columns'] = False
+        if 'dual_stabilization' not in DW_params:
+            DW_params['dual_stabilization'] = None
+        if 'smoothing_alpha' not in DW_params:
+            DW_params['smoothing_alpha'] = 0.5
+        if 'dual_box' not in DW_params:
+            DW_params['dual_box'] = 0.2
+        if 'column_age_limit' not in DW_params:
+            DW_params['column_age_limit'] = None
+        if 'SP_skip_tolerance' not in DW_params:
+            DW_params['SP_skip_tolerance'] = None
+        if 'archetypes' not in DW_params:
+            DW_params['archetypes'] = False
+        if 'archetype_tolerances' not in DW_params:
+            DW_params['archetype_tolerances'] = None
+        if 'SP_warm_start' not in DW_params:
+            DW_params['SP_warm_start'] = False
+        if 'executor' not in DW_params:
+            DW_params['executor'] = 'processes'
+        if 'keep_SP_pool' not in DW_params:
+            DW_params['keep_SP_pool'] = False
+        if 'checkpoint' not in DW_params:
+            DW_params['checkpoint'] = None
+        if 'checkpoint_every' not in DW_params:
+            DW_params['checkpoint_every'] = 1
+        if 'optimality_gap' not in DW_params:
+            DW_params['optimality_gap'] = None
         if self.method['building-scale']:
             DW_params['max_iter'] = 1
 
@@ -976,12 +2060,11 @@ class MasterProblem:
         MP_selection = lambdas[lambdas >= 0.999].index
 
         # get selected Units
-        df_Unit_all = self.return_combined_SP_results(self.results_SP, 'df_Unit')
-        df_Unit_all = df_Unit_all.reset_index(level='Unit')
+        df_Unit = self.results_SP.select('df_Unit', solutions=MP_selection.values).sort_index()
+        df_Unit = df_Unit.reset_index(level='Unit')
 
         # drop useless indices
-        df_Unit_all = df_Unit_all.droplevel(['Scn_ID', 'Pareto_ID', 'Iter'])
-        df_Unit = df_Unit_all[df_Unit_all.index.isin(MP_selection.values)]
+        df_Unit = df_Unit.droplevel(['Scn_ID', 'Pareto_ID', 'Iter'])
 
         # set index for further usage
         df_Unit = df_Unit.set_index('Unit', append=True)
@@ -1165,7 +2248,7 @@ class MasterProblem:
         df : pd.DataFrame
             Information on the optimization (CPU time, nb constraints, ...)
         """
-        time = ampl.getValue('_total_solve_time')
+        time = ampl.getValue('_solve_time')  # only the last solve, models can be solved several times
         constr = ampl.getValue('_ncons')
         pres_constr = ampl.getValue('_sncons')  # after presolve
         var = ampl.getValue('_nvars')
@@ -1187,13 +2270,12 @@ class MasterProblem:
 
     def sort_decomp_result(self, Scn_ID, idxvalues):
 
-        new_order_SPresults = {}
         new_order_MPresults = {}
         for id, sc in enumerate(idxvalues):
-            new_order_SPresults[id + 1] = self.results_SP[Scn_ID][sc]
             new_order_MPresults[id + 1] = self.results_MP[Scn_ID][sc]
 
-        self.results_SP[Scn_ID] = new_order_SPresults
+        self.results_SP.renumber_pareto(Scn_ID, idxvalues)
+        self.renumber_column_hashes(Scn_ID, idxvalues)
         self.results_MP[Scn_ID] = new_order_MPresults
         self.number_SP_solutions = self.number_SP_solutions.sort_values(['Pareto_ID', 'FeasibleSolution'])
         self.number_MP_solutions = self.number_MP_solutions.sort_values(['Pareto_ID', 'FeasibleSolution'])
@@ -1202,29 +2284,89 @@ class MasterProblem:
         if not self.method['building-scale']:
             self.reduced_costs = self.reduced_costs.sort_values(['Pareto_ID', 'Iter'])
 
+    def renumber_column_hashes(self, Scn_ID, idxvalues):
+        """
+        Renumbers the Pareto_IDs of a scenario in ``column_hashes``, as ``ResultsStore.renumber_pareto`` does for the SP results.
+        The Pareto_ID is in the key of the original column, and also in the hash when the solutions of the other Pareto points are not visible.
+        """
+        new_ID = {Pareto_ID: i + 1 for i, Pareto_ID in enumerate(idxvalues)}
+        column_hashes = dict()
+        for column_hash, key in self.column_hashes.items():
+            if key[0] != Scn_ID:
+                column_hashes[column_hash] = key
+            elif key[1] in new_ID:
+                if len(column_hash) == 4:  # (Scn_ID, Pareto_ID, house, hash)
+                    column_hash = (column_hash[0], new_ID[column_hash[1]]) + column_hash[2:]
+                column_hashes[column_hash] = (key[0], new_ID[key[1]]) + key[2:]
+        self.column_hashes = column_hashes
+
     def add_df_Results_SP(self, Scn_ID, Pareto_ID, iter, house, df_Results, attr):
-        if Scn_ID not in self.results_SP:
-            self.results_SP[Scn_ID] = {}
-        if Pareto_ID not in self.results_SP[Scn_ID]:
-            self.results_SP[Scn_ID][Pareto_ID] = {}
-        if iter not in self.results_SP[Scn_ID][Pareto_ID]:
-            self.results_SP[Scn_ID][Pareto_ID][iter] = {}
-        if self.feasible_solutions not in self.results_SP[Scn_ID][Pareto_ID][iter]:
-            self.results_SP[Scn_ID][Pareto_ID][iter][self.feasible_solutions] = {}
-        if house not in self.results_SP[Scn_ID][Pareto_ID][iter][self.feasible_solutions]:
-            self.results_SP[Scn_ID][Pareto_ID][iter][self.feasible_solutions][house] = {}
-
-        self.results_SP[Scn_ID][Pareto_ID][iter][self.feasible_solutions][house] = df_Results
-        attr = pd.concat([attr], keys=[(house, iter, self.feasible_solutions)], names=['House', 'Iter', 'FeasibleSolution'])
-        self.solver_attributes_SP = pd.concat([self.solver_attributes_SP, attr])
-
-        df = pd.DataFrame([[Scn_ID, Pareto_ID, iter, house, self.feasible_solutions]], columns=['Scn_ID', 'Pareto_ID', 'Iter', 'House', 'FeasibleSolution'])
-        self.number_SP_solutions = pd.concat([self.number_SP_solutions, df], ignore_index=True)
-
-        number_iter_global = int((len(self.number_SP_solutions) - 1) / len(self.buildings_data))
-        if 'MP_solution' not in self.number_SP_solutions.columns:
-            self.number_SP_solutions['MP_solution'] = 0
-        self.number_SP_solutions.iloc[-1, self.number_SP_solutions.columns.get_loc('MP_solution')] = number_iter_global
+        key = (Scn_ID, Pareto_ID, iter, self.feasible_solutions, house)
+        column = True
+        if self.DW_params['deduplicate_columns']:
+            # the columns visible to the MP are all the solutions or only the ones of the current Scn_ID and Pareto_ID
+            scope = (house,) if self.method['include_all_solutions'] else (Scn_ID, Pareto_ID, house)
+            column_hash = scope + (self.get_column_hash(house, df_Results),)
+            original = self.column_hashes.get(column_hash)
+            if original in self.results_SP.records:
+                column = False
+                self.tables['rediscovered_columns'].append({'Scn_ID': Scn_ID, 'Pareto_ID': Pareto_ID, 'Iter': iter, 'House': house,
+                                                            'FeasibleSolution': self.feasible_solutions, 'Original_FeasibleSolution': original[3]})
+            else:
+                self.column_hashes[column_hash] = key
+
+        self.results_SP.add(*key, df_Results, column=column)
+        self.tables['solver_attributes_SP'].append(attr.iloc[0].to_dict(), (house, iter, self.feasible_solutions) + attr.index[0])
+
+        number_iter_global = int(len(self.tables['number_SP_solutions']) / len(self.buildings_data))
+        self.tables['number_SP_solutions'].append({'Scn_ID': Scn_ID, 'Pareto_ID': Pareto_ID, 'Iter': iter, 'House': house,
+                                                    'FeasibleSolution': self.feasible_solutions, 'MP_solution': number_iter_global})
+
+    def add_archetype_results(self, Scn_ID, Pareto_ID, iter, house, df_Results, attr):
+        """
+        Adds the results of the SP of a house, and gives them to the other buildings of its archetype (see ``DW_params['archetypes']``).
+
+        The results of the other buildings are scaled by the ratio of their ERA to the ERA of the house,
+        see ``archetypes.replicate_SP_results``, and are recorded with a solving time of 0.
+        """
+        self.add_df_Results_SP(Scn_ID, Pareto_ID, iter, house, df_Results, attr)
+        members = self.archetypes.get(house, [house])[1:]
+        if members:
+            attr = attr.copy()
+            attr['solving_time'] = 0.0
+            attr['transfer_time'] = 0.0
+        for member in members:
+            scale = self.buildings_data[member]['ERA'] / self.buildings_data[house]['ERA']
+            df_Results_member = archetypes.replicate_SP_results(df_Results, house, member, scale)
+            self.add_df_Results_SP(Scn_ID, Pareto_ID, iter, member, df_Results_member, attr)
+
+    @staticmethod
+    def get_column_hash(house, df_Results):
+        """
+        Identifies a SP solution by its unit sizes and its grid exchanges, rounded as they are given to the MP.
+
+        Parameters
+        ----------
+        house : string
+            House ID
+        df_Results : dict
+            Results of the SP
+
+        Returns
+        -------
+        column_hash : str
+            md5 hash of the solution
+        """
+        df_Grid_t = df_Results['df_Grid_t']
+        df_Grid_t = df_Grid_t[df_Grid_t.index.get_level_values('Hub') == house]
+        arrays = [df_Results['df_Unit']['Units_Mult'].values, df_Grid_t[['Grid_supply', 'Grid_demand']].values]
+        if 'df_Buildings' in df_Results:
+            arrays.append(df_Results['df_Buildings']['U_h'].values)  # renovation options
+
+        column_hash = hashlib.md5()
+        for array in arrays:
+            column_hash.update(np.ascontiguousarray(np.round(array.astype(float), 6) + 0.0))  # + 0.0 turns -0.0 into 0.0
+        return column_hash.hexdigest()
 
     def add_df_Results_MP(self, Scn_ID, Pareto_ID, iter, df_Results, attr):
 
@@ -1236,10 +2378,8 @@ class MasterProblem:
             self.results_MP[Scn_ID][Pareto_ID][iter] = {}
 
         self.results_MP[Scn_ID][Pareto_ID][iter] = df_Results
-        attr = pd.concat([attr], keys=[iter], names=['Iter'])
-        self.solver_attributes_MP = pd.concat([self.solver_attributes_MP, attr])
-        col = self.number_SP_solutions.columns.difference(["House"])
-        self.number_MP_solutions = self.number_SP_solutions[col].groupby('MP_solution').mean(numeric_only=True)
+        self.tables['solver_attributes_MP'].append(attr.iloc[0].to_dict(), (iter,) + attr.index[0])
+        self.number_MP_solutions = None  # computed when read
 
     def split_parameter_sets_per_building(self, h, parameters_SP=None, set_indexed_SP=None):
         """
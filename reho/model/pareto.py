@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+__doc__ = """
+File for placing the points of a Pareto curve where the front is the least known.
+"""
+
+
+def get_district_objective(df_Performance, objective, ERA):
+    """
+    Returns the value of an objective for the district, per m2 of ERA, from the performance of an optimization.
+
+    Parameters
+    ----------
+    df_Performance : pd.DataFrame
+        Performance of the optimization, with the annualized costs of the district on the row 'Network'.
+    objective : str
+        'CAPEX', 'OPEX', 'TOTEX' or 'GWP'.
+    ERA : float
+        Energy reference area of the district.
+
+    Returns
+    -------
+    value : float
+    """
+    network = df_Performance.loc['Network']
+    if objective == 'CAPEX':
+        value = network['Costs_inv'] + network['Costs_rep']
+    elif objective == 'OPEX':
+        value = network['Costs_op']
+    elif objective == 'TOTEX':
+        value = network['Costs_inv'] + network['Costs_rep'] + network['Costs_op']
+    elif objective == 'GWP':
+        value = network['GWP_op'] + network['GWP_constr']
+    else:
+        raise Exception('The adaptive Pareto curve is not available for the objective ' + str(objective))
+    return float(value) / ERA
+
+
+def normalize_front(front, obj1_min, obj1_max, obj2_min, obj2_max):
+    """
+    Scales the points of a front between 0 and 1 on each objective and sorts them along the first objective.
+
+    Parameters
+    ----------
+    front : pd.DataFrame
+        Points of the front, with the columns 'obj1' and 'obj2'.
+    obj1_min, obj1_max, obj2_min, obj2_max : float
+        Extreme values of the objectives, given by the bounds of the curve.
+
+    Returns
+    -------
+    front : pd.DataFrame
+        Copy of the front sorted by 'obj1', with the scaled objectives in the columns 'x' and 'y'.
+    """
+    front = front.sort_values('obj1').copy()
+    front['x'] = (front.obj1 - obj1_min) / (obj1_max - obj1_min) if obj1_max > obj1_min else 0.0
+    front['y'] = (front.obj2 - obj2_min) / (obj2_max - obj2_min) if obj2_max > obj2_min else 0.0
+    return front
+
+
+def get_gaps(front):
+    """
+    Returns the segments between consecutive points of a normalized front, from the largest to the smallest.
+
+    Parameters
+    ----------
+    front : pd.DataFrame
+        Normalized front, see ``normalize_front``.
+
+    Returns
+    -------
+    gaps : pd.DataFrame
+        Euclidean length 'gap' of each segment, with the first objective at its ends ('obj1_start', 'obj1_end').
+    """
+    x, y, obj1 = front.x.values, front.y.values, front.obj1.values
+    gaps = pd.DataFrame({'gap': np.hypot(np.diff(x), np.diff(y)), 'obj1_start': obj1[:-1], 'obj1_end': obj1[1:]})
+    return gaps.sort_values('gap', ascending=False, kind='stable')
+
+
+def get_hypervolume(front, reference=(1.0, 1.0)):
+    """
+    Returns the area dominated by a normalized front, both objectives being minimized, up to the reference point.
+
+    Parameters
+    ----------
+    front : pd.DataFrame
+        Normalized front, see ``normalize_front``.
+    reference : tuple, optional
+        Reference point (x, y), by default the worst values of the bounds.
+
+    Returns
+    -------
+    hypervolume : float
+
+    Examples
+    --------
+    >>> front = pd.DataFrame({'x': [0.0, 0.5, 1.0], 'y': [1.0, 0.25, 0.0]})
+    >>> get_hypervolume(front)
+    0.375
+    """
+    front = front.sort_values(['x', 'y'])
+    hypervolume, y_best = 0.0, reference[1]
+    x, y = np.append(front.x.values, reference[0]), front.y.values
+    for i in range(len(y)):
+        y_best = min(y_best, y[i])  # dominated points do not add any area
+        hypervolume += max(x[i + 1] - x[i], 0.0) * max(reference[1] - y_best, 0.0)
+    return hypervolume
+
+
+def place_epsilons(front, n_points, tried=(), tolerance=1e-6):
+    """
+    Places the epsilon constraints of the next points in the largest gaps of the front, at the middle of their first objective.
+
+    Parameters
+    ----------
+    front : pd.DataFrame
+        Normalized front, see ``normalize_front``.
+    n_points : int
+        Number of epsilon constraints to place, at most one per gap.
+    tried : iterable, optional
+        Epsilon constraints already solved. A gap whose middle was already tried is skipped, as its point was not
+        different from the ends of the gap.
+    tolerance : float, optional
+        Tolerance on the first objective to compare the epsilon constraints.
+
+    Returns
+    -------
+    epsilons : list
+        Epsilon constraints on the first objective, with the length of the gap in which each one is placed.
+    """
+    tried = np.array(list(tried))
+    scale = max(abs(front.obj1.max() - front.obj1.min()), tolerance)
+    epsilons = []
+    for gap in get_gaps(front).itertuples():
+        if len(epsilons) == n_points:
+            break
+        epsilon = (gap.obj1_start + gap.obj1_end) / 2
+        if gap.obj1_end - gap.obj1_start <= tolerance * scale:
+            continue
+        if tried.size and (np.abs(tried - epsilon) <= tolerance * scale).any():
+            continue
+        epsilons.append((epsilon, gap.gap))
+    return epsilons
@@ -0,0 +1,121 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+__doc__ = """
+Groups the buildings of a district into archetypes, whose buildings share the solutions of one sub-problem.
+"""
+
+# attributes of the buildings which must be equal within an archetype
+default_categories = ['id_class', 'period', 'ratio', 'status']
+
+# attributes of the buildings which may differ within an archetype, with their relative tolerance
+default_tolerances = {'ERA': 0.1, 'SolarRoofArea': 0.1, 'U_h': 0.05, 'HeatCapacity': 0.05,
+                      'T_comfort_min_0': 0.0, 'Th_supply_0': 0.0, 'Th_return_0': 0.0, 'Tc_supply_0': 0.0, 'Tc_return_0': 0.0}
+
+# results proportional to the size of the building, scaled when a solution is given to another building of the archetype
+extensive_columns = ['Costs_op', 'Costs_inv', 'Costs_rep', 'Costs_ft', 'Costs_grid_connection', 'GWP_op', 'GWP_constr',
+                     'Demand_MWh', 'Supply_MWh', 'Curtailment_MWh', 'Demand_MW', 'Supply_MW',
+                     'Units_Mult', 'Costs_Unit_inv', 'Costs_Unit_rep', 'GWP_Unit_constr', 'Units_Ext',
+                     'Units_demand', 'Units_supply', 'Units_curtailment', 'BAT_E_stored',
+                     'Grid_demand', 'Grid_supply', 'Uncontrollable_load', 'Domestic_electricity',
+                     'House_Q_heating', 'House_Q_cooling', 'House_Q_DHW', 'HeatGains', 'SolarGains',
+                     'ERA', 'SolarRoofArea', 'area_facade_m2', 'n_p', 'energy_heating_signature_kWh_y',
+                     'energy_cooling_signature_kWh_y', 'energy_hotwater_signature_kWh_y', 'energy_el_kWh_y']
+
+
+def group_buildings(buildings_data, tolerances=None, categories=None):
+    """
+    Groups the buildings with equal categories and close attributes into archetypes.
+
+    The buildings are taken in order. A building joins the first archetype whose representative (its first building)
+    has the same categories and attributes within the tolerances, otherwise it becomes the representative of a new archetype.
+
+    Parameters
+    ----------
+    buildings_data : dict
+        Buildings of the district, as in ``qbuildings_data['buildings_data']``.
+    tolerances : dict, optional
+        Relative tolerance of each numerical attribute, by default ``default_tolerances``.
+        An attribute missing from one of the buildings is not compared.
+    categories : list, optional
+        Attributes which must be equal, by default ``default_categories``.
+
+    Returns
+    -------
+    archetypes : dict
+        Representative of each archetype -> list of its buildings, the representative being the first one.
+
+    Examples
+    --------
+    >>> buildings_data = {'Building1': {'id_class': 'I', 'ERA': 100.0}, 'Building2': {'id_class': 'I', 'ERA': 105.0},
+    ...                   'Building3': {'id_class': 'II', 'ERA': 100.0}}
+    >>> group_buildings(buildings_data, tolerances={'ERA': 0.1}, categories=['id_class'])
+    {'Building1': ['Building1', 'Building2'], 'Building3': ['Building3']}
+    """
+    if tolerances is None:
+        tolerances = default_tolerances
+    if categories is None:
+        categories = default_categories
+    categories = [c for c in categories if all(c in data for data in buildings_data.values())]
+    tolerances = {a: t for a, t in tolerances.items() if all(a in data for data in buildings_data.values())}
+
+    archetypes = {}
+    for h, data in buildings_data.items():
+        key = tuple(str(data[c]) for c in categories)
+        for representative, members in archetypes.items():
+            reference = buildings_data[representative]
+            if tuple(str(reference[c]) for c in categories) != key:
+                continue
+            if all(abs(float(data[a]) - float(reference[a])) <= t * abs(float(reference[a])) for a, t in tolerances.items()):
+                members.append(h)
+                break
+        else:
+            archetypes[h] = [h]
+    return archetypes
+
+
+def replicate_SP_results(df_Results, house, member, scale=1.0):
+    """
+    Gives the results of the SP of a house to another building of its archetype.
+
+    The name of the house is replaced by the name of the building in the indexes (hubs, units, streams...), and the
+    extensive results (see ``extensive_columns``) are multiplied by ``scale``.
+
+    Parameters
+    ----------
+    df_Results : dict
+        Results of the SP of the house.
+    house : str
+        House solved.
+    member : str
+        Building receiving the results.
+    scale : float, optional
+        Size of the building relative to the house, e.g. the ratio of their ERA.
+
+    Returns
+    -------
+    df_Results : dict
+        Results of the building, the DataFrames of ``df_Results`` being copied.
+    """
+    pattern = re.compile(r'(?<![A-Za-z0-9])' + re.escape(house) + r'(?![A-Za-z0-9])')
+
+    def rename(value):
+        return pattern.sub(member, value) if isinstance(value, str) else value
+
+    results = {}
+    for df_name, df in df_Results.items():
+        if not isinstance(df, (pd.DataFrame, pd.Series)):
+            results[df_name] = df
+            continue
+        df = df.copy()
+        if isinstance(df.index, pd.MultiIndex):
+            df.index = df.index.set_levels([level.map(rename) for level in df.index.levels], verify_integrity=False)
+        else:
+            df.index = df.index.map(rename)
+        if scale != 1.0 and isinstance(df, pd.DataFrame):
+            columns = [c for c in df.columns if c in extensive_columns and np.issubdtype(df[c].dtype, np.number)]
+            df[columns] = df[columns] * scale
+        results[df_name] = df
+    return results
@@ -1,3 +1,5 @@
+import tempfile
+
 import numpy as np
 import pandas as pd
 
@@ -107,3 +109,49 @@ def irradiation_to_df(local_data):
     df_final = df_final.rename(columns={0: 'Irr_patches'})
 
     return df_final
+
+
+def get_skydome_data(local_data):
+    """
+    Returns the geometry of the skydome and the irradiation of its patches for the typical periods of the clustering.
+
+    The irradiation of the patches depends only on the clustering (File_ID). It is computed once with
+    ``irradiation_to_df``, written next to the clustering files as 'irradiation_patches.csv' for the next runs,
+    and kept in ``local_data['skydome']``, so that the SPs and the workers holding local_data do not compute it again.
+
+    Parameters
+    ----------
+    local_data : dict
+        Dictionary containing the local data, see ``return_local_data``.
+
+    Returns
+    -------
+    skydome : dict
+        Parameters 'Sin_a', 'Cos_a', 'Sin_e', 'Cos_e' of the patches and 'Irr_patches', as returned by ``irradiation_to_df``.
+    """
+    if 'skydome' in local_data:
+        return local_data['skydome']
+
+    df_dome = pd.read_csv(os.path.join(path_to_skydome, 'skydome.csv'))
+    skydome = {'Sin_a': df_dome.Sin_a.values, 'Cos_a': df_dome.Cos_a.values, 'Sin_e': df_dome.Sin_e.values, 'Cos_e': df_dome.Cos_e.values}
+
+    file = os.path.join(path_to_clustering, local_data['File_ID'], 'irradiation_patches.csv')
+    if os.path.exists(file):
+        df_irr = pd.read_csv(file, index_col=[0, 1, 2])
+        df_irr.index.names = [None, None, None]
+    else:
+        df_irr = irradiation_to_df(local_data)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        # written to a temporary file of its own, then moved: the processes computing the patches at the same time
+        # never write into the same file, and the others never read a partial file
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(file), suffix='.tmp', delete=False, newline='') as tmp:
+            df_irr.to_csv(tmp)
+        try:
+            os.replace(tmp.name, file)
+        except OSError:
+            os.remove(tmp.name)
+            raise
+    skydome['Irr_patches'] = df_irr
+
+    local_data['skydome'] = skydome
+    return skydome
@@ -3,6 +3,7 @@ import pickle
 import openpyxl
 
 from reho.model.master_problem import *
+import reho.model.pareto as pareto
 from reho.model.postprocessing.KPIs import *
 from reho.paths import *
 
@@ -56,8 +57,54 @@ class REHO(MasterProblem):
         self.solver_attributes = pd.DataFrame()
         self.epsilon_constraints = {}
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(terminate=exc_type is not None)
+
+    def shutdown(self, terminate=False):
+        """
+        Stops the workers solving the SPs and closes the models kept between the optimizations.
+
+        The workers are started at the first decomposition and reused by the next ones, e.g. for all the points of a
+        Pareto curve. They are stopped at the end of each optimization, see ``end_optimization``. With
+        ``DW_params['keep_SP_pool']``, they are also kept for the next optimizations, e.g. for the samples of a
+        sensitivity analysis, and stopped by this method or at the end of a ``with`` block:
+
+        >>> with REHO(qbuildings_data=qbuildings_data, units=units, grids=grids, scenario=scenario, cluster=cluster, method=method,
+        ...           DW_params={'keep_SP_pool': True}) as reho:
+        ...     reho.single_optimization()
+        ...     reho.generate_pareto_curve()
+
+        The workers of an object deleted without calling this method are stopped when it is garbage collected, or at
+        the exit of the interpreter.
+
+        Parameters
+        ----------
+        terminate : bool, optional
+            If True, the workers are stopped without waiting for their tasks. It is the case when the ``with`` block
+            exits on an exception, as a SP may still be running.
+        """
+        self.close_SP_pool(terminate=terminate)
+        workers.clear_warm_models()
+        self.close_persistent_MP()
+
+    def end_optimization(self, outer):
+        """
+        Ends an optimization: the workers are stopped at the end of the optimization called by the user (``outer``,
+        see ``start_checkpoint_run``), unless ``DW_params['keep_SP_pool']``.
+        """
+        self.end_checkpoint_run(outer)
+        if outer and not self.DW_params['keep_SP_pool']:
+            self.shutdown()
+
     def single_optimization(self, Pareto_ID=0):
         Scn_ID = self.scenario['name']
+        if self.completed_before_resume(Scn_ID, Pareto_ID):
+            return
+        outer = self.start_checkpoint_run('single_optimization', Pareto_ID=Pareto_ID)
+
         if self.method['district-scale'] or self.method['building-scale']:  # decomposition formulation
             ampl, exitcode = self.execute_dantzig_wolfe_decomposition(self.scenario, Scn_ID, Pareto_ID=Pareto_ID)
 
@@ -83,23 +130,77 @@ class REHO(MasterProblem):
 
         self.add_df_Results(ampl, Scn_ID, Pareto_ID, self.scenario)
         self.get_KPIs(Scn_ID, Pareto_ID=Pareto_ID)
+        self.end_optimization(outer)
 
         gc.collect()  # free memory
         del ampl
         if exitcode == 'infeasible':
             sys.exit(exitcode)
 
+    @staticmethod
+    def resume_from(checkpoint):
+        """
+        Continues an optimization interrupted after writing a checkpoint (see ``DW_params['checkpoint']``).
+
+        The decomposition in progress continues from its last checkpointed iteration. The Pareto points or actor
+        samples completed before the checkpoint are kept and not solved again.
+
+        >>> reho = REHO.resume_from('results/checkpoint.pickle')
+        >>> reho.save_results(format=['xlsx', 'pickle'], filename='2b')
+
+        Parameters
+        ----------
+        checkpoint : str
+            Path of the checkpoint.
+
+        Returns
+        -------
+        reho : REHO
+            Object of the optimization, with all its results.
+        """
+        with open(checkpoint, 'rb') as f:
+            reho = pickle.load(f)
+        if reho.checkpoint_run is not None:
+            method, kwargs = reho.checkpoint_run
+            reho.logger.info('Resuming ' + method + ' from ' + str(checkpoint))
+            reho.checkpoint_run = None  # recorded again by the method
+            reho.resuming = True
+            getattr(reho, method)(**kwargs)
+            reho.resuming = False
+        return reho
+
+    def completed_before_resume(self, Scn_ID, Pareto_ID):
+        """
+        Tells if the optimization of a point was completed before the checkpoint the run is resumed from.
+        """
+        return self.resuming and Pareto_ID in self.results.get(Scn_ID, {})
+
     def execute_dantzig_wolfe_decomposition(self, scenario, Scn_ID, Pareto_ID=0, epsilon_init=None):
 
         # Initiation
-        self.pool = mp.Pool(self.cpu_use)
-        self.iter = 0  # new scenario has to start at iter = 0
+        self.SP_models_token = uuid.uuid4().hex  # identifies the SP models kept alive during this run
+        self.pool = self.get_SP_pool()
         scenario, SP_scenario, SP_scenario_init = self.select_SP_obj_decomposition(scenario)
 
-        self.logger.info('INITIATION, Iter:' + str(self.iter) + ' Pareto_ID: ' + str(Pareto_ID))
-        self.initiate_decomposition(SP_scenario_init, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, epsilon_init=epsilon_init)
-        self.logger.info('MASTER INITIATION, Iter:' + str(self.iter))
-        self.MP_iteration(scenario, Scn_ID=Scn_ID, binary=False, Pareto_ID=Pareto_ID)
+        if self.DW_resume is not None and (self.DW_resume['Scn_ID'], self.DW_resume['Pareto_ID']) == (Scn_ID, Pareto_ID):
+            # continued from the last checkpoint, which holds the columns, duals and counters of the decomposition
+            self.iter = self.DW_resume['iter']
+            self.DW_resume = None
+            self.logger.info('RESUMING, Iter:' + str(self.iter) + ' Pareto_ID: ' + str(Pareto_ID))
+        else:
+            self.iter = 0  # new scenario has to start at iter = 0
+            self.SP_duals = dict()
+            self.mispricing = False
+            self.column_ages = dict()
+            self.archived_columns = dict()
+            self.last_SP_solves = dict()
+
+            self.logger.info('INITIATION, Iter:' + str(self.iter) + ' Pareto_ID: ' + str(Pareto_ID))
+            self.initiate_decomposition(SP_scenario_init, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID, epsilon_init=epsilon_init)
+            self.logger.info('MASTER INITIATION, Iter:' + str(self.iter))
+            self.MP_iteration(scenario, Scn_ID=Scn_ID, binary=False, Pareto_ID=Pareto_ID)
+            self.update_column_pool(SP_scenario, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID)
+            self.checkpoint_decomposition(Scn_ID, Pareto_ID)
 
         # Iteration
         while self.iter < self.DW_params['max_iter'] - 1:  # last iteration is used to run the binary MP.
@@ -108,22 +209,48 @@ class REHO(MasterProblem):
             self.SP_iteration(SP_scenario, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID)
             self.logger.info('MASTER ITERATION, Iter:' + str(self.iter) + ' Pareto_ID: ' + str(Pareto_ID))
             self.MP_iteration(scenario, Scn_ID=Scn_ID, binary=False, Pareto_ID=Pareto_ID)
+            self.update_column_pool(SP_scenario, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID)
 
-            if self.check_Termination_criteria(SP_scenario, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID) and (self.iter > 3):
+            if self.check_Termination_criteria(SP_scenario, Scn_ID=Scn_ID, Pareto_ID=Pareto_ID) and \
+                    (self.iter > 3 or self.stopping_criteria.gap_reached.iat[-1]):  # the gap is a certificate of optimality
                 break
+            self.checkpoint_decomposition(Scn_ID, Pareto_ID)
 
         # Finalization
         self.logger.info(self.stopping_criteria)
+        if not self.stopping_criteria.empty:
+            df = self.select_pareto_rows(self.stopping_criteria, Scn_ID, Pareto_ID)
+            if not df.empty and not np.isnan(df.gap.iat[-1]):
+                self.logger.info('Optimality gap: ' + str(round(100 * df.gap.iat[-1], 3)) + ' % (MP objective ' + str(df.upper_bound.iat[-1])
+                                 + ', best Lagrangian bound ' + str(df.best_lower_bound.iat[-1]) + ')')
+        if self.DW_params['dual_stabilization'] is not None and not self.dual_stabilization.empty:
+            df = self.dual_stabilization
+            df = df[(df.Scn_ID == Scn_ID) & (df.Pareto_ID == Pareto_ID)]
+            self.logger.info('Dual stabilization (' + self.DW_params['dual_stabilization'] + '): ' + str(self.iter) + ' iterations, '
+                             + str(int(df.Mispricing.sum())) + ' mispricing(s)')
+        if self.DW_params['column_age_limit'] is not None and not self.column_pool.empty:
+            df = self.column_pool
+            df = df[(df.Scn_ID == Scn_ID) & (df.Pareto_ID == Pareto_ID)]
+            self.logger.info('Column pool: ' + str(len(self.archived_columns)) + ' column(s) archived at the end, '
+                             + str(int((df.Status == 'restored').sum())) + ' restored')
+        if self.DW_params['SP_skip_tolerance'] is not None and not self.SP_dual_changes.empty:
+            df = self.SP_dual_changes
+            df = df[(df.Scn_ID == Scn_ID) & (df.Pareto_ID == Pareto_ID)]
+            self.logger.info('SP solves skipped per iteration: ' + str(df.groupby('Iter').Skipped.sum().astype(int).to_dict()))
         self.iter += 1
         self.logger.info('LAST MASTER ITERATION, Iter:' + str(self.iter) + ' Pareto_ID: ' + str(Pareto_ID))
         self.MP_iteration(scenario, Scn_ID=Scn_ID, binary=True, Pareto_ID=Pareto_ID)
-        self.pool.close()
+        if self.pool is not None:
+            self.pool.clear_warm_models()  # the workers are kept for the next decomposition, not their SP models
+        workers.clear_warm_models()  # SP models kept in this process when not computed in parallel
+        self.close_persistent_MP()
 
         return None, None
 
     def generate_pareto_curve(self):
 
         Scn_ID = self.scenario['name']
+        outer = self.start_checkpoint_run('generate_pareto_curve')
 
         def get_objectives_values(ampl, objectives, Pareto_ID):
 
@@ -132,7 +259,7 @@ class REHO(MasterProblem):
             surfaces.columns = ["ERA"]
 
             def annualized_investment():
-                if self.method['building-scale'] or self.method['district-scale']:
+                if ampl is None or self.method['building-scale'] or self.method['district-scale']:
                     df_inv = self.results[Scn_ID][Pareto_ID]["df_Performance"]
                     district = (df_inv.Costs_inv[-1] + df_inv.Costs_rep[-1]) / self.ERA
                     buildings = df_inv.Costs_inv[:-1].div(surfaces.ERA) + df_inv.Costs_rep[:-1].div(surfaces.ERA)
@@ -148,7 +275,7 @@ class REHO(MasterProblem):
                 return district, buildings
 
             def opex_per_house():
-                if self.method['building-scale'] or self.method['district-scale']:
+                if ampl is None or self.method['building-scale'] or self.method['district-scale']:
                     df_op = self.results[Scn_ID][Pareto_ID]["df_Performance"]
                     district = df_op.Costs_op[-1] / self.ERA
                     building = df_op.Costs_op[:-1].div(surfaces.ERA)
@@ -198,7 +325,10 @@ class REHO(MasterProblem):
             objective1 = self.scenario["Objective"][0]
             scenario['Objective'] = objective1
 
-            if self.method['district-scale']:
+            resumed = self.completed_before_resume(Scn_ID, 1)
+            if resumed:
+                ampl = None  # the objectives are read from the results
+            elif self.method['district-scale']:
                 ampl, exitcode = self.execute_dantzig_wolfe_decomposition(scenario, Scn_ID, Pareto_ID=1)
             else:
                 if self.method['use_facades'] or self.method['use_pv_orientation']:
@@ -209,9 +339,11 @@ class REHO(MasterProblem):
                                       scenario, self.method, self.solver)
                 ampl, exitcode = reho.solve_model()
 
-            scenario = {'Objective': objective1}
-            self.add_df_Results(ampl, Scn_ID, 1, scenario)
-            self.get_KPIs(Scn_ID, Pareto_ID=1)
+            if not resumed:
+                scenario = {'Objective': objective1}
+                self.add_df_Results(ampl, Scn_ID, 1, scenario)
+                self.get_KPIs(Scn_ID, Pareto_ID=1)
+                self.end_checkpoint_run(False)
 
             obj_values = get_objectives_values(ampl, self.scenario["Objective"], Pareto_ID=1)
 
@@ -229,7 +361,10 @@ class REHO(MasterProblem):
             else:
                 Pareto_ID = self.nPareto + 2
 
-            if self.method['district-scale']:
+            resumed = self.completed_before_resume(Scn_ID, Pareto_ID)
+            if resumed:
+                ampl = None  # the objectives are read from the results
+            elif self.method['district-scale']:
                 ampl, exitcode = self.execute_dantzig_wolfe_decomposition(scenario, Scn_ID, Pareto_ID=Pareto_ID)
             else:
                 if self.method['use_facades'] or self.method['use_pv_orientation']:
@@ -240,9 +375,11 @@ class REHO(MasterProblem):
                                       scenario, self.method, self.solver)
                 ampl, exitcode = reho.solve_model()
 
-            scenario = {'Objective': objective2}
-            self.add_df_Results(ampl, Scn_ID, Pareto_ID, scenario)
-            self.get_KPIs(Scn_ID, Pareto_ID=Pareto_ID)
+            if not resumed:
+                scenario = {'Objective': objective2}
+                self.add_df_Results(ampl, Scn_ID, Pareto_ID, scenario)
+                self.get_KPIs(Scn_ID, Pareto_ID=Pareto_ID)
+                self.end_checkpoint_run(False)
 
             obj_values = get_objectives_values(ampl, self.scenario["Objective"], Pareto_ID=Pareto_ID)
 
@@ -291,89 +428,300 @@ class REHO(MasterProblem):
         obj1_house_max = obj1_upper_bound["building_obj1"]
         obj1_house_min = obj1_lower_bound["building_obj1"]
 
-        # Intermediate Pareto points: OPEX optimization with CAPEX constraint
-        scenario = add_constraints_from_self_scenario()
-        scenario['Objective'] = self.scenario["Objective"][1]
-        self.epsilon_constraints['EMOO_obj1'] = np.array([])
-
-        for nParetoIT in range(2, self.nPareto + 2):
-            # Computation of the intermediate RES values
-            obj1_eps_lim = (obj1_max - obj1_min) / (self.nPareto + 1) * (nParetoIT - 1) + obj1_min
-            epsilon_init = return_epsilon_init(obj1_house_max, obj1_house_min, self.nPareto, nParetoIT, self.scenario["Objective"][0])
+        if self.method['adaptive_pareto']:
+            # Intermediate Pareto points: OPEX optimization with CAPEX constraint, placed in the largest gaps of the front
+            scenario = add_constraints_from_self_scenario()
+            scenario['Objective'] = self.scenario["Objective"][1]
+            bounds = [1, self.nPareto + 2 if self.method['switch_off_second_objective'] else self.total_Pareto]
+            self.solve_adaptive_pareto_points(Scn_ID, scenario, bounds, obj1_house_min, obj1_house_max)
 
-            if self.scenario["Objective"][0] in ["OPEX", "CAPEX", "TOTEX", "GWP"]:
-                scenario['EMOO']['EMOO_' + self.scenario["Objective"][0]] = obj1_eps_lim
+        else:
+            # Intermediate Pareto points: OPEX optimization with CAPEX constraint
+            points = []  # (Pareto_ID, scenario, epsilon_init) of the intermediate points, independent of each other
+            self.epsilon_constraints['EMOO_obj1'] = np.array([])
 
-            self.epsilon_constraints['EMOO_obj1'] = np.append(self.epsilon_constraints['EMOO_obj1'], obj1_eps_lim)
-            self.logger.info('---------------> ' + str(self.scenario["Objective"][0]) + ' LIMIT: ' + str(obj1_eps_lim))
+            for nParetoIT in range(2, self.nPareto + 2):
+                scenario = add_constraints_from_self_scenario()
+                scenario['Objective'] = self.scenario["Objective"][1]
 
-            # Results computation
-            if self.method['district-scale']:
-                ampl, exitcode = self.execute_dantzig_wolfe_decomposition(scenario, Scn_ID, Pareto_ID=nParetoIT, epsilon_init=epsilon_init)
-            else:
-                if self.method['use_facades'] or self.method['use_pv_orientation']:
-                    reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed,
-                                      self.cluster, scenario, self.method, self.solver, self.qbuildings_data)
-                else:
-                    reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed,
-                                      self.cluster, scenario, self.method, self.solver)
-                ampl, exitcode = reho.solve_model()
+                # Computation of the intermediate RES values
+                obj1_eps_lim = (obj1_max - obj1_min) / (self.nPareto + 1) * (nParetoIT - 1) + obj1_min
+                epsilon_init = return_epsilon_init(obj1_house_max, obj1_house_min, self.nPareto, nParetoIT, self.scenario["Objective"][0])
 
-            self.add_df_Results(ampl, Scn_ID, nParetoIT, scenario)
-            self.get_KPIs(Scn_ID, Pareto_ID=nParetoIT)
+                if self.scenario["Objective"][0] in ["OPEX", "CAPEX", "TOTEX", "GWP"]:
+                    scenario['EMOO']['EMOO_' + self.scenario["Objective"][0]] = obj1_eps_lim
 
-            del ampl
-            gc.collect()  # free memory
+                self.epsilon_constraints['EMOO_obj1'] = np.append(self.epsilon_constraints['EMOO_obj1'], obj1_eps_lim)
+                self.logger.info('---------------> ' + str(self.scenario["Objective"][0]) + ' LIMIT: ' + str(obj1_eps_lim))
+                points.append((nParetoIT, scenario, epsilon_init))
 
-        if not self.method['switch_off_second_objective']:
+            if not self.method['switch_off_second_objective']:
 
-            # Intermediate Pareto points: CAPEX optimization with OPEX constraint
-            scenario = add_constraints_from_self_scenario()
-            scenario['Objective'] = self.scenario["Objective"][0]
-            self.epsilon_constraints['EMOO_obj2'] = np.array([])
+                # Intermediate Pareto points: CAPEX optimization with OPEX constraint
+                self.epsilon_constraints['EMOO_obj2'] = np.array([])
 
-            obj2_min = obj1_upper_bound["district_obj2"]
-            obj2_max = obj1_lower_bound["district_obj2"]
-            obj2_house_min = obj1_upper_bound["building_obj2"]
-            obj2_house_max = obj1_lower_bound["building_obj2"]
+                obj2_min = obj1_upper_bound["district_obj2"]
+                obj2_max = obj1_lower_bound["district_obj2"]
+                obj2_house_min = obj1_upper_bound["building_obj2"]
+                obj2_house_max = obj1_lower_bound["building_obj2"]
 
-            for point, nParetoIT in enumerate(range(self.nPareto + 2, self.total_Pareto)):
-                # Computation of the intermediate RES values
-                obj2_eps_lim = (obj2_max - obj2_min) / (self.nPareto + 1) * (point + 1) + obj2_min
-                epsilon_init = return_epsilon_init(obj2_house_max, obj2_house_min, self.nPareto, point, self.scenario["Objective"][1])
+                for point, nParetoIT in enumerate(range(self.nPareto + 2, self.total_Pareto)):
+                    scenario = add_constraints_from_self_scenario()
+                    scenario['Objective'] = self.scenario["Objective"][0]
 
-                scenario['EMOO']['EMOO_' + self.scenario["Objective"][1]] = obj2_eps_lim
+                    # Computation of the intermediate RES values
+                    obj2_eps_lim = (obj2_max - obj2_min) / (self.nPareto + 1) * (point + 1) + obj2_min
+                    epsilon_init = return_epsilon_init(obj2_house_max, obj2_house_min, self.nPareto, point, self.scenario["Objective"][1])
 
-                self.epsilon_constraints['EMOO_obj2'] = np.append(self.epsilon_constraints['EMOO_obj2'], obj2_eps_lim)
-                self.logger.info('---------------> ' + str(self.scenario["Objective"][1]) + ' LIMIT: ' + str(obj2_eps_lim))
-                # results computation
-                if self.method['district-scale']:
-                    ampl, exitcode = self.execute_dantzig_wolfe_decomposition(scenario, Scn_ID, Pareto_ID=nParetoIT, epsilon_init=epsilon_init)
-                else:
-                    if self.method['use_facades'] or self.method['use_pv_orientation']:
-                        reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters,
-                                          self.set_indexed, self.cluster, scenario, self.method, self.solver, self.qbuildings_data)
-                    else:
-                        reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters,
-                                          self.set_indexed, self.cluster, scenario, self.method, self.solver)
-                    ampl, exitcode = reho.solve_model()
+                    scenario['EMOO']['EMOO_' + self.scenario["Objective"][1]] = obj2_eps_lim
 
-                self.add_df_Results(ampl, Scn_ID, nParetoIT, scenario)
-                self.get_KPIs(Scn_ID, Pareto_ID=nParetoIT)
+                    self.epsilon_constraints['EMOO_obj2'] = np.append(self.epsilon_constraints['EMOO_obj2'], obj2_eps_lim)
+                    self.logger.info('---------------> ' + str(self.scenario["Objective"][1]) + ' LIMIT: ' + str(obj2_eps_lim))
+                    points.append((nParetoIT, scenario, epsilon_init))
 
-                del ampl
-                gc.collect()  # free memory
+            # results computation
+            self.solve_pareto_points(Scn_ID, points)
 
         sort_pareto_points()
+        self.end_optimization(outer)
 
         self.logger.info(str(obj1_min) + " " + str(obj1_max))
 
+    def solve_pareto_points(self, Scn_ID, points):
+        """
+        Solves the intermediate points of a Pareto curve, one after the other or in parallel with ``method['parallel_pareto']``.
+
+        In parallel, each point is solved by a worker process holding a copy of the REHO object, and its results are
+        merged back with ``add_pareto_point_results``. Each point gets its own range of FeasibleSolutions, so that the
+        SP solutions of the points do not overlap in ``results_SP``.
+
+        Parameters
+        ----------
+        Scn_ID : str
+            ID of the optimization scenario
+        points : list
+            (Pareto_ID, scenario, epsilon_init) of each point, see ``solve_pareto_point``.
+
+        Notes
+        -----
+        - The SPs of a point are solved sequentially within its worker, as the workers cannot start processes of their own.
+        - With ``include_all_solutions``, the MP of a point sees the SP solutions of the bounds of the curve and of the
+          points previously solved by the same worker, instead of all the points previously solved.
+        """
+        points = [point for point in points if not self.completed_before_resume(Scn_ID, point[0])]
+        if not self.method['parallel_pareto'] or len(points) < 2:
+            for Pareto_ID, scenario, epsilon_init in points:
+                self.solve_pareto_point(Scn_ID, Pareto_ID, scenario, epsilon_init)
+            return
+
+        context = copy.copy(self) if self.method['include_all_solutions'] else self.get_SP_context()
+        context.method = dict(self.method, parallel_computation=False)
+        context.DW_params = dict(self.DW_params, checkpoint=None)  # the checkpoints are written by this process
+        context.DW_resume = None
+        n_renovation = 0 if self.method['renovation'] is None else len(self.method['renovation'])
+        stride = (3 + self.DW_params['max_iter']) * (1 + n_renovation)  # upper bound of the SP rounds of a decomposition
+
+        n_workers = min(self.cpu_use, len(points))
+        self.logger.info('Solving ' + str(len(points)) + ' Pareto points with ' + str(n_workers) + ' workers')
+        executor = workers.ProcessExecutor(n_workers).start(workers.init_worker, (context,))
+        tasks = []
+        for n, (Pareto_ID, scenario, epsilon_init) in enumerate(points):
+            first_feasible_solution = self.feasible_solutions + n * stride
+            tasks.append(executor.apply_async(workers.execute, ('execute_pareto_point', Scn_ID, Pareto_ID, scenario, epsilon_init,
+                                                                first_feasible_solution)))
+        try:
+            points_results = [task.get() for task in tasks]
+        except Exception:
+            executor.terminate()
+            raise
+        executor.close()
+
+        feasible_solutions = self.feasible_solutions
+        for n, ((Pareto_ID, _, _), point_results) in enumerate(zip(points, points_results)):
+            if point_results['feasible_solutions'] > self.feasible_solutions + (n + 1) * stride:
+                raise Exception('The SP solutions of the Pareto point ' + str(Pareto_ID) + ' exceed the FeasibleSolutions reserved for it')
+            self.add_pareto_point_results(Scn_ID, Pareto_ID, point_results)
+            feasible_solutions = max(feasible_solutions, point_results['feasible_solutions'])
+        self.feasible_solutions = feasible_solutions
+
+        if self.method['building-scale'] or self.method['district-scale']:
+            # each worker numbered the rounds of SPs from its own table
+            df = self.number_SP_solutions
+            df['MP_solution'] = np.arange(len(df)) // len(self.buildings_data)
+            self.number_SP_solutions = df
+            self.number_MP_solutions = None
+        self.end_checkpoint_run(False)
+
+    def solve_adaptive_pareto_points(self, Scn_ID, scenario, bounds, obj1_house_min=None, obj1_house_max=None):
+        """
+        Solves the intermediate points of a Pareto curve where the front is the least known (see ``method['adaptive_pareto']``).
+
+        The epsilon constraint on the first objective of each new point is placed at the middle of the largest gap
+        between two consecutive points of the front, both objectives being normalized by the bounds of the curve.
+        With ``parallel_pareto``, one point per worker is placed in the largest gaps and solved at the same time.
+
+        The points are placed until:
+
+        - the largest gap is below ``method['pareto_max_gap']``,
+        - or the last points added less than ``method['pareto_hypervolume_tolerance']`` to the normalized hypervolume of the front,
+        - or the number of intermediate points of the uniform curve is reached.
+
+        Parameters
+        ----------
+        Scn_ID : str
+            ID of the optimization scenario
+        scenario : dict
+            Objective of the intermediate points, i.e. the second objective of the curve
+        bounds : list
+            Pareto_IDs of the points minimizing the first and the second objective
+        obj1_house_min, obj1_house_max : pd.Series, optional
+            First objective of each building at the bounds, used for the epsilon constraints of the SPs at building-scale
+        """
+        objectives = self.scenario["Objective"]
+        Pareto_IDs = [i for i in range(2, self.total_Pareto + 1) if i not in bounds]
+        Pareto_IDs = Pareto_IDs[:self.nPareto if self.method['switch_off_second_objective'] else 2 * self.nPareto]
+        n_batch = self.cpu_use if self.method['parallel_pareto'] else 1
+
+        def get_point(Pareto_ID):
+            df_Performance = self.results[Scn_ID][Pareto_ID]["df_Performance"]
+            return [pareto.get_district_objective(df_Performance, objective, self.ERA) for objective in objectives]
+
+        front = pd.DataFrame([get_point(Pareto_ID) for Pareto_ID in bounds], index=bounds, columns=['obj1', 'obj2'])
+        obj1_min, obj2_max = front.loc[bounds[0]]
+        obj1_max, obj2_min = front.loc[bounds[1]]
+        self.epsilon_constraints['EMOO_obj1'] = np.array([])
+        hypervolume = None
+
+        while Pareto_IDs:
+            df = pareto.normalize_front(front, obj1_min, obj1_max, obj2_min, obj2_max)
+            max_gap = pareto.get_gaps(df).gap.max()
+            previous_hypervolume, hypervolume = hypervolume, pareto.get_hypervolume(df)
+            self.logger.info('Pareto front: ' + str(len(front)) + ' points, largest gap ' + str(round(max_gap, 4)) +
+                             ', hypervolume ' + str(round(hypervolume, 4)))
+            if max_gap <= self.method['pareto_max_gap']:
+                break
+            if previous_hypervolume is not None and self.method['pareto_hypervolume_tolerance'] is not None and \
+                    hypervolume - previous_hypervolume < self.method['pareto_hypervolume_tolerance']:
+                break
+            epsilons = pareto.place_epsilons(df, min(n_batch, len(Pareto_IDs)), tried=self.epsilon_constraints['EMOO_obj1'])
+            if not epsilons:
+                break
+
+            points = []
+            for obj1_eps_lim, gap in epsilons:
+                scenario_point = copy.deepcopy(scenario)
+                scenario_point['EMOO']['EMOO_' + objectives[0]] = obj1_eps_lim
+                if self.method['building-scale'] and obj1_max > obj1_min:
+                    share = (obj1_eps_lim - obj1_min) / (obj1_max - obj1_min)
+                    epsilon_init = (obj1_house_max - obj1_house_min) * share + obj1_house_min
+                else:
+                    epsilon_init = None
+
+                self.epsilon_constraints['EMOO_obj1'] = np.append(self.epsilon_constraints['EMOO_obj1'], obj1_eps_lim)
+                self.logger.info('---------------> ' + str(objectives[0]) + ' LIMIT: ' + str(obj1_eps_lim) + ' (gap ' + str(round(gap, 4)) + ')')
+                points.append((Pareto_IDs.pop(0), scenario_point, epsilon_init))
+
+            self.solve_pareto_points(Scn_ID, points)
+            for Pareto_ID, _, _ in points:
+                front.loc[Pareto_ID] = get_point(Pareto_ID)
+
+        self.logger.info('Adaptive Pareto curve: ' + str(len(front) - 2) + ' intermediate point(s) solved')
+
+    def solve_pareto_point(self, Scn_ID, Pareto_ID, scenario, epsilon_init=None):
+        """
+        Solves an intermediate point of a Pareto curve, i.e. one objective with an epsilon constraint on the other, and stores its results.
+
+        Parameters
+        ----------
+        Scn_ID : str
+            ID of the optimization scenario
+        Pareto_ID : int
+            ID of the Pareto point
+        scenario : dict
+            Objective and epsilon constraint of the point
+        epsilon_init : array, optional
+            Epsilon constraints of the SPs at the initialization of the decomposition
+        """
+        if self.method['district-scale']:
+            ampl, exitcode = self.execute_dantzig_wolfe_decomposition(scenario, Scn_ID, Pareto_ID=Pareto_ID, epsilon_init=epsilon_init)
+        else:
+            if self.method['use_facades'] or self.method['use_pv_orientation']:
+                reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed,
+                                  self.cluster, scenario, self.method, self.solver, self.qbuildings_data)
+            else:
+                reho = SubProblem(self.infrastructure, self.buildings_data, self.local_data, self.parameters, self.set_indexed,
+                                  self.cluster, scenario, self.method, self.solver)
+            ampl, exitcode = reho.solve_model()
+
+        self.add_df_Results(ampl, Scn_ID, Pareto_ID, scenario)
+        self.get_KPIs(Scn_ID, Pareto_ID=Pareto_ID)
+        self.end_checkpoint_run(False)
+
+        del ampl
+        gc.collect()  # free memory
+
+    def execute_pareto_point(self, Scn_ID, Pareto_ID, scenario, epsilon_init, first_feasible_solution):
+        """
+        Solves a Pareto point in a worker of ``solve_pareto_points`` and returns its results, see ``get_pareto_point_results``.
+        """
+        if not self.method['include_all_solutions']:
+            self.initialize_optimization_tracking_attributes()  # the results of the previous points of the worker are not needed
+            self.results = dict()
+        self.feasible_solutions = first_feasible_solution
+        self.solve_pareto_point(Scn_ID, Pareto_ID, scenario, epsilon_init)
+        return self.get_pareto_point_results(Scn_ID, Pareto_ID)
+
+    def get_pareto_point_results(self, Scn_ID, Pareto_ID):
+        """
+        Returns the results of a Pareto point, with the bookkeeping of its decomposition.
+
+        Returns
+        -------
+        point_results : dict
+            ``results`` of the point and the number of ``feasible_solutions`` after it. For the decomposition, also its
+            ``results_SP`` and ``results_MP``, the keys of its SP ``columns`` and their ``column_hashes``, and its rows of
+            the ``tables``, ``stopping_criteria`` and ``reduced_costs``.
+        """
+        point_results = {'results': self.results[Scn_ID][Pareto_ID], 'feasible_solutions': self.feasible_solutions}
+        if not (self.method['building-scale'] or self.method['district-scale']):
+            return point_results
+
+        point_results['results_SP'] = self.results_SP[Scn_ID][Pareto_ID]
+        point_results['columns'] = [key for key in self.results_SP.records if key[:2] == (Scn_ID, Pareto_ID)]
+        point_results['column_hashes'] = {h: key for h, key in self.column_hashes.items() if key[:2] == (Scn_ID, Pareto_ID)}
+        point_results['results_MP'] = self.results_MP[Scn_ID][Pareto_ID]
+        point_results['tables'] = {name: self.select_pareto_rows(table.to_frame(), Scn_ID, Pareto_ID) for name, table in self.tables.items()}
+        point_results['stopping_criteria'] = self.select_pareto_rows(self.stopping_criteria, Scn_ID, Pareto_ID)
+        point_results['reduced_costs'] = self.select_pareto_rows(self.reduced_costs, Scn_ID, Pareto_ID)
+        return point_results
+
+    def add_pareto_point_results(self, Scn_ID, Pareto_ID, point_results):
+        """
+        Adds the results of a Pareto point solved by another process, as returned by ``get_pareto_point_results``.
+        """
+        self.results.setdefault(Scn_ID, {})[Pareto_ID] = point_results['results']
+        if 'results_SP' not in point_results:
+            return
+
+        columns = set(point_results['columns'])
+        for iter, solutions in point_results['results_SP'].items():
+            for f, houses in solutions.items():
+                for h, df_Results in houses.items():
+                    self.results_SP.add(Scn_ID, Pareto_ID, iter, f, h, df_Results, column=(Scn_ID, Pareto_ID, iter, f, h) in columns)
+        self.column_hashes.update(point_results['column_hashes'])
+        self.results_MP.setdefault(Scn_ID, {})[Pareto_ID] = point_results['results_MP']
+        for name, df in point_results['tables'].items():
+            self.tables[name].extend(df)
+        self.number_MP_solutions = None  # computed when read
+        self.stopping_criteria = pd.concat([self.stopping_criteria, point_results['stopping_criteria']])
+        self.reduced_costs = pd.concat([self.reduced_costs, point_results['reduced_costs']])
+
     def get_DHN_costs(self):
 
-        self.pool = mp.Pool(self.cpu_use)
         self.iter = 0  # new scenario has to start at iter = 0
         method = self.method['building-scale']
         self.method['building-scale'] = True
+        self.pool = self.get_SP_pool()
         scenario = self.scenario.copy()
         scenario["specific"] = scenario["specific"] + ["enforce_DHN"]
         scenario_MP, SP_scenario, SP_scenario_init = self.select_SP_obj_decomposition(scenario)
@@ -397,7 +745,11 @@ class REHO(MasterProblem):
         for bui in self.infrastructure.houses.keys():
             self.infrastructure.Units_Parameters.loc["DHN_pipes_" + bui, ["Units_Fmax", "Cost_inv2"]] = [heat_flow[bui] * 1.001, dhn_invh]
 
-        self.pool.close()
+        if self.pool is not None:
+            self.pool.clear_warm_models()
+        workers.clear_warm_models()
+        if not self.DW_params['keep_SP_pool']:
+            self.close_SP_pool()
         self.method['building-scale'] = method
         self.initialize_optimization_tracking_attributes()
 
@@ -623,12 +975,7 @@ class REHO(MasterProblem):
         return df_Results
 
     def get_final_SPs_results(self, MP_selection, df_name):
-        data = self.return_combined_SP_results(self.results_SP, df_name)
-        df = pd.DataFrame()
-        for idx in MP_selection.values:
-            df_idx = data.xs(idx, level=('FeasibleSolution', 'house'), drop_level=False)
-            df = pd.concat([df, df_idx])
-        return df
+        return self.results_SP.select(df_name, solutions=MP_selection.values)
 
     def get_KPIs(self, Scn_ID=0, Pareto_ID=0):
         df_KPI, df_Economics = calculate_KPIs(self.results[Scn_ID][Pareto_ID], self.infrastructure, self.buildings_data)
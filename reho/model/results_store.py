@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+
+__doc__ = """
+File for storing the results of the sub-problems of the decomposition.
+"""
+
+
+class ResultsStore(dict):
+    """
+    Append-only store of the SP results, indexed by (Scn_ID, Pareto_ID, Iter, FeasibleSolution, house).
+
+    The store is the usual nested dictionary ``results_SP[Scn_ID][Pareto_ID][Iter][FeasibleSolution][house][df_name]``,
+    so that the existing code can keep reading it. The results added with ``add`` are also indexed on their full key,
+    which allows to concatenate only the results of interest with ``select``, instead of all the results stored.
+
+    Notes
+    -----
+    - The results must be added with ``add`` to be found by ``select``.
+    - The concatenations are cached until the next result is added.
+    """
+
+    levels = ['Scn_ID', 'Pareto_ID', 'Iter', 'FeasibleSolution', 'house']
+
+    def __init__(self):
+        super().__init__()
+        self.records = dict()  # (Scn_ID, Pareto_ID, Iter, FeasibleSolution, house) -> df_Results
+        self.cache = dict()
+
+    def __getstate__(self):
+        return {'records': self.records, 'cache': dict()}
+
+    @classmethod
+    def from_nested(cls, results_SP):
+        """
+        Returns the store of the results of a nested dictionary ``results_SP[Scn_ID][Pareto_ID][Iter][FeasibleSolution][house]``,
+        e.g. the results_SP of an object pickled before the store. All the results are indexed.
+        """
+        store = cls()
+        for Scn_ID, paretos in results_SP.items():
+            for Pareto_ID, iters in paretos.items():
+                for Iter, solutions in iters.items():
+                    for FeasibleSolution, houses in solutions.items():
+                        for house, df_Results in houses.items():
+                            store.add(Scn_ID, Pareto_ID, Iter, FeasibleSolution, house, df_Results)
+        return store
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def add(self, Scn_ID, Pareto_ID, Iter, FeasibleSolution, house, df_Results, column=True):
+        """
+        Adds the results of one SP.
+
+        Parameters
+        ----------
+        Scn_ID : int or str
+        Pareto_ID : int
+        Iter : int
+        FeasibleSolution : int
+        house : str
+        df_Results : dict
+            Results of the SP, as returned by ``write_results.get_df_Results_from_SP``.
+        column : bool, optional
+            False for a solution identical to a previous one of the house: it is only stored in the nested dictionary,
+            and is not found by ``select`` and the other methods.
+        """
+        self.setdefault(Scn_ID, {}).setdefault(Pareto_ID, {}).setdefault(Iter, {}).setdefault(FeasibleSolution, {})[house] = df_Results
+        if column:
+            self.records[(Scn_ID, Pareto_ID, Iter, FeasibleSolution, house)] = df_Results
+            self.cache.clear()
+
+    def keys_matching(self, Scn_ID=None, Pareto_ID=None, FeasibleSolution=None, house=None):
+        """
+        Returns the keys of the results matching the filters. Each filter is either None (no filter), a value or a list of values.
+        """
+        filters = []
+        for level, value in [(0, Scn_ID), (1, Pareto_ID), (3, FeasibleSolution), (4, house)]:
+            if value is not None:
+                filters.append((level, set(np.atleast_1d(value).tolist())))
+        return [key for key in self.records if all(key[level] in values for level, values in filters)]
+
+    def get_level_values(self, level, **filters):
+        """
+        Returns the sorted unique values of a level (e.g. 'FeasibleSolution') among the results matching the filters.
+        """
+        position = self.levels.index(level)
+        return np.array(sorted({key[position] for key in self.keys_matching(**filters)}))
+
+    def select(self, df_name, Scn_ID=None, Pareto_ID=None, FeasibleSolution=None, house=None, solutions=None):
+        """
+        Concatenates one result DataFrame of the SPs matching the filters.
+
+        Parameters
+        ----------
+        df_name : str
+            Name of the result, e.g. 'df_Performance'.
+        Scn_ID, Pareto_ID, FeasibleSolution, house : optional
+            Filters on the index, either a value or a list of values.
+        solutions : iterable of tuples, optional
+            (FeasibleSolution, house) pairs to select, e.g. the SP solutions chosen by the MP. The results are then
+            concatenated in the order of the pairs.
+
+        Returns
+        -------
+        df : pd.DataFrame
+            Results indexed by (Scn_ID, Pareto_ID, Iter, FeasibleSolution, house) and the index of the result.
+        """
+        if solutions is not None:
+            solutions = [tuple(s) for s in solutions]
+        cache_key = (df_name, self._hashable(Scn_ID), self._hashable(Pareto_ID), self._hashable(FeasibleSolution),
+                     self._hashable(house), None if solutions is None else tuple(solutions))
+        if cache_key in self.cache:
+            return self.cache[cache_key]
+
+        keys = self.keys_matching(Scn_ID, Pareto_ID, FeasibleSolution, house)
+        if solutions is None:
+            df = pd.concat([self.records[key][df_name] for key in keys], keys=keys, names=self.levels, axis=0)
+            df = df.sort_index()
+        else:
+            keys_of_solution = {(key[3], key[4]): key for key in keys}
+            keys = [keys_of_solution[s] for s in solutions if s in keys_of_solution]
+            df = pd.concat([self.records[key][df_name].sort_index() for key in keys], keys=keys, names=self.levels, axis=0)
+
+        self.cache[cache_key] = df
+        return df
+
+    def renumber_pareto(self, Scn_ID, idxvalues):
+        """
+        Renumbers the Pareto_IDs of a scenario: the results of the Pareto_ID ``idxvalues[i]`` get the Pareto_ID ``i + 1``.
+        """
+        self[Scn_ID] = {i + 1: self[Scn_ID][Pareto_ID] for i, Pareto_ID in enumerate(idxvalues)}
+        new_ID = {Pareto_ID: i + 1 for i, Pareto_ID in enumerate(idxvalues)}
+        records = dict()
+        for key, df_Results in self.records.items():
+            if key[0] != Scn_ID:
+                records[key] = df_Results
+            elif key[1] in new_ID:
+                records[(key[0], new_ID[key[1]]) + key[2:]] = df_Results
+        self.records = records
+        self.cache.clear()
+
+    @staticmethod
+    def _hashable(value):
+        if value is None or np.isscalar(value):
+            return value
+        return tuple(np.atleast_1d(value).tolist())
+
+
+class RecordBuffer:
+    """
+    Table filled one row at a time and materialized as a DataFrame only when it is read.
+
+    Appending a row costs the same whatever the size of the table, whereas concatenating a DataFrame per row copies
+    the whole table every time.
+
+    Parameters
+    ----------
+    df : pd.DataFrame, optional
+        Rows already materialized.
+    index_names : list, optional
+        Names of the levels of the index of the rows. If None, the rows are numbered as with ``ignore_index``.
+    """
+
+    def __init__(self, df=None, index_names=None):
+        self.df = pd.DataFrame() if df is None else df
+        self.index_names = index_names
+        self.rows = []
+        self.index = []
+
+    def __len__(self):
+        return len(self.df) + len(self.rows)
+
+    def append(self, row, index=None):
+        """
+        Appends a row, given as a dictionary {column: value}, with its index as a tuple if the table has index names.
+        """
+        self.rows.append(row)
+        self.index.append(index)
+
+    def extend(self, df):
+        """
+        Appends the rows of a DataFrame with the same columns, e.g. a table filled by another process.
+        """
+        self.to_frame()
+        if df.empty:
+            return
+        if self.df.empty:
+            self.df = df.reset_index(drop=True) if self.index_names is None else df
+        else:
+            self.df = pd.concat([self.df, df], ignore_index=self.index_names is None)
+
+    def to_frame(self):
+        """
+        Returns the table as a DataFrame, concatenating the rows appended since the last call.
+        """
+        if self.rows:
+            if self.index_names is None:
+                index = pd.RangeIndex(len(self.df), len(self.df) + len(self.rows))
+            else:
+                index = pd.MultiIndex.from_tuples(self.index, names=self.index_names)
+            df = pd.DataFrame.from_records(self.rows, index=index)
+            self.df = df if self.df.empty else pd.concat([self.df, df])
+            self.rows = []
+            self.index = []
+        return self.df
@@ -1,11 +1,12 @@
 import itertools as itertools
 import logging
+import time
 
 from amplpy import AMPL, Environment
 
 import reho.model.preprocessing.buildings_profiles as buildings_profiles
 import reho.model.preprocessing.weather as weather
-from reho.model.preprocessing.skydome import irradiation_to_df
+from reho.model.preprocessing.skydome import get_skydome_data
 from reho.model.preprocessing.QBuildings import *
 import reho.model.preprocessing.actors as actors
 from reho.model.preprocessing import renovation
@@ -14,6 +15,8 @@ __doc__ = """
 File for handling data and optimization for an AMPL sub-problem.
 """
 
+_model_templates = dict()  # model files and their modification times -> concatenated model, see get_model_template
+
 
 class SubProblem:
     """
@@ -70,6 +73,7 @@ class SubProblem:
         self.method_sp = method
         self.solver = solver
         self.parameters_to_ampl = dict()
+        self.transfer_time = 0.0
 
     def build_model_without_solving(self):
         self.initialize_parameters_for_ampl_and_python()
@@ -148,73 +152,43 @@ class SubProblem:
         # -----------------------------------------------------------------------------------------------------#
         #  MODEL FILES
         # -----------------------------------------------------------------------------------------------------#
+        ampl.eval(get_model_template(self.get_model_files()))
         ampl.cd(path_to_ampl_model)
-        ampl.read('sub_problem.mod')
-        ampl.read('scenario.mod')
+
+        return ampl
+
+    def get_model_files(self):
+        """
+        Returns the model files of the SP in their reading order.
+
+        The files depend only on the units of the building (``infrastructure_sp.UnitTypes``) and on the methods
+        'use_pv_orientation' and 'interperiod_storage', see ``get_model_template``.
+        """
+        unit_types = self.infrastructure_sp.UnitTypes
+        files = [os.path.join(path_to_ampl_model, 'sub_problem.mod'), os.path.join(path_to_ampl_model, 'scenario.mod')]
+
         # Energy conversion Units
-        ampl.cd(path_to_units)
-        if 'ElectricalHeater' in self.infrastructure_sp.UnitTypes:
-            ampl.read('electrical_heater.mod')
-        if 'NG_Boiler' in self.infrastructure_sp.UnitTypes:
-            ampl.read('ng_boiler.mod')
-        if 'OIL_Boiler' in self.infrastructure_sp.UnitTypes:
-            ampl.read('oil_boiler.mod')
-        if 'WOOD_Stove' in self.infrastructure_sp.UnitTypes:
-            ampl.read('wood_stove.mod')
-        if 'HeatPump' in self.infrastructure_sp.UnitTypes:
-            ampl.read('heatpump.mod')
-        if 'AirConditioner' in self.infrastructure_sp.UnitTypes:
-            ampl.read('air_conditioner.mod')
-        if 'ThermalSolar' in self.infrastructure_sp.UnitTypes:
-            ampl.read('thermal_solar.mod')
-        if 'DataHeat' in self.infrastructure_sp.UnitTypes:
-            ampl.read('data_heat.mod')
-        if 'DHN_hex' in self.infrastructure_sp.UnitTypes:
-            ampl.read('dhn_hex.mod')
-            ampl.read('dhn_pipes.mod')
-        if 'PV' in self.infrastructure_sp.UnitTypes:
-            if self.method_sp['use_pv_orientation']:
-                ampl.read('pv_orientation.mod')
-            else:
-                ampl.read('pv.mod')
-        if 'rSOC' in self.infrastructure_sp.UnitTypes:
-            ampl.read('rsoc.mod')
-        if "Methanator" in self.infrastructure_sp.UnitTypes:
-            ampl.read('methanator.mod')
-        if 'FuelCell' in self.infrastructure_sp.UnitTypes:
-            ampl.read('fuel_cell.mod')
-        if 'Electrolyzer' in self.infrastructure_sp.UnitTypes:
-            ampl.read('electrolyzer.mod')
-        if 'WaterTankSH' in self.infrastructure_sp.UnitTypes:
-            ampl.read('heatstorage.mod')
-        if 'WaterTankDHW' in self.infrastructure_sp.UnitTypes:
-            ampl.read('dhwstorage.mod')
-        if 'Battery' in self.infrastructure_sp.UnitTypes:
-            ampl.read('battery.mod')
-        # ampl.read('heat_curtailment.mod')
+        units_files = {'ElectricalHeater': ['electrical_heater.mod'], 'NG_Boiler': ['ng_boiler.mod'], 'OIL_Boiler': ['oil_boiler.mod'],
+                       'WOOD_Stove': ['wood_stove.mod'], 'HeatPump': ['heatpump.mod'], 'AirConditioner': ['air_conditioner.mod'],
+                       'ThermalSolar': ['thermal_solar.mod'], 'DataHeat': ['data_heat.mod'], 'DHN_hex': ['dhn_hex.mod', 'dhn_pipes.mod'],
+                       'PV': ['pv_orientation.mod' if self.method_sp['use_pv_orientation'] else 'pv.mod'], 'rSOC': ['rsoc.mod'],
+                       'Methanator': ['methanator.mod'], 'FuelCell': ['fuel_cell.mod'], 'Electrolyzer': ['electrolyzer.mod'],
+                       'WaterTankSH': ['heatstorage.mod'], 'WaterTankDHW': ['dhwstorage.mod'], 'Battery': ['battery.mod']}
+        for unit_type, unit_files in units_files.items():
+            if unit_type in unit_types:
+                files += [os.path.join(path_to_units, file) for file in unit_files]
 
         # Load interperiod storage units
         if self.method_sp['interperiod_storage']:
-            ampl.cd(path_to_units_interperiod)
-
-            if 'Battery_interperiod' in self.infrastructure_sp.UnitTypes:
-                ampl.read('battery_IP.mod')
-            if 'H2storage' in self.infrastructure_sp.UnitTypes:
-                ampl.read('H2storage_IP.mod')
-            if 'CH4storage' in self.infrastructure_sp.UnitTypes:
-                ampl.read('CH4storage_IP.mod')
-            if 'CO2storage' in self.infrastructure_sp.UnitTypes:
-                ampl.read('CO2storage_IP.mod')
-
-            # if 'WaterTankSH_interperiod' in self.infrastructure_sp.UnitTypes:
-            #    ampl.read('heatstorage_IP.mod')
+            interperiod_files = {'Battery_interperiod': 'battery_IP.mod', 'H2storage': 'H2storage_IP.mod',
+                                 'CH4storage': 'CH4storage_IP.mod', 'CO2storage': 'CO2storage_IP.mod'}
+            files += [os.path.join(path_to_units_interperiod, file) for unit_type, file in interperiod_files.items() if unit_type in unit_types]
 
         # Load EV units (district-scale, but can be included in building-scale)
-        if 'EV' in self.infrastructure_sp.UnitTypes:
-            ampl.cd(path_to_district_units)
-            ampl.read('evehicle.mod')
+        if 'EV' in unit_types:
+            files.append(os.path.join(path_to_district_units, 'evehicle.mod'))
 
-        return ampl
+        return tuple(files)
 
     def set_weather_data(self, ampl):
         # -----------------------------------------------------------------------------------------------------#
@@ -354,44 +328,58 @@ class SubProblem:
                 del self.parameters_sp["T_source_cool"]
 
     def set_streams_temperature(self, ampl):
+        """
+        Sets the inlet and outlet temperatures of the streams of the building at each timestep.
 
+        The table only depends on the building and on the timesteps of the periods. It is therefore built once per
+        building and timesteps, and kept in ``infrastructure_sp.streams_T`` for the next SPs of the building.
+        """
         df_end = ampl.getParameter('TimeEnd').getValues().toPandas()
-        timesteps = int(df_end['TimeEnd'].sum())
-        df_Streams_T = pd.DataFrame(columns=["Period", "Time", "Streams", "Streams_Tout", "Streams_Tin"])
-        df_Streams_T = df_Streams_T.set_index(["Period", "Time", "Streams"])
+        time_end = tuple((p, int(df_end["TimeEnd"][p])) for p in df_end.index)
+        if time_end not in self.infrastructure_sp.streams_T:
+            self.infrastructure_sp.streams_T[time_end] = self.get_streams_temperature(time_end)
+        self.parameters_to_ampl['streams_T'] = self.infrastructure_sp.streams_T[time_end]
+
+    def get_streams_temperature(self, time_end):
+        """
+        Returns the inlet and outlet temperatures of the streams of the building, repeated at each timestep.
 
-        index = [[(i, j + 1) for j in list(range(int(df_end["TimeEnd"][i])))] for i in df_end.index]
-        index = [j for i in index for j in i]
-        index = pd.MultiIndex.from_tuples(index, names=["Period", "Time"])
+        Parameters
+        ----------
+        time_end : tuple
+            (Period, TimeEnd) of each period.
 
+        Returns
+        -------
+        df_Streams_T : pd.DataFrame
+            Columns 'Streams_Tout' and 'Streams_Tin', indexed by (Streams, Period, Time).
+        """
+        streams, Tout, Tin = [], [], []
         for bui in self.infrastructure_sp.houses:
             for unit_data in self.infrastructure_sp.houses[bui]["units"]:
                 for i, T_level in enumerate(unit_data["StreamsOfUnit"]):
-                    stream = unit_data["Unit"] + '_' + bui + '_' + T_level
-                    df = pd.DataFrame(np.repeat(stream, timesteps), index=index, columns=["Streams"])
-                    df["Streams_Tout"] = unit_data["stream_Tout"][i]
-                    df["Streams_Tin"] = unit_data["stream_Tin"][i]
-                    df.set_index("Streams", append=True, inplace=True)
-                    df_Streams_T = pd.concat([df_Streams_T, df])
+                    streams.append(unit_data["Unit"] + '_' + bui + '_' + T_level)
+                    Tout.append(unit_data["stream_Tout"][i])
+                    Tin.append(unit_data["stream_Tin"][i])
             for stream in self.infrastructure_sp.StreamsOfBuilding[bui]:
-                df = pd.DataFrame(np.repeat(stream, timesteps), index=index, columns=["Streams"])
-                df["Streams_Tout"] = 40  # default value that is changed in data_stream.dat
-                df["Streams_Tin"] = 50  # default value that is changed in data_stream.dat
-                df.set_index("Streams", append=True, inplace=True)
-                df_Streams_T = pd.concat([df_Streams_T, df])
-
-        self.parameters_to_ampl['streams_T'] = df_Streams_T.reorder_levels([2, 0, 1])
+                streams.append(stream)
+                Tout.append(40)  # default value that is changed in data_stream.dat
+                Tin.append(50)  # default value that is changed in data_stream.dat
+
+        periods = np.concatenate([np.repeat(p, n) for p, n in time_end])
+        times = np.concatenate([np.arange(1, n + 1) for p, n in time_end])
+        timesteps = len(periods)
+        index = pd.MultiIndex.from_arrays([np.repeat(streams, timesteps), np.tile(periods, len(streams)), np.tile(times, len(streams))],
+                                          names=["Streams", "Period", "Time"])
+        return pd.DataFrame({"Streams_Tout": np.repeat(np.array(Tout, dtype=float), timesteps),
+                             "Streams_Tin": np.repeat(np.array(Tin, dtype=float), timesteps)}, index=index)
 
     def set_skydome_parameters(self):
         # --------------- PV Panels ---------------------------------------------------------------------------#
 
-        df_dome = pd.read_csv(os.path.join(path_to_skydome, 'skydome.csv'))
-        self.parameters_to_ampl['Sin_a'] = df_dome.Sin_a.values
-        self.parameters_to_ampl['Cos_a'] = df_dome.Cos_a.values
-        self.parameters_to_ampl['Sin_e'] = df_dome.Sin_e.values
-        self.parameters_to_ampl['Cos_e'] = df_dome.Cos_e.values
-
-        self.parameters_to_ampl['Irr_patches'] = irradiation_to_df(self.local_data)
+        skydome = get_skydome_data(self.local_data)  # computed once per clustering
+        for key in ['Sin_a', 'Cos_a', 'Sin_e', 'Cos_e', 'Irr_patches']:
+            self.parameters_to_ampl[key] = skydome[key]
         # On Flat Roofs optimal Orientation of PV panel is chosen by the solver, Construction of possible Configurations
         # Azimuth = np.array([])
         # Tilt = np.array([])
@@ -488,61 +476,27 @@ class SubProblem:
 
     def send_parameters_and_sets_to_ampl(self, ampl):
         """
-        Load data to AMPL depending on their type
+        Load data to AMPL depending on their type.
+
+        The indexed sets are sent in one data statement and the parameters sharing an index in one DataFrame, see
+        ``send_sets_to_ampl`` and ``send_parameters_to_ampl``. The time spent is kept in ``transfer_time``.
         """
+        start = time.perf_counter()
 
         for key in self.parameters_sp:
             self.parameters_to_ampl[key] = self.parameters_sp[key]
 
         # set new indexed sets
-        for s in self.set_indexed_sp:
-            if isinstance(self.set_indexed_sp[s], np.ndarray):
-                ampl.getSet(str(s)).setValues(self.set_indexed_sp[s])
-            elif isinstance(self.set_indexed_sp[s], dict):
-                for i, instance in ampl.getSet(str(s)):
-                    try:
-                        instance.setValues(self.set_indexed_sp[s][i[0]])
-                    except ValueError:
-                        instance.setValues([self.set_indexed_sp[s][i[0]]])
-            else:
-                raise ValueError('Type Error setting AMPLPY Set', s)
+        send_sets_to_ampl(ampl, self.set_indexed_sp)
 
         # set new input Parameter
-        for i in self.parameters_to_ampl:
+        send_parameters_to_ampl(ampl, self.parameters_to_ampl)
 
-            if isinstance(self.parameters_to_ampl[i], np.ndarray):
-                Para = ampl.getParameter(i)
-                Para.setValues(self.parameters_to_ampl[i])
-
-            elif isinstance(self.parameters_to_ampl[i], list):
-                Para = ampl.getParameter(i)
-                Para.setValues(np.array(self.parameters_to_ampl[i]))
-
-            elif isinstance(self.parameters_to_ampl[i], pd.DataFrame):
-                ampl.setData(self.parameters_to_ampl[i])
-
-            elif isinstance(self.parameters_to_ampl[i], pd.Series):
-                self.parameters_to_ampl[i].name = i
-                df = pd.DataFrame(self.parameters_to_ampl[i])
-                ampl.setData(df)
-
-            elif isinstance(self.parameters_to_ampl[i], dict):
-                Para = ampl.getParameter(i)
-                Para.setValues(self.parameters_to_ampl[i])
-
-            elif isinstance(self.parameters_to_ampl[i], float):
-                Para = ampl.getParameter(i)
-                Para.setValues([self.parameters_to_ampl[i]])
-
-            elif isinstance(self.parameters_to_ampl[i], int):
-                Para = ampl.getParameter(i)
-                Para.setValues([self.parameters_to_ampl[i]])
-
-            else:
-                raise ValueError('Type Error setting AMPLPY Parameter', i)
-
-        ampl.readData('data_stream.dat')  # TODO remove data_stream.dat
+        # TODO remove data_stream.dat
+        ampl.eval(get_data_statements(os.path.join(path_to_ampl_model, 'data_stream.dat')))
 
+        self.transfer_time = time.perf_counter() - start
+        logging.debug('Data sent to AMPL in ' + str(round(self.transfer_time, 3)) + ' s')
         return ampl
 
     def set_scenario(self, ampl):
@@ -638,6 +592,41 @@ class SubProblem:
         return ampl, exitcode
 
 
+def get_model_template(files):
+    """
+    Returns the model files concatenated into a single model, which AMPL reads in one call.
+
+    The model is read from the disk once per process and configuration of the files, instead of once per SP.
+    A file modified since is read again.
+
+    Parameters
+    ----------
+    files : tuple
+        Paths of the model files in their reading order, see ``SubProblem.get_model_files``.
+
+    Returns
+    -------
+    model : str
+    """
+    key = tuple((file, os.path.getmtime(file)) for file in files)
+    if key not in _model_templates:
+        model = []
+        for file in files:
+            with open(file, encoding='utf-8') as f:
+                model.append(f.read())
+        _model_templates[key] = '\n'.join(model) + '\n'  # some files do not end with a new line
+    return _model_templates[key]
+
+
+def get_data_statements(file):
+    """
+    Returns the content of a data file within a ``data; ... model;`` block, read by AMPL as ``readData(file)`` would.
+
+    As the model files, the file is read from the disk once per process, see ``get_model_template``.
+    """
+    return 'data;\n' + get_model_template((file,)) + 'model;'
+
+
 def initialize_default_methods(method):
     """
     Sets the default options for an optimization.
@@ -661,8 +650,16 @@ def initialize_default_methods(method):
         method['district-scale'] = False
     if 'parallel_computation' not in method:
         method['parallel_computation'] = True
+    if 'parallel_pareto' not in method:
+        method['parallel_pareto'] = False
     if 'switch_off_second_objective' not in method:
         method['switch_off_second_objective'] = False
+    if 'adaptive_pareto' not in method:
+        method['adaptive_pareto'] = False
+    if 'pareto_max_gap' not in method:
+        method['pareto_max_gap'] = 0.1
+    if 'pareto_hypervolume_tolerance' not in method:
+        method['pareto_hypervolume_tolerance'] = None
     if 'skip_initiation' not in method:
         method['skip_initiation'] = False
 
@@ -712,6 +709,135 @@ def initialize_default_methods(method):
     return method
 
 
+def send_parameters_to_ampl(ampl, parameters):
+    """
+    Sends a dictionary of parameters to an AMPL model, depending on their type.
+
+    The parameters given as a pd.Series or as a dictionary of scalars are grouped by index, and each group is sent
+    in one DataFrame instead of one call per parameter.
+
+    Parameters
+    ----------
+    ampl : AMPL
+        AMPL model in which the parameters are set.
+    parameters : dict
+        Parameters to set, where the key is the name of the parameter in the AMPL model.
+
+    Raises
+    ------
+    ValueError: If a parameter has a type that cannot be sent to AMPL
+    """
+    groups = []  # (index, {parameter: values}) of the parameters sent together
+
+    def add_to_group(name, series):
+        for index, columns in groups:
+            if index is series.index or (len(index) == len(series) and index.equals(series.index)):
+                columns[name] = series.values
+                return
+        groups.append((series.index, {name: series.values}))
+
+    for i in parameters:
+
+        if isinstance(parameters[i], np.ndarray):
+            Para = ampl.getParameter(i)
+            Para.setValues(parameters[i])
+
+        elif isinstance(parameters[i], list):
+            Para = ampl.getParameter(i)
+            Para.setValues(np.array(parameters[i]))
+
+        elif isinstance(parameters[i], pd.DataFrame):
+            ampl.setData(parameters[i])
+
+        elif isinstance(parameters[i], pd.Series):
+            add_to_group(i, parameters[i])
+
+        elif isinstance(parameters[i], dict):
+            if parameters[i] and all(np.isscalar(value) for value in parameters[i].values()):
+                add_to_group(i, pd.Series(parameters[i]))
+            else:
+                Para = ampl.getParameter(i)
+                Para.setValues(parameters[i])
+
+        elif isinstance(parameters[i], float):
+            Para = ampl.getParameter(i)
+            Para.setValues([parameters[i]])
+
+        elif isinstance(parameters[i], int):
+            Para = ampl.getParameter(i)
+            Para.setValues([parameters[i]])
+
+        else:
+            raise ValueError('Type Error setting AMPLPY Parameter', i)
+
+    for index, columns in groups:
+        ampl.setData(pd.DataFrame(columns, index=index))
+
+
+def send_sets_to_ampl(ampl, sets):
+    """
+    Sends a dictionary of sets to an AMPL model.
+
+    The sets given as an array are set one by one. The indexed sets, given as a dictionary {index: members}, are all
+    written in one data statement instead of one call per instance. If AMPL rejects the statement, e.g. for an index
+    outside of the indexing set, the instances of the AMPL sets are set one by one from the dictionaries instead, as before.
+
+    Parameters
+    ----------
+    ampl : AMPL
+        AMPL model in which the sets are set.
+    sets : dict
+        Sets to set, where the key is the name of the set in the AMPL model.
+
+    Raises
+    ------
+    ValueError: If a set has a type that cannot be sent to AMPL
+    """
+    statements = []
+    for s in sets:
+        if isinstance(sets[s], np.ndarray):
+            ampl.getSet(str(s)).setValues(sets[s])
+        elif isinstance(sets[s], dict):
+            for index, members in sets[s].items():
+                if isinstance(members, str) or np.isscalar(members):
+                    members = [members]
+                statements.append('set ' + str(s) + '[' + to_ampl_literal(index) + '] := ' + ' '.join(to_ampl_literal(m) for m in members) + ';')
+        else:
+            raise ValueError('Type Error setting AMPLPY Set', s)
+
+    if statements:
+        try:
+            ampl.eval('data;\n' + '\n'.join(statements) + '\nmodel;')
+        except Exception as error:
+            logging.warning('The indexed sets could not be sent in one data statement (' + str(error) + '), they are sent instance by instance.')
+            ampl.eval('model;')
+            for s in sets:
+                if isinstance(sets[s], dict):
+                    send_set_instances_to_ampl(ampl, s, sets[s])
+
+
+def send_set_instances_to_ampl(ampl, s, members):
+    """
+    Sets each instance of an indexed AMPL set with its members in the dictionary {index: members}.
+    """
+    for i, instance in ampl.getSet(str(s)):
+        try:
+            instance.setValues(members[i[0]])
+        except ValueError:
+            instance.setValues([members[i[0]]])
+
+
+def to_ampl_literal(value):
+    """
+    Returns a set member as written in an AMPL data statement: the strings are quoted, the numbers are not.
+    """
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    if isinstance(value, (bool, np.bool_, int, np.integer)):
+        return str(int(value))
+    return repr(float(value))
+
+
 def exitcode_from_ampl(ampl):
     solve_result = ampl.getData('solve_result').toList()[0]
     return 0 if solve_result == 'solved' else solve_result
@@ -0,0 +1,734 @@
+import abc
+import argparse
+import copy
+import math
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+__doc__ = """
+File for handling the worker processes that solve the sub-problems of the decomposition.
+"""
+
+# copy of the MasterProblem holding the inputs of the sub-problems, given to each worker at its creation
+_context = None
+
+# copies of the context for the worker threads, which share the module, see init_thread_worker
+_local = threading.local()
+
+# AMPL sub-problems kept alive in the current process between the iterations of a decomposition, see get_warm_model
+_warm_models = dict()
+_warm_token = None
+
+
+def init_worker(context):
+    """
+    Initializer of the worker processes: stores the inputs of the sub-problems once for all the tasks of the worker.
+
+    Parameters
+    ----------
+    context : MasterProblem
+        Copy of the MasterProblem without the results, see ``MasterProblem.get_SP_context``.
+    """
+    global _context
+    _context = context
+
+
+def init_thread_worker(context):
+    """
+    Initializer of the worker threads: stores a copy of the context for the thread.
+
+    Solving a sub-problem modifies the context (e.g. its ``parameters`` and ``solver_attributes``). The worker
+    processes each receive their own copy of it, the threads of a process are given one each in the same way.
+
+    Parameters
+    ----------
+    context : MasterProblem
+        Copy of the MasterProblem without the results, see ``MasterProblem.get_SP_context``.
+    """
+    _local.context = copy.deepcopy(context)
+
+
+def execute(method, *args):
+    """
+    Executes a method of the context stored in the worker, e.g. ``execute('SP_solve', scenario, Scn_ID, Pareto_ID, h, duals)``.
+    """
+    context = getattr(_local, 'context', _context)
+    return getattr(context, method)(*args)
+
+
+def get_warm_model(token, key):
+    """
+    Returns the sub-problem model stored in the current process for the given key.
+
+    Parameters
+    ----------
+    token : str
+        Identifier of the decomposition run. Models stored with another token are closed and discarded.
+    key : tuple
+        Identifier of the sub-problem, usually the house and the renovation option.
+
+    Returns
+    -------
+    model : dict or None
+        Stored model, with the AMPL instance under the key ``ampl``. None if there is no model for this key.
+    """
+    _check_token(token)
+    return _warm_models.get(key)
+
+
+def store_warm_model(token, key, model):
+    """
+    Stores a sub-problem model in the current process, so that the next iterations only update its dual values.
+
+    Parameters
+    ----------
+    token : str
+        Identifier of the decomposition run.
+    key : tuple
+        Identifier of the sub-problem.
+    model : dict
+        Model to store, with the AMPL instance under the key ``ampl``.
+    """
+    _check_token(token)
+    _warm_models[key] = model
+
+
+def clear_warm_models():
+    """
+    Closes all the AMPL instances stored in the current process.
+
+    Returns
+    -------
+    n_models : int
+        Number of models closed.
+    """
+    n_models = len(_warm_models)
+    for model in _warm_models.values():
+        try:
+            model['ampl'].close()
+        except:
+            pass
+    _warm_models.clear()
+    return n_models
+
+
+def _check_token(token):
+    global _warm_token
+    if token != _warm_token:
+        clear_warm_models()
+        _warm_token = token
+
+
+class PinnedPool:
+    """
+    Pool of single-process lanes, where all tasks submitted under the same key are executed by the same worker.
+
+    Used when the sub-problems are kept alive between the iterations of the decomposition: a house is always sent to
+    the process holding its model.
+
+    Parameters
+    ----------
+    processes : int, optional
+        Number of worker processes. By default, the number of CPUs.
+    initializer : function, optional
+        Function called by each worker at its start, as for ``multiprocessing.Pool``.
+    initargs : tuple, optional
+        Arguments of the initializer.
+    """
+
+    def __init__(self, processes=None, initializer=None, initargs=()):
+        if processes is None:
+            processes = mp.cpu_count()
+        self.lanes = [mp.Pool(1, initializer, initargs) for _ in range(processes)]
+        self.assignment = dict()
+        self.n_submitted = 0
+
+    def lane(self, key):
+        """
+        Returns the worker assigned to the key. Keys are spread round-robin on the lanes at their first use.
+        """
+        if key not in self.assignment:
+            self.assignment[key] = len(self.assignment) % len(self.lanes)
+        return self.lanes[self.assignment[key]]
+
+    def apply_async(self, func, args=(), kwds=None, callback=None, error_callback=None):
+        """
+        Submits a task that does not need a specific worker. The lanes are used in turn.
+        """
+        lane = self.lanes[self.n_submitted % len(self.lanes)]
+        self.n_submitted += 1
+        return lane.apply_async(func, args, kwds or {}, callback, error_callback)
+
+    def clear_warm_models(self):
+        """
+        Closes the models stored in the workers, which stay available for other tasks.
+        """
+        for lane in self.lanes:
+            lane.apply(clear_warm_models)
+
+    def close(self):
+        """
+        Closes the models stored in the workers and waits for the workers to exit.
+        """
+        self.clear_warm_models()
+        for lane in self.lanes:
+            lane.close()
+        for lane in self.lanes:
+            lane.join()
+
+    def terminate(self):
+        for lane in self.lanes:
+            lane.terminate()
+
+
+class Executor(abc.ABC):
+    """
+    Backend executing the SP tasks of the decomposition.
+
+    A backend is created with its settings only, e.g. the number of workers, and started by the MasterProblem with the
+    initializer of the workers at the beginning of a decomposition. The tasks are then submitted with ``apply_async``,
+    as for a ``multiprocessing.Pool``, and ``lane`` gives the worker to use for the tasks that must always be executed
+    by the same worker.
+
+    Parameters
+    ----------
+    n_workers : int, optional
+        Number of workers. By default, the number of CPUs.
+
+    Notes
+    -----
+    - Only the settings of a backend are pickled, so that it can be stored in the DW_params sent to the workers.
+    - The callbacks are called from a thread of the backend. They should only hand over the results.
+    - ``apply_async`` returns a handle of the task, whose ``get(timeout=None)`` waits for the result of the task and
+      raises its exception, as a ``multiprocessing.pool.AsyncResult``.
+    """
+
+    recyclable = True  # the workers can be stopped while running a task, see restart
+
+    def __init__(self, n_workers=None):
+        if n_workers is None:
+            n_workers = mp.cpu_count()
+        self.n_workers = n_workers
+        self.pinned = False
+
+    def __getstate__(self):
+        return {key: value for key, value in self.__dict__.items() if key in self.settings()}
+
+    def settings(self):
+        """
+        Returns the names of the attributes defining the backend, i.e. kept when the backend is pickled.
+        """
+        return ['n_workers', 'pinned']
+
+    @abc.abstractmethod
+    def start(self, initializer=None, initargs=(), pinned=False):
+        """
+        Starts the workers.
+
+        Parameters
+        ----------
+        initializer : function, optional
+            Function called by each worker at its start.
+        initargs : tuple, optional
+            Arguments of the initializer.
+        pinned : bool, optional
+            If True, each key given to ``lane`` is always executed by the same worker.
+
+        Returns
+        -------
+        self : Executor
+        """
+
+    @abc.abstractmethod
+    def apply_async(self, func, args=(), callback=None, error_callback=None):
+        """
+        Submits ``func(*args)``. ``callback`` is called with its result, or ``error_callback`` with the exception raised.
+
+        Returns
+        -------
+        handle : multiprocessing.pool.AsyncResult or TaskHandle
+            Handle of the task, whose ``get`` returns its result.
+        """
+
+    def lane(self, key):
+        """
+        Returns the object to which the tasks of the key are submitted, by default the backend itself.
+        """
+        return self
+
+    @abc.abstractmethod
+    def clear_warm_models(self):
+        """
+        Closes the SP models stored in the workers (see ``get_warm_model``) and keeps the workers for the next tasks.
+        Only pinned workers store models.
+        """
+
+    @abc.abstractmethod
+    def close(self):
+        """
+        Waits for the tasks submitted, closes the models stored in the workers and stops the workers.
+        """
+
+    def terminate(self):
+        """
+        Stops the workers without waiting for their tasks.
+        """
+        self.close()
+
+    def restart(self):
+        """
+        Stops the workers without waiting for their tasks and starts new ones with the same initializer, e.g. to free
+        a worker stuck on a SP that timed out. The tasks that were not completed are lost and must be submitted again.
+        """
+        self.terminate()
+        return self.start(self.initializer, self.initargs, self.pinned)
+
+
+class ProcessExecutor(Executor):
+    """
+    Local pool of processes, a ``multiprocessing.Pool`` or a PinnedPool when the tasks are pinned.
+    """
+
+    def start(self, initializer=None, initargs=(), pinned=False):
+        self.pinned, self.initializer, self.initargs = pinned, initializer, initargs
+        if pinned:
+            self.pool = PinnedPool(self.n_workers, initializer=initializer, initargs=initargs)
+        else:
+            self.pool = mp.Pool(self.n_workers, initializer=initializer, initargs=initargs)
+        return self
+
+    def apply_async(self, func, args=(), callback=None, error_callback=None):
+        return self.pool.apply_async(func, args, callback=callback, error_callback=error_callback)
+
+    def lane(self, key):
+        if self.pinned:
+            return self.pool.lane(key)
+        return self
+
+    def clear_warm_models(self):
+        if self.pinned:
+            self.pool.clear_warm_models()
+
+    def close(self):
+        self.pool.close()
+        if not self.pinned:
+            self.pool.join()
+
+    def terminate(self):
+        self.pool.terminate()
+
+
+class FuturesExecutor(Executor):
+    """
+    Workers of a ``concurrent.futures`` executor, by default a ThreadPoolExecutor.
+
+    When the tasks are pinned, each worker is a single-worker executor of its own. A running task cannot be stopped:
+    ``restart`` starts new workers, and the worker stuck on a task only exits once the task is finished.
+    With threads, ``init_worker`` is replaced by ``init_thread_worker``, so that each thread works on its own copy of the context.
+
+    Parameters
+    ----------
+    n_workers : int, optional
+        Number of workers. By default, the number of CPUs.
+    executor_class : class, optional
+        Subclass of ``concurrent.futures.Executor`` accepting the arguments ``max_workers``, ``initializer`` and ``initargs``.
+    """
+
+    def __init__(self, n_workers=None, executor_class=ThreadPoolExecutor):
+        super().__init__(n_workers)
+        self.executor_class = executor_class
+
+    def settings(self):
+        return super().settings() + ['executor_class']
+
+    def start(self, initializer=None, initargs=(), pinned=False):
+        self.pinned, self.initializer, self.initargs = pinned, initializer, initargs
+        if initializer is init_worker and issubclass(self.executor_class, ThreadPoolExecutor):
+            initializer = init_thread_worker
+        if pinned:
+            self.lanes = [_FuturesLane(self.executor_class(max_workers=1, initializer=initializer, initargs=initargs))
+                          for _ in range(self.n_workers)]
+        else:
+            self.lanes = [_FuturesLane(self.executor_class(max_workers=self.n_workers, initializer=initializer, initargs=initargs))]
+        self.assignment = dict()
+        self.n_submitted = 0
+        return self
+
+    def apply_async(self, func, args=(), callback=None, error_callback=None):
+        lane = self.lanes[self.n_submitted % len(self.lanes)]
+        self.n_submitted += 1
+        return lane.apply_async(func, args, callback, error_callback)
+
+    def lane(self, key):
+        if not self.pinned:
+            return self
+        if key not in self.assignment:
+            self.assignment[key] = len(self.assignment) % len(self.lanes)
+        return self.lanes[self.assignment[key]]
+
+    def clear_warm_models(self):
+        for lane in self.lanes:
+            lane.executor.submit(clear_warm_models).result()
+
+    def close(self):
+        self.clear_warm_models()
+        for lane in self.lanes:
+            lane.executor.shutdown(wait=True)
+
+    def terminate(self):
+        for lane in self.lanes:
+            lane.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _FuturesLane:
+    """
+    Wrapper of a ``concurrent.futures`` executor with the ``apply_async`` of the backends. The callbacks of the tasks
+    cancelled by ``FuturesExecutor.terminate`` are not called.
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+
+    def apply_async(self, func, args=(), callback=None, error_callback=None):
+        def done(future):
+            if future.cancelled():
+                return  # cancelled by terminate
+            error = future.exception()
+            if error is not None:
+                if error_callback is not None:
+                    error_callback(error)
+            elif callback is not None:
+                callback(future.result())
+
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(done)
+        return TaskHandle(future)
+
+
+class TaskHandle:
+    """
+    Handle of a task submitted to a FuturesExecutor or a SocketExecutor, with the ``get`` of a ``multiprocessing.pool.AsyncResult``.
+
+    Parameters
+    ----------
+    future : concurrent.futures.Future, optional
+        Future of the task. By default, a new one completed by the backend.
+    """
+
+    def __init__(self, future=None):
+        self.future = Future() if future is None else future
+
+    def get(self, timeout=None):
+        """
+        Waits for the task and returns its result, or raises the exception of the task.
+        """
+        return self.future.result(timeout)
+
+    def ready(self):
+        return self.future.done()
+
+
+class SocketExecutor(Executor):
+    """
+    Workers running on other processes or machines, reached through ``multiprocessing.connection``.
+
+    Each worker is started beforehand with ``serve``, e.g. on each machine with
+    ``python -m reho.model.workers --address 10.0.0.2:6000 --authkey secret``, and handles one task at a time. The
+    function and the arguments of the tasks are pickled, so that the workers need the same version of REHO.
+
+    Parameters
+    ----------
+    addresses : list
+        Addresses (host, port) of the workers.
+    authkey : bytes
+        Key shared with the workers to authenticate the connections, see ``serve``.
+
+    Raises
+    ------
+    ValueError: If no authkey is given
+
+    Notes
+    -----
+    - If the connection to a worker is lost, its current task fails with a ConnectionError. The next tasks go to the
+      other workers, except the tasks pinned to this worker, which fail as well.
+    - A remote worker cannot be stopped while running a task, so the backend is not recycled after a timeout.
+    """
+
+    recyclable = False
+
+    def __init__(self, addresses, authkey=None):
+        if not authkey:
+            raise ValueError('The SocketExecutor needs the authkey of the workers, see workers.serve')
+        super().__init__(len(addresses))
+        self.addresses = [tuple(address) for address in addresses]
+        self.authkey = authkey
+
+    def settings(self):
+        return super().settings() + ['addresses', 'authkey']
+
+    def start(self, initializer=None, initargs=(), pinned=False):
+        self.pinned = pinned
+        self.tasks = queue.Queue()  # tasks for any worker
+        self.lanes = []
+        for address in self.addresses:
+            connection = Client(address, authkey=self.authkey)
+            connection.send(('start', initializer, initargs))
+            lane = _SocketLane(connection, queue.Queue() if pinned else self.tasks, not pinned)
+            self.lanes.append(lane)
+        self.assignment = dict()
+        self.n_submitted = 0
+        return self
+
+    def apply_async(self, func, args=(), callback=None, error_callback=None):
+        if self.pinned:
+            lane = self.lanes[self.n_submitted % len(self.lanes)]
+            self.n_submitted += 1
+            return lane.apply_async(func, args, callback, error_callback)
+        handle = TaskHandle()
+        self.tasks.put((func, args, callback, error_callback, handle))
+        return handle
+
+    def lane(self, key):
+        if not self.pinned:
+            return self
+        if key not in self.assignment:
+            self.assignment[key] = len(self.assignment) % len(self.lanes)
+        return self.lanes[self.assignment[key]]
+
+    def clear_warm_models(self):
+        if not self.pinned:
+            return
+        done = queue.Queue()
+        for lane in self.lanes:
+            lane.apply_async(clear_warm_models, (), done.put, done.put)
+        for _ in self.lanes:
+            done.get()
+
+    def close(self):
+        for lane in self.lanes:
+            lane.tasks.put(None)  # one stop signal per lane, after the tasks already submitted
+        for lane in self.lanes:
+            lane.thread.join()
+
+    def terminate(self):
+        for lane in self.lanes:
+            lane.connection.close()
+
+
+class _SocketLane:
+    """
+    Connection to a worker, with a thread sending it the tasks of its queue one at a time.
+    """
+
+    def __init__(self, connection, tasks, shared):
+        self.connection = connection
+        self.tasks = tasks
+        self.shared = shared
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def apply_async(self, func, args=(), callback=None, error_callback=None):
+        handle = TaskHandle()
+        self.tasks.put((func, args, callback, error_callback, handle))
+        return handle
+
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            func, args, callback, error_callback, handle = task
+            if self.error is not None:
+                handle.future.set_exception(self.error)
+                if error_callback is not None:
+                    error_callback(self.error)
+                continue
+            try:
+                self.connection.send(('task', func, args))
+                success, result = self.connection.recv()
+            except (EOFError, OSError) as error:
+                self.error = ConnectionError('Connection to the worker lost: ' + str(error))
+                handle.future.set_exception(self.error)
+                if error_callback is not None:
+                    error_callback(self.error)
+                if self.shared:
+                    break  # leaves the next tasks to the other workers
+                continue
+            if success:
+                handle.future.set_result(result)
+                if callback is not None:
+                    callback(result)
+            else:
+                handle.future.set_exception(result)
+                if error_callback is not None:
+                    error_callback(result)
+        if self.error is None:
+            try:
+                self.connection.send(('close',))
+                self.connection.recv()
+            except (EOFError, OSError):
+                pass
+        self.connection.close()
+
+
+class TaskTracker:
+    """
+    Bookkeeping of the tasks submitted to a pool with a timeout and a number of retries, see ``MasterProblem.collect_SP_results``.
+
+    The workers execute the tasks in their order of submission. The timeout of a task is therefore counted from the
+    moment a worker became available for it, estimated from the number of tasks already finished. Each restart of the
+    workers starts a new generation of submissions: the tasks of the previous generations no longer free a worker.
+
+    Parameters
+    ----------
+    keys : list
+        Keys of the tasks.
+    n_workers : int
+        Number of workers of the pool.
+    timeout : float or None
+        Wall-clock time in seconds allowed to a task (None: no limit).
+    max_retries : int
+        Number of times a task is submitted again after its first attempt.
+    """
+
+    def __init__(self, keys, n_workers, timeout=None, max_retries=0):
+        self.n_workers = n_workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.attempts = {key: 0 for key in keys}
+        self.generation = 0  # number of times the workers were restarted
+        self.submissions = []  # (key, time of submission), in order of submission to the current workers
+        self.last_submission = dict()  # key -> index of its last submission
+        self.finish_times = []  # any finished task frees a worker
+
+    def submitted(self, key, attempt=True, now=None):
+        """
+        Records the submission of a task, as a new attempt or not (the task is only submitted to new workers).
+
+        Returns
+        -------
+        generation : int
+            Generation of the submission, to give to ``finished`` with the result of the task.
+        """
+        self.attempts[key] += attempt
+        self.last_submission[key] = len(self.submissions)
+        self.submissions.append((key, time.time() if now is None else now))
+        return self.generation
+
+    def finished(self, generation, now=None):
+        """
+        Records a task finished, with a result or an error. Returns False for a task of workers restarted since.
+        """
+        if generation != self.generation:
+            return False
+        self.finish_times.append(time.time() if now is None else now)
+        return True
+
+    def restarted(self):
+        """
+        Records a restart of the workers: the pending tasks are then submitted again.
+        """
+        self.generation += 1
+        self.submissions.clear()
+        self.finish_times.clear()
+
+    def can_retry(self, key):
+        return self.attempts[key] <= self.max_retries
+
+    def deadline(self, key):
+        """
+        Returns the time at which the last submission of a task times out, inf while it waits for a free worker.
+        """
+        k = self.last_submission[key]
+        start = self.submissions[k][1]
+        if k >= self.n_workers:
+            if len(self.finish_times) <= k - self.n_workers:
+                return math.inf
+            start = max(start, self.finish_times[k - self.n_workers])
+        return start + self.timeout
+
+    def wait_time(self, pending, now=None):
+        """
+        Returns the time in seconds until the first deadline of the pending tasks, None if there is none.
+        """
+        if self.timeout is None:
+            return None
+        wait = min(self.deadline(key) for key in pending) - (time.time() if now is None else now)
+        return None if wait == math.inf else max(0.0, wait)
+
+    def expired(self, pending, now=None):
+        """
+        Returns the pending tasks whose deadline is reached.
+        """
+        if self.timeout is None:
+            return []
+        now = time.time() if now is None else now
+        return [key for key in pending if self.deadline(key) <= now]
+
+
+def serve(address, authkey=None):
+    """
+    Runs a worker waiting for the tasks of a SocketExecutor, one decomposition after another.
+
+    The worker unpickles and executes any function sent by an authenticated client: whoever knows the authkey can run
+    arbitrary code on the machine of the worker. The authkey is therefore mandatory, and should be a secret shared
+    only with the machines running the MasterProblem. The connections are authenticated but not encrypted, so the
+    worker should only listen on a trusted network, e.g. behind a firewall or through an SSH tunnel. It listens on
+    the loopback interface by default.
+
+    Parameters
+    ----------
+    address : tuple
+        Address (host, port) on which the worker listens.
+    authkey : bytes
+        Key shared with the MasterProblem to authenticate the connections.
+
+    Raises
+    ------
+    ValueError: If no authkey is given
+    """
+    if not authkey:
+        raise ValueError('A worker must be started with an authkey, since it executes the code sent by its clients')
+    with Listener(address, authkey=authkey) as listener:
+        while True:
+            try:
+                connection = listener.accept()
+            except (AuthenticationError, EOFError, ConnectionError):
+                continue  # e.g. a client with another key
+            with connection:
+                try:
+                    while True:
+                        message = connection.recv()
+                        if message[0] == 'start':
+                            initializer, initargs = message[1:]
+                            if initializer is not None:
+                                initializer(*initargs)
+                        elif message[0] == 'task':
+                            func, args = message[1:]
+                            try:
+                                connection.send((True, func(*args)))
+                            except Exception as error:
+                                connection.send((False, error))
+                        elif message[0] == 'close':
+                            clear_warm_models()
+                            connection.send((True, None))
+                            break
+                except (EOFError, OSError):
+                    clear_warm_models()  # the MasterProblem stopped without closing the connection
+
+
+if __name__ == '__main__':
+    import reho.model.workers as workers  # the tasks refer to reho.model.workers, not to __main__
+
+    parser = argparse.ArgumentParser(description='Worker solving the sub-problems of a decomposition run on another machine.')
+    parser.add_argument('--address', default='127.0.0.1:6000', help='host:port on which the worker listens (only trusted networks)')
+    parser.add_argument('--authkey', required=True, help='secret key shared with the MasterProblem, which can run any code on the worker')
+    arguments = parser.parse_args()
+    host, port = arguments.address.rsplit(':', 1)
+    workers.serve((host, int(port)), arguments.authkey.encode())
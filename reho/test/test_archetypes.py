@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from reho.model.preprocessing.archetypes import group_buildings, replicate_SP_results
+
+
+def test_group_buildings():
+    buildings_data = {
+        'Building1': {'id_class': 'I', 'period': '1981-1990', 'ERA': 100.0, 'U_h': 0.0015},
+        'Building2': {'id_class': 'I', 'period': '1981-1990', 'ERA': 108.0, 'U_h': 0.0015},
+        'Building3': {'id_class': 'I', 'period': '1981-1990', 'ERA': 130.0, 'U_h': 0.0015},
+        'Building4': {'id_class': 'II', 'period': '1981-1990', 'ERA': 100.0, 'U_h': 0.0015},
+        'Building5': {'id_class': 'I', 'period': '1981-1990', 'ERA': 135.0, 'U_h': 0.0015},
+    }
+    archetypes = group_buildings(buildings_data, tolerances={'ERA': 0.1, 'U_h': 0.05, 'HeatCapacity': 0.05})
+    assert archetypes == {'Building1': ['Building1', 'Building2'], 'Building3': ['Building3', 'Building5'], 'Building4': ['Building4']}
+
+    # each building is its own archetype without tolerance
+    assert list(group_buildings(buildings_data, tolerances={'ERA': 0.0})) == list(buildings_data)
+
+
+def test_replicate_SP_results():
+    grid_index = pd.MultiIndex.from_product([['Electricity'], ['Building1'], [1], [1, 2]], names=['Layer', 'Hub', 'Period', 'Time'])
+    df_Results = {
+        'df_Unit': pd.DataFrame({'Units_Use': [1.0, 1.0], 'Units_Mult': [3.0, 2.0], 'lifetime': [25.0, 20.0]},
+                                index=pd.Index(['PV_Building1', 'Battery_Building1'], name='Unit')),
+        'df_Grid_t': pd.DataFrame({'Grid_supply': [1.0, 2.0], 'Cost_supply': [0.2, 0.2]}, index=grid_index),
+        'df_Performance': pd.DataFrame({'Costs_inv': [10.0, 10.0]}, index=pd.Index(['Building1', 'Network'], name='Hub')),
+    }
+    results = replicate_SP_results(df_Results, 'Building1', 'Building11', scale=2.0)
+
+    assert results['df_Unit'].index.tolist() == ['PV_Building11', 'Battery_Building11']
+    assert results['df_Unit'].Units_Mult.tolist() == [6.0, 4.0]
+    assert results['df_Unit'].lifetime.tolist() == [25.0, 20.0]  # intensive results are kept
+    assert results['df_Grid_t'].index.get_level_values('Hub').unique().tolist() == ['Building11']
+    assert np.allclose(results['df_Grid_t'].values, [[2.0, 0.2], [4.0, 0.2]])
+    assert results['df_Performance'].index.tolist() == ['Building11', 'Network']
+    assert df_Results['df_Unit'].Units_Mult.tolist() == [3.0, 2.0]  # the results of the house are not modified
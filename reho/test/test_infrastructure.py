@@ -1,5 +1,9 @@
+import os
+
 import pytest
 import numpy as np
+import pandas as pd
+import reho.model.infrastructure as infrastructure_module
 from reho.model.infrastructure import Infrastructure, initialize_grids, initialize_units
 
 
@@ -67,3 +71,23 @@ def test_infrastructure_edge_cases(infrastructure):
 
     with pytest.raises(KeyError):
         infrastructure.grids['NonExistentGrid']
+
+
+def test_performance_tables(qbuildings_data, units, grids, monkeypatch):
+    reads = []
+    read_csv = infrastructure_module.pd.read_csv
+    monkeypatch.setattr(infrastructure_module, '_performance_tables', {})
+    monkeypatch.setattr(infrastructure_module.pd, 'read_csv', lambda file, **kwargs: reads.append(file) or read_csv(file, **kwargs))
+
+    district = Infrastructure(qbuildings_data, units, grids)
+    for h in qbuildings_data['buildings_data']:
+        Infrastructure({'buildings_data': {h: qbuildings_data['buildings_data'][h]}}, units, grids)
+    assert len(reads) == 2  # HP_parameters.txt and AC_parameters.txt, once for all the units
+
+    df = district.HP_parameters['HeatPump']
+    units_HP = df.index.get_level_values(0).unique()
+    assert set(units_HP) == set(district.UnitsOfType['HeatPump'])
+    assert df.loc[units_HP[0]].equals(df.loc[units_HP[-1]])
+    table = infrastructure_module.get_performance_table(os.path.join(infrastructure_module.path_to_infrastructure, 'HP_parameters.txt'))
+    pd.testing.assert_frame_equal(df, pd.concat([table] * len(units_HP), keys=units_HP.tolist()))
+    assert np.array_equal(district.TemperatureSets['HP_Tsink'], df.index.get_level_values(1).unique())
@@ -0,0 +1,365 @@
+import logging
+import pickle
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import reho.model.workers as workers
+from reho.model.master_problem import MasterProblem
+from reho.model.reho import REHO
+
+
+def sp_results(house, pv_size, grid_shift=0.0):
+    grid_index = pd.MultiIndex.from_product([['Electricity'], [house], [1, 2], [1, 2]], names=['Layer', 'Hub', 'Period', 'Time'])
+    return {
+        'df_Unit': pd.DataFrame({'Units_Use': [1.0, 1.0], 'Units_Mult': [pv_size, 2.0]}, index=pd.Index(['PV_' + house, 'Battery_' + house], name='Unit')),
+        'df_Grid_t': pd.DataFrame({'Grid_supply': np.arange(4) + grid_shift, 'Grid_demand': np.zeros(4)}, index=grid_index),
+        'df_Buildings': pd.DataFrame({'U_h': [0.002]}, index=pd.Index([house], name='Hub')),
+        'df_Performance': pd.DataFrame({'Costs_inv': [10.0, 0.0], 'Costs_rep': [1.0, 0.0], 'Costs_ft': [2.0, 0.0], 'GWP_constr': [5.0, 0.0]},
+                                       index=pd.Index([house, 'Network'], name='Hub')),
+    }
+
+
+@pytest.fixture
+def master():
+    master = MasterProblem.__new__(MasterProblem)
+    master.buildings_data = {'Building1': {'ERA': 100.0}, 'Building2': {'ERA': 100.0}}
+    master.archetypes = {'Building1': ['Building1'], 'Building2': ['Building2']}
+    master.method = {'include_all_solutions': False, 'actors_problem': False, 'renovation': None}
+    master.DW_params = {'deduplicate_columns': True}
+    master.initialize_optimization_tracking_attributes()
+    return master
+
+
+def add_round(master, iter, results, Pareto_ID=1):
+    attr = pd.DataFrame([[1.0]], columns=['solving_time'], index=pd.MultiIndex.from_tuples([(0, Pareto_ID)], names=['Scn_ID', 'Pareto_ID']))
+    for h, df_Results in results.items():
+        master.add_df_Results_SP(0, Pareto_ID, iter, h, df_Results, attr)
+    master.feasible_solutions += 1
+
+
+def test_rediscovered_columns(master):
+    add_round(master, 0, {'Building1': sp_results('Building1', 3.0), 'Building2': sp_results('Building2', 1.0)})
+    add_round(master, 1, {'Building1': sp_results('Building1', 3.0 + 1e-9), 'Building2': sp_results('Building2', 1.0, grid_shift=0.1)})
+    add_round(master, 2, {'Building1': sp_results('Building1', 3.0), 'Building2': sp_results('Building2', 1.0)})
+
+    # the rediscovered solutions are kept for the reduced costs, but are not columns of the MP
+    assert set(master.results_SP[0][1][2][2]) == {'Building1', 'Building2'}
+    assert sorted((key[3], key[4]) for key in master.results_SP.records) == [(0, 'Building1'), (0, 'Building2'), (1, 'Building2')]
+
+    rediscovered = master.rediscovered_columns
+    assert rediscovered[['House', 'FeasibleSolution', 'Original_FeasibleSolution']].values.tolist() == \
+           [['Building1', 1, 0], ['Building1', 2, 0], ['Building2', 2, 0]]
+    assert master.number_SP_solutions.shape[0] == 6
+
+
+def test_deduplication_opt_in(master):
+    master.method['building-scale'] = False
+    DW_params = master.initialise_DW_params({}, {'Periods': 10, 'PeriodDuration': 24}, master.buildings_data)
+    assert DW_params['deduplicate_columns'] is False
+
+
+def test_renumber_column_hashes(master):
+    add_round(master, 0, {'Building1': sp_results('Building1', 3.0), 'Building2': sp_results('Building2', 1.0)}, Pareto_ID=1)
+    add_round(master, 0, {'Building1': sp_results('Building1', 2.0), 'Building2': sp_results('Building2', 1.0)}, Pareto_ID=2)
+
+    # as in sort_decomp_result
+    master.results_SP.renumber_pareto(0, [2, 1])
+    master.renumber_column_hashes(0, [2, 1])
+    assert sorted((column_hash[1], key[1], key[3]) for column_hash, key in master.column_hashes.items()) == [(1, 1, 1), (1, 1, 1), (2, 2, 0), (2, 2, 0)]
+    assert all(key in master.results_SP.records for key in master.column_hashes.values())
+
+    # a solution of the renumbered Pareto point is still recognized
+    add_round(master, 1, {'Building1': sp_results('Building1', 2.0)}, Pareto_ID=1)
+    assert master.rediscovered_columns[['Pareto_ID', 'FeasibleSolution', 'Original_FeasibleSolution']].values.tolist() == [[1, 2, 1]]
+
+
+def reduced_costs_per_house(master, scenario, Scn_ID, Pareto_ID):
+    """The reduced costs computed as before get_reduced_costs: one annual grid opex per house, with the duals of its layers."""
+    last_SP_results = master.results_SP[Scn_ID][Pareto_ID][master.iter][master.feasible_solutions - 1]
+    reduced_cost = pd.DataFrame()
+    for h in last_SP_results:
+        df_Grid_t = pd.concat([last_SP_results[h]["df_Grid_t"]], keys=[(master.iter, master.feasible_solutions - 1, h)],
+                              names=['Iter', 'FeasibleSolution', 'house'])
+        df_Grid_t = df_Grid_t.xs(h, level='Hub')
+        timesteps = df_Grid_t.index.droplevel(['Iter', 'FeasibleSolution', 'house'])
+        pi = master.get_dual_values_SPs(Scn_ID, Pareto_ID, master.iter, h, 'pi').reindex(timesteps)
+        pi_GWP = master.get_dual_values_SPs(Scn_ID, Pareto_ID, master.iter, h, 'pi_GWP').reindex(timesteps)
+        Cop_h = pd.concat([master.get_annual_grid_opex(df_Grid_t, cost_demand=pi, cost_supply=pi),
+                           master.get_annual_grid_opex(df_Grid_t, cost_demand=pi_GWP, cost_supply=pi_GWP)], axis=1).iloc[0]
+        Cop_h.index = ["TOTEX", "GWP"]
+
+        df = last_SP_results[h]["df_Performance"].iloc[0]
+        Cinv_h = pd.Series([df.Costs_rep + df.Costs_inv, df.GWP_constr], index=["TOTEX", "GWP"])
+        obj_fct = pd.concat([pd.Series([Cinv_h["TOTEX"], Cop_h["TOTEX"]], index=["CAPEX", "OPEX"]), (Cop_h + Cinv_h).replace(np.nan, 0)])
+
+        beta = - master.get_dual_values_SPs(Scn_ID, Pareto_ID, master.iter, h, "beta")
+        mu = master.get_dual_values_SPs(Scn_ID, Pareto_ID, master.iter, h, 'mu')
+        reduced_cost.at[h, 'Reduced_cost'] = obj_fct[scenario['Objective']] + df.Costs_ft + sum(beta * obj_fct) - mu
+    return reduced_cost
+
+
+def test_reduced_costs(master):
+    rng = np.random.default_rng(0)
+    layers = {'Building1': ['Electricity', 'NaturalGas'], 'Building2': ['Electricity', 'NaturalGas'], 'Building3': ['Electricity']}
+    master.buildings_data['Building3'] = {'ERA': 100.0}
+    master.archetypes['Building3'] = ['Building3']
+    master.method['actors_problem'] = False
+    master.period_frequency = None
+
+    results = {}
+    for h in layers:
+        grid_index = pd.MultiIndex.from_product([layers[h], [h], [1, 2, 3, 4], [1, 2]], names=['Layer', 'Hub', 'Period', 'Time'])
+        results[h] = dict(sp_results(h, 1.0), df_Grid_t=pd.DataFrame(rng.random((len(grid_index), 2)), index=grid_index, columns=['Grid_supply', 'Grid_demand']),
+                          df_Time=pd.DataFrame({'dp': [150.0, 213.0, 1.0, 1.0]}, index=pd.Index([1, 2, 3, 4], name='Period')))
+    add_round(master, 0, results)
+    master.iter = 0
+
+    dual_index = pd.MultiIndex.from_product([['Electricity', 'NaturalGas'], [1, 2, 3, 4], [1, 2]], names=['Layer', 'Period', 'Time'])
+    master.results_MP = {0: {1: {0: {'df_Dual_t': pd.DataFrame(rng.random((len(dual_index), 2)), index=dual_index, columns=['pi', 'pi_GWP']),
+                                     'df_beta': pd.DataFrame({'beta': [-0.5, -1.0, 0.0, -0.1]}, index=['CAPEX', 'OPEX', 'TOTEX', 'GWP']),
+                                     'df_Dual': pd.DataFrame({'mu': [1.0, 2.0, 3.0]}, index=list(layers))}}}}
+    scenario = {'Objective': 'TOTEX', 'EMOO': {}}
+
+    pd.testing.assert_frame_equal(master.get_reduced_costs(scenario, 0, 1, list(layers)), reduced_costs_per_house(master, scenario, 0, 1))
+
+
+def test_MP_columns(master):
+    add_round(master, 0, {'Building1': sp_results('Building1', 3.0), 'Building2': sp_results('Building2', 1.0)})
+    add_round(master, 1, {'Building1': sp_results('Building1', 3.0), 'Building2': sp_results('Building2', 1.0)})
+
+    assert master.get_MP_columns(Scn_ID=0, Pareto_ID=1, FeasibleSolution=[1]) == {}
+    columns = master.get_MP_columns(Scn_ID=0, Pareto_ID=1)
+    assert columns['Costs_inv_rep_SPs'].to_dict() == {(0, 'Building1'): 11.0, (0, 'Building2'): 11.0}
+    assert columns['df_grid'].index.names == ['Layer', 'FeasibleSolution', 'house', 'Period', 'Time']
+
+
+@pytest.mark.parametrize("mode, expected", [(None, [4.0, 0.0]), ('smoothing', [2.5, 0.5]), ('box', [1.2, 0.8])])
+def test_SP_duals_stabilization(master, mode, expected):
+    master.DW_params.update({'dual_stabilization': mode, 'smoothing_alpha': 0.5, 'dual_box': 0.2})
+    index = pd.MultiIndex.from_tuples([('Electricity', 1, 1), ('Electricity', 1, 2)], names=['Layer', 'Period', 'Time'])
+    for iter, pi in enumerate([[1.0, 1.0], [4.0, 0.0]]):
+        master.results_MP.setdefault(0, {}).setdefault(1, {})[iter] = {
+            'df_Dual_t': pd.DataFrame({'pi': pi, 'pi_GWP': pi}, index=index),
+            'df_beta': pd.DataFrame({'beta': [0.0, 1.0]}, index=['CAPEX', 'OPEX'])}
+
+    for master.iter in [1, 2]:
+        duals = master.get_SP_duals(0, 1)
+    assert duals['pi'].tolist() == pytest.approx(expected)
+    assert master.SP_duals_stabilized(0, 1) == (mode is not None)
+
+    # after a mispricing, the SPs receive the duals of the MP
+    master.iter, master.mispricing = 3, True
+    master.results_MP[0][1][2] = master.results_MP[0][1][1]
+    assert master.get_SP_duals(0, 1)['pi'].tolist() == [4.0, 0.0]
+
+
+def test_column_pool(master, monkeypatch):
+    master.DW_params.update({'column_age_limit': 2, 'threshold_subP_value': 0})
+    add_round(master, 0, {'Building1': sp_results('Building1', 3.0), 'Building2': sp_results('Building2', 1.0)})
+    add_round(master, 1, {'Building1': sp_results('Building1', 4.0), 'Building2': sp_results('Building2', 2.0)})
+    index = pd.MultiIndex.from_product([[0, 1], ['Building1', 'Building2']], names=['FeasibleSolution', 'Hub'])
+    df_DW = pd.DataFrame({'lambda': [0.0, 1.0, 1.0, 0.0], 'Reduced_cost': [5.0, 0.0, 0.0, 0.0]}, index=index)
+    reduced_costs = {'Building1': 3.0}
+    monkeypatch.setattr(master, 'get_reduced_costs', lambda scenario, Scn_ID, Pareto_ID, houses, SP_results:
+                        pd.DataFrame({'Reduced_cost': [reduced_costs[h] for h in houses]}, index=houses))
+
+    for master.iter in [1, 2]:
+        master.results_MP.setdefault(0, {}).setdefault(1, {})[master.iter] = {'df_DW': df_DW}
+        master.update_column_pool({}, 0, 1)
+    # only the non-basic column with a positive reduced cost is aged out, and kept in the results
+    assert master.archived_columns == {(0, 'Building1'): 2}
+    assert master.get_MP_columns(0, 1, exclude=master.archived_columns)['Costs_inv_rep_SPs'].index.tolist() == \
+           [(0, 'Building2'), (1, 'Building1'), (1, 'Building2')]
+    assert (0, 1, 0, 0, 'Building1') in master.results_SP.records
+
+    # the archived column is given back to the MP when it could improve it again
+    master.MP_columns_archived = {(0, 'Building1')}
+    for master.iter, reduced_costs['Building1'] in [(3, 3.0), (4, -1.0)]:
+        master.results_MP[0][1][master.iter] = {'df_DW': df_DW}
+        master.update_column_pool({}, 0, 1)
+    assert master.archived_columns == {}
+    pool = master.column_pool.set_index(['Iter', 'FeasibleSolution', 'House'])
+    assert pool.Status.xs((0, 'Building1'), level=('FeasibleSolution', 'House')).tolist() == ['active', 'archived', 'archived', 'restored']
+    assert pool.loc[(4, 0, 'Building1'), 'Reduced_cost'] == -1.0
+
+
+def test_skip_SP(master):
+    master.DW_params['SP_skip_tolerance'] = 0.01
+    master.infrastructure = SimpleNamespace(HousesOfLayer={'Electricity': np.array(['Building1']), 'Heat': np.array(['Building2'])})
+    index = pd.MultiIndex.from_tuples([('Electricity', 1, 1), ('Heat', 1, 1)], names=['Layer', 'Period', 'Time'])
+
+    def duals(pi_electricity, pi_heat, beta=1.0):
+        return {'Cost_supply_network': pd.Series([pi_electricity, pi_heat], index=index), 'beta_duals': pd.Series([beta, 1e-6])}
+
+    attr = pd.DataFrame([[1.0]], columns=['solving_time'], index=pd.MultiIndex.from_tuples([(0, 1)], names=['Scn_ID', 'Pareto_ID']))
+    master.iter = 1
+    assert not master.skip_SP(0, 1, 'Building1', duals(0.2, 0.1))  # never solved
+    master.last_SP_solves[('Building1', None)] = (duals(0.2, 0.1), sp_results('Building1', 3.0), attr)
+
+    # the price of heat is not a dual of Building1
+    assert master.get_SP_dual_change('Building1', duals(0.2, 0.1), duals(0.201, 5.0)) == pytest.approx(0.005)
+    master.iter = 2
+    assert master.skip_SP(0, 1, 'Building1', duals(0.201, 5.0))
+    assert not master.skip_SP(0, 1, 'Building1', duals(0.2, 0.1, beta=2.0))
+
+    assert master.results_SP[0][1][2][0]['Building1']['df_Unit'].Units_Mult.iloc[0] == 3.0
+    assert master.solver_attributes_SP.solving_time.tolist() == [0.0]
+    assert master.SP_dual_changes.groupby('Iter').Skipped.sum().to_dict() == {1: 0, 2: 1}
+
+
+def test_archetype_results(master):
+    master.buildings_data['Building2']['ERA'] = 150.0
+    master.archetypes = {'Building1': ['Building1', 'Building2']}
+    attr = pd.DataFrame([[1.0]], columns=['solving_time'], index=pd.MultiIndex.from_tuples([(0, 1)], names=['Scn_ID', 'Pareto_ID']))
+    master.add_archetype_results(0, 1, 0, 'Building1', sp_results('Building1', 2.0), attr)
+
+    df_Unit = master.results_SP[0][1][0][0]['Building2']['df_Unit']
+    assert df_Unit.Units_Mult.to_dict() == {'PV_Building2': 3.0, 'Battery_Building2': 3.0}
+    assert master.solver_attributes_SP.solving_time.tolist() == [1.0, 0.0]
+
+
+def test_SP_start(master):
+    master.DW_params['SP_warm_start'] = True
+    assert master.get_SP_start('Building1') is None
+    master.last_SP_solves[('Building1', None)] = (None, sp_results('Building1', 3.0), None)
+    start = master.get_SP_start('Building1')
+    assert start['Units_Mult'].to_dict() == {'PV_Building1': 3.0, 'Battery_Building1': 2.0}
+    assert master.get_SP_start('Building1', 'window') is None  # each renovation option has its own SP
+
+    master.DW_params['SP_warm_start'] = False
+    assert master.get_SP_start('Building1') is None
+
+
+def test_pareto_point_results(master):
+    worker = pickle.loads(pickle.dumps(master))
+    worker.__class__ = REHO
+    worker.method.update({'building-scale': False, 'district-scale': True})
+    master.__class__ = REHO
+    master.results = {0: {1: {}}}
+
+    add_round(master, 0, {'Building1': sp_results('Building1', 3.0), 'Building2': sp_results('Building2', 1.0)})
+    worker.feasible_solutions = 10
+    add_round(worker, 0, {'Building1': sp_results('Building1', 3.0), 'Building2': sp_results('Building2', 1.0)}, Pareto_ID=2)
+    add_round(worker, 1, {'Building1': sp_results('Building1', 3.0), 'Building2': sp_results('Building2', 2.0)}, Pareto_ID=2)
+    worker.results_MP = {0: {2: {0: {}, 1: {}}}}
+    worker.results = {0: {2: {'df_Performance': pd.DataFrame()}}}
+    worker.stopping_criteria = pd.DataFrame({'all_optimal': [True]}, index=pd.MultiIndex.from_tuples([(0, 2, 1)], names=['Scn_ID', 'Pareto_ID', 'Iter']))
+
+    master.add_pareto_point_results(0, 2, pickle.loads(pickle.dumps(worker.get_pareto_point_results(0, 2))))
+    assert master.feasible_solutions == 1
+    assert sorted(key[1:4] for key in master.results_SP.records if key[4] == 'Building2') == [(1, 0, 0), (2, 0, 10), (2, 1, 11)]
+    assert set(master.results_SP[0][2][1][11]) == {'Building1', 'Building2'}  # the rediscovered solution of Building1 as well
+    assert master.rediscovered_columns.FeasibleSolution.tolist() == [11]
+    assert master.solver_attributes_SP.index.get_level_values('Pareto_ID').tolist() == [1, 1, 2, 2, 2, 2]
+    assert master.number_SP_solutions.index.tolist() == list(range(6))
+    assert list(master.results[0]) == [1, 2] and master.stopping_criteria.shape[0] == 1
+
+
+def test_checkpoint(master, tmp_path):
+    path = tmp_path / 'checkpoint.pickle'
+    master.__class__ = REHO
+    master.logger = logging.getLogger(__name__)
+    master.DW_params.update({'checkpoint': path, 'checkpoint_every': 2})
+    master.checkpoint_run, master.DW_resume, master.resuming = None, None, False
+    master.scenario = {'name': 0}
+    master.results = {0: {1: {'df_Performance': pd.DataFrame()}}}
+    add_round(master, 0, {'Building1': sp_results('Building1', 3.0), 'Building2': sp_results('Building2', 1.0)})
+
+    for master.iter in [1, 2]:
+        master.checkpoint_decomposition(0, 2)
+    assert master.DW_resume == {'Scn_ID': 0, 'Pareto_ID': 2, 'iter': 2}
+    assert [file.name for file in tmp_path.iterdir()] == ['checkpoint.pickle']
+
+    # the run recorded is continued, without solving again the point completed before the checkpoint
+    assert master.start_checkpoint_run('single_optimization', Pareto_ID=1)
+    assert not master.start_checkpoint_run('single_optimization', Pareto_ID=2)  # called within the run recorded
+    master.save_checkpoint()
+    reho = REHO.resume_from(path)
+    assert list(reho.results_SP.records) == list(master.results_SP.records)
+    assert reho.DW_resume['iter'] == 2 and reho.checkpoint_run is None and not reho.resuming
+
+
+def test_checkpoint_failed_write(master, tmp_path):
+    path = tmp_path / 'checkpoint.pickle'
+    master.DW_params.update({'checkpoint': path})
+    master.save_checkpoint()
+    previous = path.read_bytes()
+
+    master.unpicklable = lambda: None
+    with pytest.raises(Exception):
+        master.save_checkpoint()
+    assert [file.name for file in tmp_path.iterdir()] == ['checkpoint.pickle'] and path.read_bytes() == previous
+
+
+def test_pickle_before_results_store(master):
+    add_round(master, 0, {'Building1': sp_results('Building1', 3.0), 'Building2': sp_results('Building2', 1.0)})
+    add_round(master, 1, {'Building1': sp_results('Building1', 2.0), 'Building2': sp_results('Building2', 2.0)})
+    store = master.results_SP
+
+    # the attributes of an object saved before the ResultsStore and the buffered tables
+    baseline = MasterProblem.__new__(MasterProblem)
+    baseline.__dict__.update({'buildings_data': master.buildings_data, 'method': master.method, 'DW_params': master.DW_params,
+                              'results_SP': {0: {1: {iter: dict(solutions) for iter, solutions in store[0][1].items()}}},
+                              'number_SP_solutions': master.number_SP_solutions, 'solver_attributes_SP': master.solver_attributes_SP})
+    loaded = pickle.loads(pickle.dumps(baseline))
+
+    assert isinstance(loaded.results_SP, type(store)) and list(loaded.results_SP.records) == list(store.records)
+    pd.testing.assert_frame_equal(loaded.results_SP.select('df_Unit', Pareto_ID=1), store.select('df_Unit', Pareto_ID=1))
+    assert loaded.get_MP_columns(Scn_ID=0, Pareto_ID=1)['Costs_inv_rep_SPs'].shape == (4,)
+    assert loaded.number_SP_solutions.shape[0] == 4
+
+
+def test_lagrangian_bound(master, monkeypatch):
+    for iter in [0, 1, 1]:  # two rounds of SPs at the iteration 1, e.g. with a renovation option
+        add_round(master, iter, {'Building1': sp_results('Building1', float(master.feasible_solutions)), 'Building2': sp_results('Building2', 1.0)})
+    attr = pd.DataFrame([[100.0]], columns=['val_objective'], index=pd.MultiIndex.from_tuples([(0, 1)], names=['Scn_ID', 'Pareto_ID']))
+    master.add_df_Results_MP(0, 1, 0, {}, attr)
+
+    # reduced costs of the rounds 1 and 2, the round being given by the PV size of Building1
+    reduced_costs = {1.0: {'Building1': -5.0, 'Building2': 2.0}, 2.0: {'Building1': -8.0, 'Building2': 1.0}}
+
+    def get_reduced_costs(scenario, Scn_ID, Pareto_ID, houses, SP_results, MP_iter):
+        assert MP_iter == 0  # the duals given to the SPs
+        f = SP_results['Building1']['df_Unit'].Units_Mult.iloc[0]
+        return pd.DataFrame({'Reduced_cost': [reduced_costs[f][h] for h in houses]}, index=houses)
+
+    monkeypatch.setattr(master, 'get_reduced_costs', get_reduced_costs)
+    master.iter = 1
+    assert master.get_lagrangian_bound({}, 0, 1) == 100.0 - 8.0  # the columns of the MP have a reduced cost of 0
+
+    master.archetypes = {'Building1': ['Building1', 'Building2']}
+    assert np.isnan(master.get_lagrangian_bound({}, 0, 1))
+
+
+def test_initiation_batch(master):
+    master.logger = logging.getLogger(__name__)
+    master.infrastructure = SimpleNamespace(houses=['Building1', 'Building2'])
+    master.method.update({'skip_initiation': False, 'building-scale': False, 'parallel_computation': True, 'renovation': ['window']})
+    master.DW_params.update({'SP_timeout': None, 'SP_max_retries': 0})
+    master.iter = 0
+    pv_size = {1000.0: 1.0, 1: 2.0, 0.001: 3.0, None: 10.0}
+
+    def SP_initiation_execution(scenario, Scn_ID, Pareto_ID, h, epsilon_init, beta, renovation_options):
+        if beta == 1000.0 and h == 'Building1':
+            time.sleep(0.2)  # the first round is completed last
+        attr = pd.DataFrame([[1.0]], columns=['solving_time'], index=pd.MultiIndex.from_tuples([(Scn_ID, Pareto_ID)], names=['Scn_ID', 'Pareto_ID']))
+        return sp_results(h, pv_size[beta], grid_shift=float(renovation_options is not None)), attr
+
+    context = SimpleNamespace(SP_initiation_execution=SP_initiation_execution)
+    master.pool = workers.FuturesExecutor(4).start(workers.init_worker, (context,))
+    try:
+        master.initiate_decomposition({'Objective': 'TOTEX', 'EMOO': {'EMOO_grid': 0}}, 0, 1)
+    finally:
+        master.pool.close()
+
+    # one FeasibleSolution per round, in the order of the rounds, with the houses in their usual order
+    rounds = master.results_SP[0][1][0]
+    assert list(rounds) == list(range(6))
+    assert [rounds[f]['Building1']['df_Unit'].Units_Mult.iloc[0] for f in rounds] == [1.0, 10.0, 2.0, 10.0, 3.0, 10.0]
+    assert all(list(rounds[f]) == ['Building1', 'Building2'] for f in rounds)
+    assert master.feasible_solutions == 6
+    assert set(master.last_SP_solves) == {('Building1', None), ('Building2', None), ('Building1', 'window'), ('Building2', 'window')}
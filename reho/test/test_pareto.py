@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from reho.model import pareto
+
+
+def front(points):
+    df = pd.DataFrame(points, columns=['obj1', 'obj2'])
+    return pareto.normalize_front(df, obj1_min=0.0, obj1_max=10.0, obj2_min=0.0, obj2_max=10.0)
+
+
+def test_gaps_and_hypervolume():
+    df = front([(10.0, 0.0), (0.0, 10.0), (2.0, 4.0)])
+    assert df.obj1.tolist() == [0.0, 2.0, 10.0]
+    gaps = pareto.get_gaps(df)
+    assert gaps.obj1_start.tolist() == [2.0, 0.0]  # the longest segment of the front comes first
+    assert gaps.gap.iloc[0] == pytest.approx((0.8 ** 2 + 0.4 ** 2) ** 0.5)
+    assert pareto.get_hypervolume(df) == pytest.approx(0.8 * 0.6)
+
+    # a dominated point does not change the hypervolume
+    assert pareto.get_hypervolume(front([(10.0, 0.0), (0.0, 10.0), (2.0, 4.0), (5.0, 5.0)])) == pytest.approx(0.8 * 0.6)
+
+
+def test_place_epsilons():
+    df = front([(0.0, 10.0), (2.0, 4.0), (10.0, 0.0)])
+    assert [epsilon for epsilon, gap in pareto.place_epsilons(df, 2)] == [6.0, 1.0]
+    # a gap whose middle was already solved is not split again
+    assert [epsilon for epsilon, gap in pareto.place_epsilons(df, 1, tried=[6.0])] == [1.0]
+
+
+def test_district_objective():
+    df_Performance = pd.DataFrame({'Costs_inv': [5.0, 20.0], 'Costs_rep': [1.0, 4.0], 'Costs_op': [2.0, 16.0],
+                                   'GWP_op': [1.0, 8.0], 'GWP_constr': [0.0, 2.0]}, index=['Building1', 'Network'])
+    assert pareto.get_district_objective(df_Performance, 'TOTEX', ERA=8.0) == 5.0
+    with pytest.raises(Exception):
+        pareto.get_district_objective(df_Performance, 'Costs_op', ERA=8.0)
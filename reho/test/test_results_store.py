@@ -0,0 +1,51 @@
+import pickle
+
+import pandas as pd
+import pytest
+
+from reho.model.results_store import ResultsStore, RecordBuffer
+
+
+@pytest.fixture
+def store():
+    store = ResultsStore()
+    for f in [1, 2]:
+        for h in ['Building2', 'Building1']:
+            df = pd.DataFrame({'Units_Mult': [f, 0.5]}, index=pd.Index(['PV_' + h, 'Battery_' + h], name='Unit'))
+            store.add('scn', 1, f - 1, f, h, {'df_Unit': df})
+    return store
+
+
+def test_nested_access(store):
+    assert store['scn'][1][0][1]['Building1']['df_Unit'].shape == (2, 1)
+
+
+def test_select(store):
+    df = store.select('df_Unit')
+    assert list(df.index.names) == ['Scn_ID', 'Pareto_ID', 'Iter', 'FeasibleSolution', 'house', 'Unit']
+    assert df.index.is_monotonic_increasing
+    assert len(store.select('df_Unit', FeasibleSolution=[2])) == 4
+
+    df = store.select('df_Unit', solutions=[(2, 'Building2'), (1, 'Building1')])
+    assert df.index.unique('house').tolist() == ['Building2', 'Building1']
+
+
+def test_renumber_and_pickle(store):
+    store.renumber_pareto('scn', [1])
+    store = pickle.loads(pickle.dumps(store))
+    assert store.get_level_values('FeasibleSolution', Scn_ID='scn').tolist() == [1, 2]
+    assert len(store.select('df_Unit', Pareto_ID=1)) == 8
+
+
+def test_record_buffer():
+    buffer = RecordBuffer(index_names=['Iter', 'Scn_ID'])
+    buffer.append({'solving_time': 1.0}, (0, 'scn'))
+    assert buffer.to_frame().index.tolist() == [(0, 'scn')]
+    buffer.append({'solving_time': 2.0}, (1, 'scn'))
+    assert len(buffer) == 2
+    assert buffer.to_frame()['solving_time'].tolist() == [1.0, 2.0]
+
+    buffer = pickle.loads(pickle.dumps(RecordBuffer()))
+    buffer.append({'Iter': 0})
+    buffer.append({'Iter': 1})
+    assert buffer.to_frame().index.tolist() == [0, 1]
@@ -0,0 +1,283 @@
+import copy
+import os
+import pickle
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from reho.model import sub_problem
+from reho.model.preprocessing import skydome
+from reho.model.preprocessing.QBuildings import QBuildingsReader
+from reho.model.infrastructure import Infrastructure, initialize_grids, initialize_units
+from reho.model.reho import REHO
+from reho.model.sub_problem import SubProblem
+from reho.paths import path_to_reho, path_to_units
+
+
+def ampl_available():
+    try:
+        from amplpy import modules
+        modules.load()
+        sub_problem.AMPL().close()
+        return True
+    except Exception:
+        return False
+
+
+requires_ampl = pytest.mark.skipif(not ampl_available(), reason="AMPL is not available")
+
+
+def sp(unit_types, use_pv_orientation=False, interperiod_storage=False):
+    SP = SubProblem.__new__(SubProblem)
+    SP.infrastructure_sp = SimpleNamespace(UnitTypes=unit_types)
+    SP.method_sp = {'use_pv_orientation': use_pv_orientation, 'interperiod_storage': interperiod_storage}
+    return SP
+
+
+def test_model_template():
+    files = sp(['Battery', 'PV', 'HeatPump', 'DHN_hex', 'H2storage']).get_model_files()
+    assert [os.path.basename(file) for file in files] == ['sub_problem.mod', 'scenario.mod', 'heatpump.mod', 'dhn_hex.mod',
+                                                          'dhn_pipes.mod', 'pv.mod', 'battery.mod']
+    assert sp(['PV', 'H2storage'], use_pv_orientation=True, interperiod_storage=True).get_model_files()[2:] == \
+           (os.path.join(path_to_units, 'pv_orientation.mod'), os.path.join(path_to_units, 'interperiod', 'H2storage_IP.mod'))
+
+    # the files are read once per configuration, and each one starts on a new line
+    model = sub_problem.get_model_template(files)
+    assert sub_problem.get_model_template(files) is model
+    for file in files:
+        with open(file, encoding='utf-8') as f:
+            assert '\n' + f.read() + '\n' in '\n' + model
+
+
+@pytest.fixture(scope="module")
+def building_SP():
+    """Returns a function creating the SP of the first building of the example data, as in SP_initiation_execution."""
+    reader = QBuildingsReader()
+    qbuildings_data = reader.read_csv(buildings_filename=os.path.join(os.path.dirname(path_to_reho), 'scripts', 'examples', 'data', 'buildings.csv'),
+                                      nb_buildings=1)
+    cluster = {'Location': 'Geneva', 'Attributes': ['T', 'I', 'W'], 'Periods': 10, 'PeriodDuration': 24}
+    scenario = {'Objective': 'TOTEX', 'EMOO': {}, 'specific': [], 'name': 'totex', 'exclude_units': [], 'enforce_units': []}
+    grids = initialize_grids()
+    units = initialize_units(scenario, grids)
+    reho = REHO(qbuildings_data=qbuildings_data, units=units, grids=grids, cluster=cluster, scenario=scenario,
+                method={'building-scale': True}, solver="highs")
+    h = list(reho.buildings_data)[0]
+
+    def create():
+        buildings_data_SP, parameters_SP, set_indexed_SP = copy.deepcopy(reho.split_parameter_sets_per_building(h))
+        return SubProblem(reho.infrastructure_SP[h], buildings_data_SP, reho.local_data, parameters_SP, set_indexed_SP, reho.cluster,
+                          copy.deepcopy(scenario), copy.deepcopy(reho.method), reho.solver)
+    return create
+
+
+def read_files_one_by_one(files):
+    """Replaces get_model_template: the AMPL commands reading the files one by one, as before the templates."""
+    return ''.join(('data' if file.endswith('.dat') else 'model') + ' "' + file + '";\n' for file in files)
+
+
+@requires_ampl
+def test_model_template_builds_the_same_SP(building_SP, monkeypatch):
+    def build_and_solve():
+        ampl = building_SP().build_model_without_solving()
+        ampl.solve()
+        statistics = {name: ampl.getValue(name) for name in ['_snvars', '_sncons', '_nvars', '_ncons']}
+        objective = ampl.getObjective('TOTEX').value()
+        ampl.close()
+        return statistics, objective
+
+    statistics, objective = build_and_solve()
+    monkeypatch.setattr(sub_problem, 'get_model_template', read_files_one_by_one)
+    expected_statistics, expected_objective = build_and_solve()
+    assert statistics == expected_statistics
+    assert objective == pytest.approx(expected_objective, rel=1e-6)
+
+
+def test_streams_temperature():
+    grids = initialize_grids()
+    units = initialize_units({'exclude_units': [], 'enforce_units': []}, grids)
+    SP = SubProblem.__new__(SubProblem)
+    SP.infrastructure_sp = Infrastructure({'buildings_data': {'Building1': {}}}, units, grids)
+    SP.parameters_to_ampl = dict()
+    time_end = ((1, 3), (2, 2))
+
+    # one DataFrame per stream, as built before
+    index = pd.MultiIndex.from_tuples([(p, t + 1) for p, n in time_end for t in range(n)], names=['Period', 'Time'])
+    expected = []
+    for unit_data in SP.infrastructure_sp.houses['Building1']['units']:
+        for i, T_level in enumerate(unit_data['StreamsOfUnit']):
+            df = pd.DataFrame(np.repeat(unit_data['Unit'] + '_Building1_' + T_level, 5), index=index, columns=['Streams'])
+            df['Streams_Tout'], df['Streams_Tin'] = unit_data['stream_Tout'][i], unit_data['stream_Tin'][i]
+            expected.append(df.set_index('Streams', append=True))
+    for stream in SP.infrastructure_sp.StreamsOfBuilding['Building1']:
+        df = pd.DataFrame(np.repeat(stream, 5), index=index, columns=['Streams'])
+        df['Streams_Tout'], df['Streams_Tin'] = 40, 50
+        expected.append(df.set_index('Streams', append=True))
+    expected = pd.concat(expected).reorder_levels([2, 0, 1]).astype(float)
+    pd.testing.assert_frame_equal(SP.get_streams_temperature(time_end), expected)
+
+    # the table is built once per building and timesteps, and not shared with the other processes
+    ampl = SimpleNamespace(getParameter=lambda name: SimpleNamespace(getValues=lambda: SimpleNamespace(
+        toPandas=lambda: pd.DataFrame({'TimeEnd': [3.0, 2.0]}, index=[1, 2]))))
+    SP.set_streams_temperature(ampl)
+    assert list(SP.infrastructure_sp.streams_T) == [time_end]
+    assert SP.parameters_to_ampl['streams_T'] is SP.infrastructure_sp.streams_T[time_end]
+    assert pickle.loads(pickle.dumps(SP.infrastructure_sp)).streams_T == {}
+
+
+class RecordingAMPL:
+    """Records the calls made to AMPL."""
+
+    def __init__(self):
+        self.calls = []
+
+    def eval(self, statements):
+        self.calls.append(('eval', statements))
+
+    def setData(self, df):
+        self.calls.append(('setData', df))
+
+    def getSet(self, name):
+        return SimpleNamespace(setValues=lambda values: self.calls.append(('set', name, list(values))))
+
+    def getParameter(self, name):
+        return SimpleNamespace(setValues=lambda values: self.calls.append(('param', name, values)))
+
+
+def test_bulk_transfer():
+    ampl = RecordingAMPL()
+    sub_problem.send_sets_to_ampl(ampl, {'Layers': np.array(['Electricity', 'HeatCascade']),
+                                         'UnitsOfLayer': {'Electricity': np.array(['PV_Building1', 'Battery_Building1']), 'HeatCascade': np.array([])},
+                                         'House_ID': {"Building'1": 1}})
+    assert ampl.calls == [('set', 'Layers', ['Electricity', 'HeatCascade']),
+                          ('eval', "data;\nset UnitsOfLayer['Electricity'] := 'PV_Building1' 'Battery_Building1';\n"
+                                   "set UnitsOfLayer['HeatCascade'] := ;\nset House_ID['Building''1'] := 1;\nmodel;")]
+
+    # the parameters with the same index are sent in one DataFrame
+    ampl = RecordingAMPL()
+    index = pd.MultiIndex.from_product([[1, 2], [1, 2]], names=['Period', 'Time'])
+    sub_problem.send_parameters_to_ampl(ampl, {'ERA': {'Building1': 100.0}, 'U_h': {'Building1': 0.002}, 'T_ext': pd.Series([1.0, 2.0, 3.0, 4.0], index=index),
+                                               'Irr': pd.Series([0.0, 5.0, 0.0, 6.0], index=index.copy()), 'Units_Fmax': {'PV': [1.0, 2.0]}, 'n_years': 20})
+    assert [call[:2] for call in ampl.calls if call[0] == 'param'] == [('param', 'Units_Fmax'), ('param', 'n_years')]
+    frames = [call[1] for call in ampl.calls if call[0] == 'setData']
+    assert [df.columns.tolist() for df in frames] == [['ERA', 'U_h'], ['T_ext', 'Irr']]
+    assert frames[1].Irr.tolist() == [0.0, 5.0, 0.0, 6.0]
+
+
+def test_bulk_transfer_fallback():
+    class RejectingAMPL(RecordingAMPL):
+        """Rejects the data statements, and has the instances 'Electricity' and 'HeatCascade' of the indexed sets."""
+
+        def eval(self, statements):
+            super().eval(statements)
+            if statements.startswith('data;'):
+                raise RuntimeError('UnitsOfLayer is not indexed by Gas')
+
+        def getSet(self, name):
+            return [(('Electricity',), SimpleNamespace(setValues=lambda values: self.calls.append(('instance', name, 'Electricity', list(values))))),
+                    (('HeatCascade',), SimpleNamespace(setValues=lambda values: self.calls.append(('instance', name, 'HeatCascade', list(values)))))]
+
+    ampl = RejectingAMPL()
+    sub_problem.send_sets_to_ampl(ampl, {'UnitsOfLayer': {'Electricity': np.array(['PV_Building1']), 'HeatCascade': np.array([]), 'Gas': np.array(['Boiler'])}})
+    assert ampl.calls[1:] == [('eval', 'model;'), ('instance', 'UnitsOfLayer', 'Electricity', ['PV_Building1']),
+                              ('instance', 'UnitsOfLayer', 'HeatCascade', [])]
+
+
+def test_data_stream_statements():
+    SP = SubProblem.__new__(SubProblem)
+    SP.parameters_sp, SP.parameters_to_ampl, SP.set_indexed_sp = dict(), dict(), dict()
+    ampl = RecordingAMPL()
+    SP.send_parameters_and_sets_to_ampl(ampl)
+
+    # the let commands of data_stream.dat are read in data mode, as by ampl.readData
+    with open(os.path.join(sub_problem.path_to_ampl_model, 'data_stream.dat'), encoding='utf-8') as f:
+        data_stream = f.read()
+    assert ampl.calls[-1] == ('eval', 'data;\n' + data_stream + '\nmodel;')
+
+
+def ampl_values(ampl):
+    """Returns the members of the instances of all the sets and the values of all the parameters of an AMPL model."""
+    sets = {name: {index: sorted(map(str, instance.members())) for index, instance in s.instances()} for name, s in ampl.getSets()}
+    parameters = dict()
+    for name, parameter in ampl.getParameters():
+        try:
+            parameters[name] = parameter.getValues().toPandas().sort_index()
+        except Exception as error:  # e.g. a parameter without data nor default, in both models
+            parameters[name] = type(error).__name__
+    return sets, parameters
+
+
+@requires_ampl
+def test_bulk_transfer_matches_ampl(building_SP, monkeypatch):
+    ampl = building_SP().build_model_without_solving()
+    sets, parameters = ampl_values(ampl)
+    ampl.close()
+
+    # the previous transfer: one call per instance of the indexed sets and per parameter
+    send_parameters_to_ampl = sub_problem.send_parameters_to_ampl
+
+    def send_sets_per_instance(ampl, sets):
+        for s in sets:
+            if isinstance(sets[s], dict):
+                sub_problem.send_set_instances_to_ampl(ampl, s, sets[s])
+            else:
+                ampl.getSet(str(s)).setValues(sets[s])
+
+    def send_parameters_per_entity(ampl, parameters):
+        for name, values in parameters.items():
+            if isinstance(values, pd.Series):
+                ampl.setData(pd.DataFrame(values.rename(name)))
+            elif isinstance(values, dict):
+                ampl.getParameter(name).setValues(values)
+            else:
+                send_parameters_to_ampl(ampl, {name: values})
+
+    monkeypatch.setattr(sub_problem, 'send_sets_to_ampl', send_sets_per_instance)
+    monkeypatch.setattr(sub_problem, 'send_parameters_to_ampl', send_parameters_per_entity)
+    ampl = building_SP().build_model_without_solving()
+    expected_sets, expected_parameters = ampl_values(ampl)
+    ampl.close()
+
+    assert sets == expected_sets
+    assert list(parameters) == list(expected_parameters)
+    for name, values in parameters.items():
+        if isinstance(values, pd.DataFrame):
+            pd.testing.assert_frame_equal(values, expected_parameters[name], check_dtype=False)
+        else:
+            assert values == expected_parameters[name], name
+
+
+def test_skydome_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(skydome, 'path_to_clustering', str(tmp_path))
+    rng = np.random.default_rng(0)
+    dates = pd.to_datetime(['2005-01-10', '2005-06-10', '2005-01-11', '2005-07-01'])  # 2 typical days and 2 extreme hours
+    local_data = {'File_ID': 'Geneva_2_24_T_I_W', 'Cluster': {'PeriodDuration': 24}, 'df_Timestamp': pd.DataFrame({'Date': dates}),
+                  'Irr': rng.random(50) * 800, 'Irr_yearly': pd.DataFrame(rng.random((8760, 145)), columns=[str(i) for i in range(145)])}
+
+    expected = skydome.irradiation_to_df(local_data)
+    pd.testing.assert_frame_equal(skydome.get_skydome_data(local_data)['Irr_patches'], expected)
+    assert os.listdir(tmp_path / local_data['File_ID']) == ['irradiation_patches.csv']
+
+    # the next runs read the patches written next to the clustering files
+    data = {key: value for key, value in local_data.items() if key != 'skydome'}
+    monkeypatch.setattr(skydome, 'irradiation_to_df', None)
+    df = skydome.get_skydome_data(data)['Irr_patches']
+    pd.testing.assert_frame_equal(df, expected)
+    assert skydome.get_skydome_data(data)['Irr_patches'] is df and len(data['skydome']['Sin_a']) == 145
+
+
+def test_skydome_cache_temporary_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(skydome, 'path_to_clustering', str(tmp_path))
+    monkeypatch.setattr(skydome, 'irradiation_to_df', lambda local_data: pd.DataFrame({'Irr': [1.0]}, index=pd.MultiIndex.from_tuples([(1, 1, 1)])))
+    moved = []
+    replace = os.replace
+    monkeypatch.setattr(skydome.os, 'replace', lambda src, dst: moved.append(src) or replace(src, dst))
+
+    for _ in range(2):  # e.g. two processes computing the patches of the same clustering
+        os.makedirs(tmp_path / 'File', exist_ok=True)
+        for file in os.listdir(tmp_path / 'File'):
+            os.remove(tmp_path / 'File' / file)
+        skydome.get_skydome_data({'File_ID': 'File'})
+    assert len(set(moved)) == 2 and all(os.path.dirname(src) == str(tmp_path / 'File') for src in moved)
+    assert os.listdir(tmp_path / 'File') == ['irradiation_patches.csv']
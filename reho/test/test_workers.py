@@ -0,0 +1,350 @@
+import gc
+import multiprocessing as mp
+import logging
+import os
+import pickle
+import queue
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import reho.model.workers as workers
+from reho.model.master_problem import MasterProblem
+from reho.model.reho import REHO
+
+
+def run(executor, tasks, pinned=False):
+    """Submits execute(*task) for each task and returns {task: (result, error)}."""
+    results = queue.Queue()
+    for task in tasks:
+        lane = executor.lane(task[1]) if pinned else executor
+        lane.apply_async(workers.execute, args=task,
+                         callback=lambda result, task=task: results.put((task, result, None)),
+                         error_callback=lambda error, task=task: results.put((task, None, error)))
+    collected = {}
+    for _ in tasks:
+        task, result, error = results.get(timeout=30)
+        collected[task] = (result, error)
+    return collected
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(address, authkey):
+    for _ in range(100):
+        try:
+            workers.Client(address, authkey=authkey).close()
+            return
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+    raise TimeoutError('worker not listening on ' + str(address))
+
+
+@pytest.fixture(scope="module")
+def socket_workers():
+    authkey = b'reho'
+    addresses = [('localhost', free_port()) for _ in range(2)]
+    processes = [mp.Process(target=workers.serve, args=(address, authkey), daemon=True) for address in addresses]
+    for process, address in zip(processes, addresses):
+        process.start()
+        wait_for(address, authkey)
+    yield addresses, authkey
+    for process in processes:
+        process.terminate()
+
+
+@pytest.mark.parametrize("pinned", [False, True])
+@pytest.mark.parametrize("executor", [lambda: workers.ProcessExecutor(2), lambda: workers.FuturesExecutor(2),
+                                      lambda: workers.FuturesExecutor(2, ProcessPoolExecutor)])
+def test_local_executors(executor, pinned):
+    context = {'Building' + str(i): i for i in range(5)}
+    executor = executor().start(workers.init_worker, (context,), pinned=pinned)
+    try:
+        collected = run(executor, [('get', h) for h in context])
+    finally:
+        executor.close()
+    assert {task[1]: result for task, (result, error) in collected.items()} == context
+
+
+def get_handles(executor):
+    """Submits tasks without callbacks and returns what their handles give."""
+    handles = [executor.apply_async(workers.execute, args=('get', 'Building1')), executor.apply_async(workers.execute, args=('missing_method',))]
+    with pytest.raises(AttributeError):
+        handles[1].get(timeout=30)
+    return handles[0].get(timeout=30)
+
+
+@pytest.mark.parametrize("pinned", [False, True])
+@pytest.mark.parametrize("executor", [lambda: workers.ProcessExecutor(2), lambda: workers.FuturesExecutor(2)])
+def test_executors_return_task_handles(executor, pinned):
+    executor = executor().start(workers.init_worker, ({'Building1': 1},), pinned=pinned)
+    try:
+        assert get_handles(executor) == 1
+    finally:
+        executor.close()
+
+
+def test_executor_is_abstract():
+    with pytest.raises(TypeError):
+        workers.Executor(2)
+
+
+@pytest.mark.parametrize("pinned", [False, True])
+def test_threads_copy_context(pinned):
+    context = []
+    executor = workers.FuturesExecutor(2).start(workers.init_worker, (context,), pinned=pinned)
+    try:
+        collected = run(executor, [('append', i) for i in range(10)], pinned=pinned)
+    finally:
+        executor.close()
+    assert context == [] and not any(error for result, error in collected.values())
+
+
+def test_socket_executor(socket_workers):
+    addresses, authkey = socket_workers
+    context = {'Building' + str(i): i for i in range(5)}
+
+    for pinned in [False, True]:  # the workers serve one decomposition after another
+        executor = workers.SocketExecutor(addresses, authkey).start(workers.init_worker, (context,), pinned=pinned)
+        collected = run(executor, [('get', h) for h in context] + [('missing_method',)], pinned=False)
+        assert get_handles(executor) == context['Building1']
+        executor.close()
+
+        assert {task[1]: result for task, (result, error) in collected.items() if len(task) == 2} == context
+        assert isinstance(collected[('missing_method',)][1], AttributeError)
+
+
+def test_socket_executor_pickles_settings_only(socket_workers):
+    addresses, authkey = socket_workers
+    executor = workers.SocketExecutor(addresses, authkey).start(workers.init_worker, ({},))
+    try:
+        copy = pickle.loads(pickle.dumps(executor))
+    finally:
+        executor.close()
+    assert copy.addresses == addresses and not hasattr(copy, 'lanes')
+
+
+def test_collect_SP_results_with_socket_workers(socket_workers):
+    addresses, authkey = socket_workers
+    context = {'Building' + str(i): i for i in range(5)}
+    master = MasterProblem.__new__(MasterProblem)
+    master.DW_params = {'SP_timeout': 30, 'SP_max_retries': 0}
+    master.logger = logging.getLogger(__name__)
+    master.pool = workers.SocketExecutor(addresses, authkey).start(workers.init_worker, (context,), pinned=True)
+    try:
+        def submit(h, callback, error_callback):
+            master.pool.lane(h).apply_async(workers.execute, args=('get', h), callback=callback, error_callback=error_callback)
+        assert dict(master.collect_SP_results(submit, list(context))) == context
+    finally:
+        master.pool.close()
+
+
+def test_SP_pool_reused_until_inputs_change():
+    master = MasterProblem.__new__(MasterProblem)
+    master.buildings_data = {'Building1': {}}
+    master.method = {'parallel_computation': True, 'use_facades': False, 'use_pv_orientation': False}
+    master.DW_params = {'executor': 'threads', 'persistent_SP': False}
+    master.cpu_use = 2
+    master.parameters = {'T_DHN_supply_cst': 70}
+    master.pool = None
+    master.pool_fingerprint = None
+    master.initialize_optimization_tracking_attributes()
+    try:
+        pool = master.get_SP_pool()
+        master.iter, master.feasible_solutions = 5, 12  # bookkeeping of the previous decomposition
+        assert master.get_SP_pool() is pool
+
+        master.parameters['T_DHN_supply_cst'] = 80  # e.g. a sample of a sensitivity analysis
+        assert master.get_SP_pool() is not pool
+
+        pool = master.get_SP_pool()
+        master.local_data = {'weather': lambda: 0}  # replaced inputs are compared by identity, without pickling them
+        assert master.get_SP_pool() is not pool
+        pool = master.get_SP_pool()
+        assert master.get_SP_pool() is pool
+    finally:
+        master.close_SP_pool()
+    assert master.pool is None
+
+
+def test_SP_pool_ignores_results():
+    master = MasterProblem.__new__(MasterProblem)
+    master.buildings_data = {'Building1': {}}
+    master.method = {'parallel_computation': True, 'use_facades': False, 'use_pv_orientation': False}
+    master.DW_params = {'executor': 'threads', 'persistent_SP': False}
+    master.cpu_use = 1
+    master.pool = None
+    master.pool_fingerprint = None
+    master.initialize_optimization_tracking_attributes()
+    try:
+        pool = master.get_SP_pool()
+        master.results_MP[0] = {1: {0: {}}}
+        master.column_hashes[('Building1', 'hash')] = (0, 1, 0, 0, 'Building1')
+        assert master.get_SP_pool() is pool
+    finally:
+        master.close_SP_pool()
+
+
+def pool_master(executor, DW_params=None):
+    master = MasterProblem.__new__(MasterProblem)
+    master.__class__ = REHO
+    master.buildings_data = {'Building1': {}}
+    master.method = {'parallel_computation': True, 'use_facades': False, 'use_pv_orientation': False}
+    master.DW_params = dict({'executor': executor, 'persistent_SP': False, 'keep_SP_pool': False, 'checkpoint': None}, **(DW_params or {}))
+    master.cpu_use = 1
+    master.pool = None
+    master.pool_fingerprint = None
+    master.ampl_MP = None
+    master.checkpoint_run = None
+    master.initialize_optimization_tracking_attributes()
+    return master
+
+
+@pytest.mark.parametrize("keep", [False, True])
+def test_SP_pool_stopped_after_optimization(keep):
+    master = pool_master('threads', {'keep_SP_pool': keep})
+    try:
+        outer = master.start_checkpoint_run('generate_pareto_curve')
+        pool = master.get_SP_pool()
+        master.end_optimization(master.start_checkpoint_run('single_optimization', Pareto_ID=1))  # a point of the curve
+        assert master.pool is pool
+
+        master.end_optimization(outer)
+        assert (master.pool is pool) == keep
+    finally:
+        master.shutdown()
+    assert master.pool is None
+
+
+def test_SP_pool_stopped_with_the_object():
+    executor = workers.FuturesExecutor(1)
+    terminated = []
+    executor.terminate = lambda: terminated.append(True) or workers.FuturesExecutor.terminate(executor)
+    master = pool_master(executor)
+    master.get_SP_pool()
+    del master  # e.g. a script without shutdown nor with block
+    gc.collect()
+    assert terminated == [True]
+
+    master = pool_master(executor)
+    master.get_SP_pool()
+    master.shutdown()  # closed, not terminated again when deleted
+    del master
+    gc.collect()
+    assert terminated == [True]
+
+
+def test_socket_workers_need_authkey():
+    with pytest.raises(ValueError):
+        workers.serve(('localhost', free_port()))
+    with pytest.raises(ValueError):
+        workers.SocketExecutor([('localhost', free_port())])
+
+
+def test_shutdown_with_hung_worker():
+    master = MasterProblem.__new__(MasterProblem)
+    master.__class__ = REHO
+    master.ampl_MP = None
+    master.pool_fingerprint = None
+    master.pool = workers.ProcessExecutor(1).start(workers.init_worker, (SimpleNamespace(sleep=time.sleep),))
+    master.pool.apply_async(workers.execute, args=('sleep', 3600))
+    time.sleep(0.5)  # the worker is busy with a task that never returns
+
+    start = time.time()
+    with pytest.raises(KeyboardInterrupt):
+        with master:
+            raise KeyboardInterrupt
+    assert time.time() - start < 10 and master.pool is None
+
+
+def test_SP_timeout_terminates_pool():
+    master = MasterProblem.__new__(MasterProblem)
+    master.DW_params = {'SP_timeout': 0.5, 'SP_max_retries': 0}
+    master.logger = logging.getLogger(__name__)
+    master.pool_fingerprint = None
+    master.pool = workers.ProcessExecutor(1).start(workers.init_worker, (SimpleNamespace(sleep=time.sleep),))
+
+    def submit(h, callback, error_callback):
+        master.pool.apply_async(workers.execute, args=('sleep', 3600), callback=callback, error_callback=error_callback)
+
+    start = time.time()
+    with pytest.raises(TimeoutError):
+        list(master.collect_SP_results(submit, ['Building1']))
+    assert time.time() - start < 10 and master.pool is None  # the next decomposition starts new workers
+
+
+def test_SP_failure_terminates_pool():
+    master = MasterProblem.__new__(MasterProblem)
+    master.DW_params = {'SP_timeout': None, 'SP_max_retries': 1}
+    master.logger = logging.getLogger(__name__)
+    master.pool_fingerprint = None
+    master.pool = workers.ProcessExecutor(2).start(workers.init_worker, (SimpleNamespace(sleep=time.sleep),))
+
+    def submit(h, callback, error_callback):
+        # the SP of Building1 fails at each attempt, while the one of Building2 never returns
+        args = ('sleep', 3600) if h == 'Building2' else ('missing_method',)
+        master.pool.apply_async(workers.execute, args=args, callback=callback, error_callback=error_callback)
+
+    start = time.time()
+    with pytest.raises(Exception, match='Sub problem failed with building Building1'):
+        list(master.collect_SP_results(submit, ['Building1', 'Building2']))
+    assert time.time() - start < 10 and master.pool is None
+
+
+def test_task_tracker():
+    tasks = workers.TaskTracker(['a', 'b', 'c'], n_workers=2, timeout=10, max_retries=1)
+    for key in ['a', 'b', 'c']:
+        assert tasks.submitted(key, now=0) == 0
+    assert tasks.deadline('a') == 10 and tasks.deadline('c') == float('inf')  # c waits for a free worker
+    assert tasks.wait_time(['a', 'b', 'c'], now=4) == 6 and tasks.expired(['a', 'b', 'c'], now=4) == []
+
+    assert tasks.finished(0, now=5)  # c starts when a finishes
+    assert tasks.deadline('c') == 15 and tasks.expired(['b', 'c'], now=12) == ['b']
+    assert tasks.wait_time(['b', 'c'], now=12) == 0
+
+    assert tasks.can_retry('b')
+    tasks.restarted()
+    for key in ['b', 'c']:
+        assert tasks.submitted(key, attempt=key == 'b', now=12) == 1
+    assert tasks.attempts == {'a': 1, 'b': 2, 'c': 1} and not tasks.can_retry('b')
+    assert not tasks.finished(0, now=13)  # result of the workers stopped
+    assert tasks.deadline('b') == 22 and tasks.deadline('c') == 22
+
+    assert workers.TaskTracker(['a'], n_workers=1).wait_time(['a']) is None  # no timeout
+
+
+def hang_once(directory, h):
+    """Hangs at the first call for a house, returns the house at the next ones."""
+    path = os.path.join(directory, h)
+    if not os.path.exists(path):
+        open(path, 'w').close()
+        time.sleep(3600)
+    return h
+
+
+@pytest.mark.parametrize("pinned", [False, True])
+def test_SP_timeout_recycles_workers(tmp_path, pinned):
+    open(tmp_path / 'Building2', 'w').close()  # only the SP of Building1 hangs
+    master = MasterProblem.__new__(MasterProblem)
+    master.DW_params = {'SP_timeout': 1.0, 'SP_max_retries': 1}
+    master.logger = logging.getLogger(__name__)
+    master.pool_fingerprint = None
+    master.pool = workers.ProcessExecutor(1).start(workers.init_worker, (SimpleNamespace(work=hang_once),), pinned=pinned)
+
+    def submit(h, callback, error_callback):
+        master.pool.lane(h).apply_async(workers.execute, args=('work', str(tmp_path), h), callback=callback, error_callback=error_callback)
+
+    start = time.time()
+    try:
+        # Building2 waits behind the hung SP of the single worker, and is solved by the new worker
+        assert dict(master.collect_SP_results(submit, ['Building1', 'Building2'])) == {'Building1': 'Building1', 'Building2': 'Building2'}
+    finally:
+        master.close_SP_pool()
+    assert time.time() - start < 10
@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from reho.model.master_problem import MasterProblem
+
+__doc__ = """
+Measures the cost of the decomposition bookkeeping (add_df_Results_SP, add_df_Results_MP) for growing run sizes.
+The time per appended SP result should stay flat when the number of buildings and iterations grows.
+"""
+
+
+def solver_attributes(Scn_ID, Pareto_ID):
+    mux = pd.MultiIndex.from_tuples([(Scn_ID, Pareto_ID)], names=['Scn_ID', 'Pareto_ID'])
+    return pd.DataFrame([np.random.rand(9)], index=mux,
+                        columns=['solving_time', 'constraints', 'presolve_constraints', 'variables', 'presolve_variables',
+                                 'presolve_binaries', 'presolve_integer', 'no_objective', 'val_objective'])
+
+
+def run(n_buildings, n_iter, n_pareto):
+    """Fills the bookkeeping of a MasterProblem as a decomposition would, and returns the time per SP result in µs."""
+    mp = MasterProblem.__new__(MasterProblem)
+    mp.buildings_data = {'Building' + str(i): {} for i in range(n_buildings)}
+    mp.DW_params = {'deduplicate_columns': False}
+    mp.initialize_optimization_tracking_attributes()
+    df_Results = {'df_Performance': pd.DataFrame()}
+
+    start = time.perf_counter()
+    for Pareto_ID in range(1, n_pareto + 1):
+        for it in range(n_iter):
+            for h in mp.buildings_data:
+                mp.add_df_Results_SP('scn', Pareto_ID, it, h, df_Results, solver_attributes('scn', Pareto_ID))
+            mp.feasible_solutions += 1
+            mp.add_df_Results_MP('scn', Pareto_ID, it, {}, solver_attributes('scn', Pareto_ID))
+            mp.solver_attributes_MP.xs(('scn', Pareto_ID), level=('Scn_ID', 'Pareto_ID'))  # read at each iteration by the termination criteria
+    mp.number_MP_solutions  # read once at the end of the run
+    elapsed = time.perf_counter() - start
+    return elapsed / (n_buildings * n_iter * n_pareto) * 1e6
+
+
+if __name__ == '__main__':
+    print('buildings  iterations  Pareto  SP results  µs/result')
+    for n_buildings, n_iter, n_pareto in [(10, 15, 1), (50, 15, 2), (100, 15, 4), (500, 15, 6)]:
+        cost = run(n_buildings, n_iter, n_pareto)
+        print(f'{n_buildings:>9}  {n_iter:>10}  {n_pareto:>6}  {n_buildings * n_iter * n_pareto:>10}  {cost:>9.1f}')
@@ -0,0 +1,37 @@
+from reho.model.reho import *
+
+__doc__ = """
+Compares the number of iterations of the decomposition with and without the stabilization of the duals.
+Each run solves the same district with DW_params['dual_stabilization'] set to None, 'smoothing' and 'box'.
+"""
+
+
+def run(qbuildings_data, cluster, dual_stabilization):
+    scenario = {'Objective': 'TOTEX', 'name': 'totex', 'exclude_units': [], 'enforce_units': []}
+    method = {'district-scale': True}
+    DW_params = {'max_iter': 15, 'dual_stabilization': dual_stabilization}
+
+    grids = infrastructure.initialize_grids()
+    units = infrastructure.initialize_units(scenario, grids)
+
+    with REHO(qbuildings_data=qbuildings_data, units=units, grids=grids, cluster=cluster, scenario=scenario, method=method, DW_params=DW_params) as reho:
+        start = time.time()
+        reho.single_optimization()
+        elapsed = time.time() - start
+        iterations = len(reho.results_MP['totex'][0]) - 1  # without the last binary MP
+        objective = reho.results['totex'][0]['df_Performance'].loc['Network', 'TOTEX']
+    return iterations, elapsed, objective
+
+
+if __name__ == '__main__':
+
+    buildings_filename = str(Path(__file__).parents[1] / 'examples' / 'data' / 'buildings.csv')
+    reader = QBuildingsReader()
+    qbuildings_data = reader.read_csv(buildings_filename=buildings_filename, nb_buildings=10)
+    cluster = {'Location': 'Geneva', 'Attributes': ['T', 'I', 'W'], 'Periods': 10, 'PeriodDuration': 24}
+
+    reference, _, _ = run(qbuildings_data, cluster, None)
+    print('stabilization  iterations  saved  time [s]  TOTEX')
+    for dual_stabilization in [None, 'smoothing', 'box']:
+        iterations, elapsed, objective = run(qbuildings_data, cluster, dual_stabilization)
+        print(f'{str(dual_stabilization):>13}  {iterations:>10}  {reference - iterations:>5}  {elapsed:>8.1f}  {objective:.2f}')
@@ -0,0 +1,46 @@
+import os
+import time
+from types import SimpleNamespace
+
+from amplpy import AMPL
+
+from reho.model import sub_problem
+from reho.model.sub_problem import SubProblem
+
+__doc__ = """
+Measures the time to build the AMPL model of a SP with about 20 units, reading the model files one by one as before
+and reading the concatenated model of get_model_template.
+"""
+
+unit_types = ['ElectricalHeater', 'NG_Boiler', 'OIL_Boiler', 'WOOD_Stove', 'HeatPump', 'AirConditioner', 'ThermalSolar', 'DataHeat',
+              'DHN_hex', 'PV', 'rSOC', 'Methanator', 'FuelCell', 'Electrolyzer', 'WaterTankSH', 'WaterTankDHW', 'Battery',
+              'Battery_interperiod', 'H2storage', 'CH4storage', 'CO2storage']
+
+
+def build(files, template):
+    """Reads the model files in a new AMPL instance and returns the time spent in ms."""
+    ampl = AMPL()
+    start = time.perf_counter()
+    if template:
+        ampl.eval(sub_problem.get_model_template(files))
+    else:
+        for file in files:
+            ampl.cd(os.path.dirname(file))
+            ampl.read(os.path.basename(file))
+    elapsed = time.perf_counter() - start
+    ampl.close()
+    return elapsed * 1e3
+
+
+if __name__ == '__main__':
+    SP = SubProblem.__new__(SubProblem)
+    SP.infrastructure_sp = SimpleNamespace(UnitTypes=unit_types)
+    SP.method_sp = {'use_pv_orientation': False, 'interperiod_storage': True}
+    files = SP.get_model_files()
+
+    n_SP = 20
+    print(str(len(unit_types)) + ' units, ' + str(len(files)) + ' model files, ' + str(n_SP) + ' SPs built')
+    print('    model files  first SP [ms]  next SPs [ms/SP]')
+    for template in [False, True]:
+        times = [build(files, template) for _ in range(n_SP)]
+        print(f'{"template" if template else "one by one":>15}  {times[0]:>13.1f}  {sum(times[1:]) / (n_SP - 1):>16.1f}')